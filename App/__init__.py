@@ -1,2 +1,5 @@
 from .reports import HoymileReport
-
+from .async_reports import AsyncHoymileReport
+from .threaded_reports import ThreadedHoymileReport
+from .storage import Outbox, ReadingCursor, ReadingStore, TopologyCache
+from .pipeline import StreamingPipeline
@@ -0,0 +1,169 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from App.reports import HoymileReport
+from utils.tracing import span, with_context
+
+
+@dataclass
+class MultiAccountReport:
+    """
+    MultiAccountReport collects several Hoymiles accounts (API keys) in one run.
+
+    Every account is collected by its own HoymileReport (or subclass), which keeps its own
+    topology snapshots (plants.<account>.json, micros_id.<account>.json) and its own rate
+    limiter, so the request budget of one key is not spent by another. The accounts are
+    collected in parallel, one thread each, and their plants are merged into one fleet that
+    goes through a single cursor, store, ENRG token and upload pipeline. It exposes the
+    methods run_cycle() and StreamingPipeline use, so it replaces a HoymileReport unchanged.
+
+    A plant listed by more than one account is collected and sent once, by the first account
+    listing it.
+
+    Attributes:
+        logger (logging.Logger): Logger instance used for logging the accounts.
+        reports (dict): HoymileReport of every account, by account name. They share the
+            HTTP client, cursor, store, metrics, tracer and circuit breakers.
+
+    Methods:
+        hour / run_context:
+            Read from the first account; setting them updates every account.
+
+        get_list_microinverters_per_plant() -> list:
+            Returns the cached plants of every account, remembering the account of each plant.
+
+        order_information_plants() -> list:
+            Collects every account in parallel, each only the plants it owns, and orders
+            the merged fleet once.
+
+        _collect_plant(plant: dict, current_date: str) -> Optional[dict]:
+            Collects a plant with the report of its account.
+
+        _order_plant(plant: dict, current_date: str) / create_payload(plant_data: list[dict]):
+            Same as HoymileReport; they do not depend on the account.
+
+        refresh_topology(full: bool = False) -> list / wait_topology_refresh():
+            Refreshes the topology of every account / waits for their background refreshes.
+    """
+
+    logger: logging.Logger
+    reports: dict
+
+    def __post_init__(self):
+        self._owners = {}
+
+    @property
+    def primary(self) -> HoymileReport:
+        return next(iter(self.reports.values()))
+
+    @property
+    def hour(self) -> int:
+        return self.primary.hour
+
+    @hour.setter
+    def hour(self, hour: int) -> None:
+        for report in self.reports.values():
+            report.hour = hour
+
+    @property
+    def run_context(self):
+        return self.primary.run_context
+
+    @run_context.setter
+    def run_context(self, run_context) -> None:
+        for report in self.reports.values():
+            report.run_context = run_context
+
+    @property
+    def cursor(self):
+        return self.primary.cursor
+
+    @property
+    def store(self):
+        return self.primary.store
+
+    @property
+    def breakers(self):
+        return self.primary.breakers
+
+    @property
+    def shard(self):
+        return self.primary.shard
+
+    @property
+    def tracer(self):
+        return self.primary.tracer
+
+    def get_list_microinverters_per_plant(self) -> list:
+        all_microinverters = []
+        owners = {}
+
+        for account, report in self.reports.items():
+            for plant in report.get_list_microinverters_per_plant():
+                if plant.get("id_plant") not in owners:
+                    owners[plant.get("id_plant")] = report
+                    all_microinverters.append(plant)
+
+        self._owners = owners
+
+        return all_microinverters
+
+    def _collect_plant(self, plant: dict, current_date: str) -> Optional[dict]:
+        return self._owners.get(plant.get("id_plant"), self.primary)._collect_plant(plant, current_date)
+
+    def order_information_plants(self) -> list:
+        current_date_formatted = datetime.now().strftime("%Y-%m-%d")
+
+        with span(self.tracer, "get_data_microinverters_per_plant", "collect") as collect_span:
+            all_microinverters = self.get_list_microinverters_per_plant()
+
+            with ThreadPoolExecutor(max_workers=len(self.reports), thread_name_prefix="account") as executor:
+                # Every account collects only the plants it owns, a shared plant is consulted once
+                futures = {account: executor.submit(with_context(self._collect_account), account, report,
+                                                    [plant for plant in all_microinverters
+                                                     if self._owners[plant.get("id_plant")] is report])
+                           for account, report in self.reports.items()}
+                data = self._merge_accounts({account: future.result() for account, future in futures.items()})
+
+            collect_span["plants"] = len(data)
+
+        return self.primary._order_plants(data, current_date_formatted)
+
+    def _collect_account(self, account: str, report: HoymileReport, plants: list) -> list:
+        with span(self.tracer, "account", "collect", account=account or "default") as account_span:
+            data = report.get_data_microinverters_per_plant(plants)
+            account_span["plants"] = len(data)
+
+        return data
+
+    def _merge_accounts(self, data_per_account: dict) -> list:
+        all_data = []
+        seen = set()
+
+        for account, data in data_per_account.items():
+            self.logger.info(f"Account {account or 'default'}: {len(data)} plants collected")
+
+            for plant_data in data:
+                if plant_data.get("id_plant") not in seen:
+                    seen.add(plant_data.get("id_plant"))
+                    all_data.append(plant_data)
+
+        return all_data
+
+    def _order_plant(self, plant: dict, current_date: str) -> dict:
+        return self.primary._order_plant(plant, current_date)
+
+    def create_payload(self, plant_data: list[dict]):
+        return self.primary.create_payload(plant_data)
+
+    def refresh_topology(self, full: bool = False) -> list:
+        with ThreadPoolExecutor(max_workers=len(self.reports), thread_name_prefix="account") as executor:
+            futures = [executor.submit(report.refresh_topology, full) for report in self.reports.values()]
+            return [plant for future in futures for plant in future.result()]
+
+    def wait_topology_refresh(self) -> None:
+        for report in self.reports.values():
+            report.wait_topology_refresh()
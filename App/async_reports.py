@@ -0,0 +1,121 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from App.reports import HoymileReport
+from utils.tracing import span, with_context
+
+
+@dataclass
+class AsyncHoymileReport(HoymileReport):
+    """
+    AsyncHoymileReport collects the same information as HoymileReport, but runs the
+    per-plant and per-microinverter Hoymiles calls concurrently with asyncio.
+
+    The blocking HTTP calls are dispatched to a thread pool and an asyncio semaphore
+    caps how many of them are in flight at once. Every call runs in a copy of the
+    context of its task, so its trace spans hang from the plant span, and every plant
+    is traced on a lane of its own since the plants overlap on the event loop. The output of
+    get_data_microinverters_per_plant() keeps the plant order of the cached list, so
+    order_information_plants() and create_payload() work unchanged.
+
+    Attributes:
+        MAX_CONCURRENCY (int): Maximum number of in-flight requests (set during initialization).
+
+    Methods:
+        get_data_microinverters_per_plant(plants: Optional[list] = None) -> list:
+            Collects every plant concurrently and returns the results in plant order.
+            Returns an empty list if any microinverter could not be consulted, unless circuit
+            breakers are set, in which case only the degraded plants are left out.
+
+        _collect_all(all_microinverters: list, current_date: str) -> list:
+            Schedules one task per plant under the in-flight limit.
+
+        _collect_plant_safe_async(call, plant: dict, current_date: str) -> Optional[dict]:
+            Same as _collect_plant_async(), but an unexpected error fails only that plant (None).
+
+        _collect_plant_async(call, plant: dict, current_date: str) -> Optional[dict]:
+            Requests the microinverters, total energy and status of a plant concurrently
+            (only the total energy and status at night, see HoymileReport.solar).
+    """
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.MAX_CONCURRENCY = max(1, self.config_data.get_max_concurrency())
+
+    def get_data_microinverters_per_plant(self, plants: Optional[list] = None) -> list:
+        current_date_formatted = datetime.now().strftime("%Y-%m-%d")
+
+        all_microinverters = self.get_list_microinverters_per_plant() if plants is None else plants
+
+        try:
+            return asyncio.run(self._collect_all(all_microinverters, current_date_formatted))
+
+        except Exception as ex:
+            self.logger.error(
+                f"Error while asking for microinverters data {ex}")
+            return []
+
+    async def _collect_all(self, all_microinverters: list, current_date: str) -> list:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+
+        with ThreadPoolExecutor(max_workers=self.MAX_CONCURRENCY) as executor:
+
+            async def call(func, *args):
+                async with semaphore:
+                    return await loop.run_in_executor(executor, with_context(func), *args)
+
+            all_data_microinverters = await asyncio.gather(
+                *(self._collect_plant_safe_async(call, plant, current_date) for plant in all_microinverters))
+
+        return self._merge_plants(all_data_microinverters)
+
+    async def _collect_plant_safe_async(self, call, plant: dict, current_date: str) -> Optional[dict]:
+        try:
+            return await self._collect_plant_async(call, plant, current_date)
+        except Exception as ex:
+            self.logger.error(f"Error while collecting the plant {plant.get('id_plant')}: {ex}")
+            self._plant_failed(plant.get("id_plant"))
+            return None
+
+    async def _collect_plant_async(self, call, plant: dict, current_date: str) -> Optional[dict]:
+        id_plant = plant.get("id_plant")
+        start = time.perf_counter()
+
+        with span(self.tracer, "plant", "plant", lane=f"plant {id_plant}", plant=id_plant,
+                  devices=len(plant.get("micros_id"))) as plant_span:
+            if not self._plant_allowed(id_plant):
+                plant_span["outcome"] = "degraded"
+                return None
+
+            if self._is_night(plant):
+                plant_data = await call(self._collect_night_plant, plant)
+                plant_span["outcome"] = "failed" if plant_data is None else "night"
+                return plant_data
+
+            summary, *data_microinverters = await asyncio.gather(
+                call(self._get_plant_summary, id_plant),
+                *(call(self._get_generation, id_plant, microinverter, current_date)
+                  for microinverter in plant.get("micros_id")))
+
+            if any(data_microinverter is None for data_microinverter in data_microinverters):
+                self._plant_failed(id_plant)
+                plant_span["outcome"] = "failed"
+                return None
+
+            total_energy_per_plant, plant_status = summary
+
+            if not self._plant_succeeded(id_plant, total_energy_per_plant, plant_status):
+                plant_span["outcome"] = "failed"
+                return None
+
+            plant_span["outcome"] = "ok"
+
+        if self.metrics is not None:
+            self.metrics.observe_plant(id_plant, time.perf_counter() - start)
+
+        return self._build_plant_data(plant, total_energy_per_plant, plant_status, data_microinverters)
@@ -1,4 +1,5 @@
 import logging
+import time
 import requests
 import configparser
 from datetime import datetime, timedelta, timezone
@@ -6,6 +7,11 @@ from typing import Optional
 from dataclasses import dataclass, field
 import os
 
+from utils import jsonCodec
+from utils.httpClient import HttpClient
+from utils.metrics import Metrics
+from utils.runContext import RunContext
+
 @dataclass
 class AuthService:
     """
@@ -19,6 +25,9 @@ class AuthService:
         token (Optional[str]): Current token if already obtained.
         expiration (Optional[datetime]): Expiration datetime of the current token.
         key_file (str): Path to the file where the token and its expiration are stored.
+        http_client (HttpClient): Pooled HTTP client used to request the token (created if omitted).
+        run_context (RunContext): Optional run context providing the request headers.
+        metrics (Metrics): Optional registry where every token request is recorded ("token").
 
     Methods:
         load_token_from_file() -> bool:
@@ -28,7 +37,8 @@ class AuthService:
             Saves the current token and its expiration to the key file.
 
         get_token(autherization: bool = True) -> str:
-            Returns a valid token. If a valid token exists in the file, it is used.
+            Returns a valid token. A valid token already held in memory is reused first
+            (long-running daemon), then a valid token stored in the file.
             Otherwise, a new token is requested from the API.
 
         is_token_valid() -> bool:
@@ -40,8 +50,14 @@ class AuthService:
     credential: str
     token: Optional[str] = field(default=None, init=False)
     expiration: Optional[datetime] = field(default=None, init=False)
-    key_file: str = "token.ini" 
-    
+    key_file: str = "token.ini"
+    http_client: Optional[HttpClient] = None
+    run_context: Optional[RunContext] = None
+    metrics: Optional[Metrics] = None
+
+    def __post_init__(self):
+        if self.http_client is None:
+            self.http_client = HttpClient()
 
     def load_token_from_file(self) -> bool:
         config = configparser.ConfigParser()
@@ -77,6 +93,9 @@ class AuthService:
                 self.logger.error(f"Error at saving the file {self.key_file}: {e}")
 
     def get_token(self, autherization:bool=True) -> str:
+        if autherization and self.is_token_valid():
+            return self.token
+
         if self.load_token_from_file() and self.is_token_valid() and autherization:
             self.logger.info("Existing and validated token")
             return self.token  
@@ -84,13 +103,22 @@ class AuthService:
         self.logger.info("Token is nor valid. Getting the token...")
         
         payload = {"credential": self.credential}
-        headers = {"Content-Type": "application/json"}
+        headers = dict(self.run_context.json_headers) if self.run_context else {"Content-Type": "application/json"}
+
+        body = jsonCodec.dumps(payload)
+        start = time.perf_counter()
 
         try:
-            response = requests.post(self.url, json=payload, headers=headers)
+            response = self.http_client.post(self.url, data=body, headers=headers)
+
+            if self.metrics is not None:
+                self.metrics.observe_request("token", time.perf_counter() - start,
+                                             "ok" if response.ok else f"http_{response.status_code}",
+                                             len(body), len(response.content))
+
             response.raise_for_status()  
 
-            data = response.json()
+            data = jsonCodec.loads(response.content)
             self.token = data.get("token")
             expiration_str = data.get("expiration")
 
@@ -105,8 +133,14 @@ class AuthService:
             else:
                 self.logger.info("No token or expiration date found.")
         except requests.RequestException as e:
+            if self.metrics is not None and not isinstance(e, requests.HTTPError):
+                self.metrics.observe_request("token", time.perf_counter() - start, "error", len(body))
+
             self.logger.error(f"Error sending the request: {e}")
 
+        if self.metrics is not None:
+            self.metrics.count_failure("token")
+
         return ""  
 
     def is_token_valid(self) -> bool:
@@ -1,7 +1,22 @@
+import gzip
 import logging
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+import requests
+
+from App.authentication.token import AuthService
+from App.models.microinverters import dumps_payload
+from App.storage.outbox import Outbox
+from utils import jsonCodec
+from utils.httpClient import HttpClient
+from utils.metrics import Metrics
+from utils.rateLimiter import RateLimiter
+from utils.runContext import RunContext
+from utils.tracing import Tracer, span, with_context
 
 @dataclass
 class PostRequester:
@@ -10,53 +25,358 @@ class PostRequester:
     with a given authorization token and list of payloads. It logs the success or failure of each request,
     and processes the response to provide feedback on plant and device registration status.
 
+    Payloads can be packed into batches: with batch_size > 1 several plant payloads are sent
+    as a JSON list in a single request, up to batch_size payloads or batch_max_bytes of JSON.
+    With compress, request bodies are gzip-encoded (Content-Encoding: gzip). The defaults
+    (batch_size = 1, compress = False) send one uncompressed plant payload per request.
+
+    Requests are sent by `workers` concurrent senders. Connection errors, HTTP 429 and 5xx
+    responses are retried up to max_retries times with the exponential backoff of the
+    rate limiter (honoring Retry-After). A 401 triggers a single-flight token refresh through
+    AuthService.get_token(autherization=False): when many senders hit 401 at once, only the
+    first one requests a new token and the others retry with it.
+
+    With an outbox, every payload is stored before it is sent and acknowledged only once
+    ENRG confirms its plant was saved; replay_outbox() resends the backlog of previous runs.
+    The send methods report the plants saved by ENRG and the plants whose payload failed
+    but is stored in the outbox, so the reading cursor only moves for those and the run
+    only counts the first ones as sent.
+
     Attributes:
         url (str): The API endpoint where POST requests will be sent.
         token (str): The bearer token used for authorization.
         payloads (List[Dict]): A list of dictionaries to be sent as JSON in each POST request.
         logger (logging.Logger): Logger instance used for logging results and errors.
+        http_client (HttpClient): Pooled HTTP client used to send the payloads (created if omitted).
+        batch_size (int): Maximum number of plant payloads per request.
+        batch_max_bytes (int): Maximum size of the uncompressed JSON body of a batch.
+        compress (bool): Whether the request bodies are gzip-encoded.
+        auth_service (AuthService): Optional service used to refresh the token on a 401.
+        workers (int): Number of concurrent senders.
+        max_retries (int): Maximum number of attempts per request.
+        rate_limiter (RateLimiter): Optional pacing and retry backoff (unpaced if omitted).
+        outbox (Outbox): Optional durable queue of the payloads not yet confirmed by ENRG.
+        run_context (RunContext): Optional run context providing the request headers.
+        metrics (Metrics): Optional registry where every ENRG attempt is recorded ("enrg").
+        tracer (Tracer): Optional tracer recording a "batch" span per request and its attempts.
 
     Methods:
-        send_post_requests():
-            Sends each payload in the payload list to the API using a POST request.
-            Logs errors for failed requests and passes successful responses to be handled.
+        send_post_requests() -> tuple:
+            Sends the payload list to the API, one batch per POST request, on `workers` senders.
+            Returns the ids (str) of the plants saved by ENRG and of the plants not saved but
+            stored in the outbox.
+
+        send_payload(payload: Dict) -> bool:
+            Sends a single payload. Returns whether ENRG saved it.
+
+        replay_outbox(limit: int, rate: float) -> int:
+            Purges the expired dead payloads of the outbox, then resends up to `limit` payloads
+            left in it, oldest first, at most `rate` requests per second. Returns the number of
+            payloads replayed.
+
+        send_batch(batch: List[Dict]) -> tuple:
+            Sends a batch of payloads. Logs errors for failed requests and passes successful
+            responses to be handled. Returns the plants as send_post_requests().
+
+        _track(payloads: List[Dict]) -> List[tuple]:
+            Stores the payloads in the outbox. Returns (payload, outbox_id) pairs, with None
+            as id when there is no outbox or the payload could not be stored.
+
+        _build_batches(entries: List[tuple]) -> List[tuple]:
+            Groups the encoded (payload, outbox_id) pairs by batch_size and batch_max_bytes.
 
-        _handle_response(result: Dict, payload: Dict):
+        _send_traced(entries: List[tuple], body: bytes) -> tuple:
+            Calls _send() inside a "batch" span of the tracer.
+
+        _send(entries: List[tuple], body: bytes) -> tuple:
+            Sends one request with _deliver() and settles its payloads in the outbox by id.
+            Returns the plants as send_post_requests().
+
+        _deliver(batch: List[Dict], body: bytes) -> tuple:
+            Sends one request, retrying connection errors, 429/5xx and a 401 after a token refresh.
+            Returns the ids of the plants saved and the error of the others.
+
+        _refresh_token(expired_token: str):
+            Requests a new token unless another sender already replaced `expired_token`.
+
+        _handle_response(result: Dict, payload: Dict) -> bool:
             Parses the API response to check whether plant and device information was saved correctly.
             Logs messages based on the presence or absence of certain keys and values in the response.
+            Returns True when the plant was saved.
+
+        _handle_batch_response(result: Dict, batch: List[Dict]) -> set:
+            Maps every item of a batch response back to its plant and device.
+            Returns the ids of the plants saved.
     """
 
     url: str
     token: str
     payloads: List[Dict]
     logger: logging.Logger
+    http_client: Optional[HttpClient] = None
+    batch_size: int = 1
+    batch_max_bytes: int = 1048576
+    compress: bool = False
+    auth_service: Optional[AuthService] = None
+    workers: int = 1
+    max_retries: int = 3
+    rate_limiter: Optional[RateLimiter] = None
+    outbox: Optional[Outbox] = None
+    run_context: Optional[RunContext] = None
+    metrics: Optional[Metrics] = None
+    tracer: Optional[Tracer] = None
+
+    def __post_init__(self):
+        if self.http_client is None:
+            self.http_client = HttpClient()
+
+        if self.rate_limiter is None:
+            self.rate_limiter = RateLimiter(rate=0, burst=1)
+
+        self._token_lock = threading.Lock()
+
+        self.headers = dict(self.run_context.json_headers) if self.run_context else {'Content-Type': 'application/json'}
+        self.headers['Authorization'] = f'Bearer {self.token}'
+
+        if self.compress:
+            self.headers['Content-Encoding'] = 'gzip'
+
+    def send_post_requests(self) -> tuple:
+        return self._send_all(self._build_batches(self._track(self.payloads)))
+
+    def send_payload(self, payload: Dict) -> bool:
+        saved_plants, _ = self.send_batch([payload])
+        return str(payload.get("ID_PLANT")) in saved_plants
+
+    def send_batch(self, batch: List[Dict]) -> tuple:
+        return self._send_all(self._build_batches(self._track(batch)), workers=1)
+
+    def replay_outbox(self, limit: int, rate: float) -> int:
+        if self.outbox is None:
+            return 0
+
+        try:
+            purged = self.outbox.purge()
+        except Exception as ex:
+            purged = 0
+            self.logger.error(f"[OUTBOX]: Error while purging the dead payloads: {ex}")
+
+        if purged:
+            self.logger.info(f"Purged {purged} dead payloads older than {self.outbox.retention_days:g} days from the outbox")
+
+        entries = self.outbox.pending(limit)
+
+        if not entries:
+            return 0
+
+        self.logger.info(f"Replaying {len(entries)} payloads from the outbox ({self.outbox.count()} pending)")
+        self._send_all(self._build_batches([(payload, entry_id) for entry_id, payload in entries]),
+                       RateLimiter(rate=rate, burst=1))
+
+        return len(entries)
+
+    def _track(self, payloads: List[Dict]) -> List[tuple]:
+        if self.outbox is None or not payloads:
+            return [(payload, None) for payload in payloads]
+
+        try:
+            entry_ids = self.outbox.enqueue(payloads)
+        except Exception as ex:
+            # They are still sent, but only the ones ENRG saves are safe
+            self.logger.error(f"[OUTBOX]: Payloads not stored in the outbox: {ex}")
+            return [(payload, None) for payload in payloads]
+
+        return list(zip(payloads, entry_ids))
+
+    def _settle(self, entries: List[tuple], saved_plants: set, error: str = "Plant information not saved"):
+        if self.outbox is None:
+            return
+
+        delivered = []
+        failed = []
+
+        for payload, entry_id in entries:
+            if entry_id is None:
+                continue
+
+            if str(payload.get("ID_PLANT")) in saved_plants:
+                delivered.append(entry_id)
+            else:
+                failed.append(entry_id)
+
+        self.outbox.ack(delivered)
+        self.outbox.mark_failed(failed, error)
+
+    def _send_all(self, batches: List[tuple], limiter: Optional[RateLimiter] = None, workers: Optional[int] = None) -> tuple:
+        def send(item):
+            if limiter is not None:
+                limiter.acquire()
+
+            return self._send_traced(*item)
+
+        workers = self.workers if workers is None else workers
+        saved_plants = set()
+        stored_plants = set()
+
+        if workers <= 1:
+            results = [send(item) for item in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(with_context(send), item) for item in batches]
+                results = [future.result() for future in futures]
 
-    def send_post_requests(self):
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
+        for saved, stored in results:
+            saved_plants |= saved
+            stored_plants |= stored
 
-        for payload in self.payloads:
-            try:
-                response = requests.post(self.url, json=payload, headers=headers)
+        return saved_plants, stored_plants
+
+    def _build_batches(self, entries: List[tuple]) -> List[tuple]:
+        if self.batch_size <= 1:
+            return [([entry], self._encode(entry[0])) for entry in entries]
+
+        batches = []
+        batch = []
+        parts = []
+        size = 2
+
+        for entry in entries:
+            part = self._encode(entry[0])
+
+            if batch and (len(batch) >= self.batch_size or size + len(part) + 1 > self.batch_max_bytes):
+                batches.append((batch, b"[" + b",".join(parts) + b"]"))
+                batch, parts, size = [], [], 2
+
+            batch.append(entry)
+            parts.append(part)
+            size += len(part) + 1
+
+        if batch:
+            batches.append((batch, b"[" + b",".join(parts) + b"]"))
+
+        return batches
+
+    def _encode(self, payload: Dict) -> bytes:
+        return dumps_payload(payload)
+
+    def _send_traced(self, entries: List[tuple], body: bytes) -> tuple:
+        with span(self.tracer, "batch", "upload", plants=[payload.get("ID_PLANT") for payload, _ in entries], bytes=len(body)):
+            return self._send(entries, body)
+
+    def _send(self, entries: List[tuple], body: bytes) -> tuple:
+        stored_plants = {str(payload.get("ID_PLANT")) for payload, entry_id in entries if entry_id is not None}
+        saved_plants, error = self._deliver([payload for payload, _ in entries], body)
+        self._settle(entries, saved_plants, error)
+
+        return saved_plants, stored_plants - saved_plants
+
+    def _deliver(self, batch: List[Dict], body: bytes) -> tuple:
+        saved_plants = set()
+        error = "Plant information not saved"
+
+        try:
+            if self.compress:
+                body = gzip.compress(body)
+
+            for attempt in range(1, self.max_retries + 1):
+                token = self.token
+                headers = dict(self.headers, Authorization=f'Bearer {token}')
+                self.rate_limiter.acquire()
+                start = time.perf_counter()
+
+                try:
+                    response = self.http_client.post(self.url, data=body, headers=headers)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self._observe(attempt, start, "error", body)
+                    self.logger.error(f"[RETRY]: Attempt {attempt}/{self.max_retries} - Connection error: {e}")
+                    self._wait_before_retry(attempt)
+                    continue
+
+                self._observe(attempt, start, "ok" if response.status_code == 200 else f"http_{response.status_code}", body, response)
+
+                if response.status_code == 401 and self.auth_service is not None and attempt < self.max_retries:
+                    self.logger.error("[RETRY]: HTTP 401 - Refreshing the token.")
+                    self._count("retry")
+                    self._refresh_token(token)
+                    continue
+
+                if (response.status_code == 429 or response.status_code >= 500) and attempt < self.max_retries:
+                    self.logger.error(f"[RETRY]: Attempt {attempt}/{self.max_retries} - HTTP {response.status_code}.")
+                    self._wait_before_retry(attempt, response.headers.get("Retry-After"))
+                    continue
 
                 if response.status_code != 200:
+                    error = f"HTTP {response.status_code}"
+                    self._count("failure")
                     self.logger.error(f"[ERROR]: HTTP {response.status_code} - Failed to send data.")
-                    message= response.json().get("message", "No message provided.")
+                    message= jsonCodec.loads(response.content).get("message", "No message provided.")
                     self.logger.error(f"[ERROR_MESSAGE]: message : {message}")
 
-                    continue
+                    return saved_plants, error
 
-                self._handle_response(response.json(), payload)
+                if self.batch_size <= 1:
+                    if self._handle_response(jsonCodec.loads(response.content), batch[0]):
+                        saved_plants.add(str(batch[0].get("ID_PLANT")))
+                else:
+                    saved_plants = self._handle_batch_response(jsonCodec.loads(response.content), batch)
 
-            except Exception as e:
-                self.logger.error(f"[EXCEPTION]: Error sending payload: {e}")
+                return saved_plants, error
 
-    def _handle_response(self, result: Dict, payload: Dict):
+            error = "Maximum number of attempts made"
+            self._count("failure")
+            self.logger.error(f"[ERROR]: Maximum number of attempts made. Plants not sent: {[payload.get('ID_PLANT') for payload in batch]}")
+
+        except Exception as e:
+            error = str(e)
+            self.logger.error(f"[EXCEPTION]: Error sending payload: {e}")
+
+        return saved_plants, error
+
+    def _wait_before_retry(self, attempt: int, retry_after: Optional[str] = None):
+        delay = self.rate_limiter.parse_retry_after(retry_after)
+
+        if delay is None:
+            delay = self.rate_limiter.backoff(attempt)
+
+        if attempt < self.max_retries:
+            self._count("retry")
+            time.sleep(delay)
+
+    def _observe(self, attempt: int, start: float, outcome: str, body: bytes, response=None):
+        if self.metrics is not None:
+            self.metrics.observe_request("enrg", time.perf_counter() - start, outcome, len(body),
+                                         0 if response is None else len(response.content))
+
+        if self.tracer is not None:
+            self.tracer.complete("enrg", start, "http", attempt=attempt, outcome=outcome)
+
+    def _count(self, event: str):
+        if self.metrics is None:
+            return
+
+        if event == "retry":
+            self.metrics.count_retry("enrg")
+        else:
+            self.metrics.count_failure("enrg")
+
+    def _refresh_token(self, expired_token: str):
+        with self._token_lock:
+            if self.token != expired_token:
+                return
+
+            token = self.auth_service.get_token(autherization=False)
+
+            if token:
+                self.token = token
+                self.headers['Authorization'] = f'Bearer {token}'
+            else:
+                self.logger.error("[ERROR]: Unable to refresh the token.")
+
+    def _handle_response(self, result: Dict, payload: Dict) -> bool:
         results = result.get("data", {}).get("results", [])
+        saved = any("id_plant" in item for item in results)
 
-        if any("id_plant" in item for item in results):
+        if saved:
             self.logger.info(f"Plant information saved: {payload.get('ID_PLANT')}")
         else:
             self.logger.error(f"[ERROR]: Plant information not saved (missing 'id_plant'): {payload.get('ID_PLANT')}")
@@ -64,3 +384,24 @@ class PostRequester:
         for item in results:
             if item.get("status") == "error" and "id_device" in item:
                 self.logger.error(f"[ERROR]: Device {item['id_device']} - {item.get('message', 'Unknown error')}")
+
+        return saved
+
+    def _handle_batch_response(self, result: Dict, batch: List[Dict]):
+        results = result.get("data", {}).get("results", [])
+        saved_plants = {str(item["id_plant"]) for item in results if "id_plant" in item}
+        plant_per_device = {str(micro.get("ID_DEVICE")): payload.get("ID_PLANT")
+                            for payload in batch for micro in payload.get("INFORMATION_MICRO_INVERTERS", [])}
+
+        for payload in batch:
+            if str(payload.get("ID_PLANT")) in saved_plants:
+                self.logger.info(f"Plant information saved: {payload.get('ID_PLANT')}")
+            else:
+                self.logger.error(f"[ERROR]: Plant information not saved (missing 'id_plant'): {payload.get('ID_PLANT')}")
+
+        for item in results:
+            if item.get("status") == "error" and "id_device" in item:
+                id_plant = plant_per_device.get(str(item["id_device"]))
+                self.logger.error(f"[ERROR]: Plant {id_plant} - Device {item['id_device']} - {item.get('message', 'Unknown error')}")
+
+        return saved_plants
@@ -1,53 +1,165 @@
-from dataclasses import dataclass
-from datetime import datetime
-from typing import List
+import json
+from dataclasses import dataclass, fields
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+from typing import ClassVar
 
-@dataclass
+DEVICES_KEY = "INFORMATION_MICRO_INVERTERS"
+
+
+def _encode_float(value: float) -> str:
+    # float.__repr__ matches the json module for finite values (NaN/Infinity are left to it)
+    return float.__repr__(value) if value - value == 0 else json.dumps(value)
+
+
+_ENCODERS = {
+    str: encode_basestring_ascii,
+    float: _encode_float,
+    int: int.__repr__,
+    bool: lambda value: "true" if value else "false",
+    type(None): lambda value: "null",
+}
+
+
+_encode_array = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def encode_value(value) -> str:
+    encoder = _ENCODERS.get(type(value))
+    return encoder(value) if encoder is not None else json.dumps(value, separators=(",", ":"))
+
+
+@dataclass(slots=True)
 class Microinverter:
+    """
+    Latest reading of a microinverter, in the ENRG field layout.
+
+    Only the fields read from Hoymiles are stored on the instance (__slots__, no per-device
+    __dict__); the ~20 fields ENRG expects but Hoymiles does not report are class-level
+    constants in CONSTANTS. FIELDS holds the full ENRG field order.
+
+    Methods:
+        get(name: str, default=None):
+            Returns a field (variable or constant), like dict.get().
+
+        to_dict() -> dict:
+            Returns every field in ENRG order.
+
+        to_json() -> str:
+            Returns the compact JSON object of the device, written directly from the
+            fields without building an intermediate dict.
+    """
+
     DATE: str
-    ID_DEVICE: int 
-    TEMPERATURE_INVERTER: float
-    VOLTAGE_1_DC: float
-    VOLTAGE_2_DC: float
-    VOLTAGE_3_DC: float
-    VOLTAGE_4_DC: float
-    VOLTAGE_5_DC: float
-    VOLTAGE_6_DC: float
-    VOLTAGE_7_DC: float
-    VOLTAGE_8_DC: float
-    CURRENT_1_DC: float
-    CURRENT_2_DC: float
-    CURRENT_3_DC: float
-    CURRENT_4_DC: float
-    CURRENT_5_DC: float
-    CURRENT_6_DC: float
-    CURRENT_7_DC: float
-    CURRENT_8_DC: float
-    VOLTAGE_1_AC: float
-    VOLTAGE_2_AC: float
-    VOLTAGE_3_AC: float
-    CURRENT_1_AC: float
-    CURRENT_2_AC: float
-    CURRENT_3_AC: float
-    IRRADIANCE: float
-    TEMPERATURE_PANEL: float
-    TEMPERATURE_ENVIRONMENT: float
-    TEMPERATURE_PCB: float
-    TYPE_INVERTER: int
-    POWER_FACTOR: float
-    TYPE_DEVICE: int
-    POWER_SNAPSHOT: float
-    GRID_FREQUENCY: float
-    HEATSINK_TEMPERATURE: float
-    APPARENT_POWER: float
-    REACTIVE_POWER: float
-    WIND_SPEED: float
-    WIND_DIRECTION: float
-    HUMIDITY: float
-    F1: float
-    F2: float
-    F3: float
-    F4: float
-
-    def to_dict(self):
-            return self.__dict__
\ No newline at end of file
+    ID_DEVICE: int
+    TEMPERATURE_INVERTER: float = 0.0
+    VOLTAGE_1_DC: float = 0.0
+    VOLTAGE_2_DC: float = 0.0
+    VOLTAGE_3_DC: float = 0.0
+    VOLTAGE_4_DC: float = 0.0
+    VOLTAGE_5_DC: float = 0.0
+    VOLTAGE_6_DC: float = 0.0
+    VOLTAGE_7_DC: float = 0.0
+    VOLTAGE_8_DC: float = 0.0
+    CURRENT_1_DC: float = 0.0
+    CURRENT_2_DC: float = 0.0
+    CURRENT_3_DC: float = 0.0
+    CURRENT_4_DC: float = 0.0
+    CURRENT_5_DC: float = 0.0
+    CURRENT_6_DC: float = 0.0
+    CURRENT_7_DC: float = 0.0
+    CURRENT_8_DC: float = 0.0
+    VOLTAGE_1_AC: float = 0.0
+    VOLTAGE_2_AC: float = 0.0
+    VOLTAGE_3_AC: float = 0.0
+    GRID_FREQUENCY: float = 0.0
+
+    CONSTANTS: ClassVar[dict] = {
+        "CURRENT_1_AC": 0.0,
+        "CURRENT_2_AC": 0.0,
+        "CURRENT_3_AC": 0.0,
+        "IRRADIANCE": 0.0,
+        "TEMPERATURE_PANEL": 0.0,
+        "TEMPERATURE_ENVIRONMENT": 0.0,
+        "TEMPERATURE_PCB": 0.0,
+        "TYPE_INVERTER": 9, #PREGUNTAR CUAL ES
+        "POWER_FACTOR": 0.0,
+        "TYPE_DEVICE": 0.0,
+        "POWER_SNAPSHOT": 0.0,
+        "HEATSINK_TEMPERATURE": 0.0,
+        "APPARENT_POWER": 0.0,
+        "REACTIVE_POWER": 0.0,
+        "WIND_SPEED": 0.0,
+        "WIND_DIRECTION": 0.0,
+        "HUMIDITY": 0.0,
+        "F1": 0.0,
+        "F2": 0.0,
+        "F3": 0.0,
+        "F4": 0.0,
+    }
+    FIELDS: ClassVar[tuple] = (
+        "DATE", "ID_DEVICE", "TEMPERATURE_INVERTER",
+        "VOLTAGE_1_DC", "VOLTAGE_2_DC", "VOLTAGE_3_DC", "VOLTAGE_4_DC",
+        "VOLTAGE_5_DC", "VOLTAGE_6_DC", "VOLTAGE_7_DC", "VOLTAGE_8_DC",
+        "CURRENT_1_DC", "CURRENT_2_DC", "CURRENT_3_DC", "CURRENT_4_DC",
+        "CURRENT_5_DC", "CURRENT_6_DC", "CURRENT_7_DC", "CURRENT_8_DC",
+        "VOLTAGE_1_AC", "VOLTAGE_2_AC", "VOLTAGE_3_AC",
+        "CURRENT_1_AC", "CURRENT_2_AC", "CURRENT_3_AC",
+        "IRRADIANCE", "TEMPERATURE_PANEL", "TEMPERATURE_ENVIRONMENT", "TEMPERATURE_PCB",
+        "TYPE_INVERTER", "POWER_FACTOR", "TYPE_DEVICE", "POWER_SNAPSHOT", "GRID_FREQUENCY",
+        "HEATSINK_TEMPERATURE", "APPARENT_POWER", "REACTIVE_POWER",
+        "WIND_SPEED", "WIND_DIRECTION", "HUMIDITY", "F1", "F2", "F3", "F4",
+    )
+
+    def get(self, name: str, default=None):
+        if name in self.CONSTANTS:
+            return self.CONSTANTS[name]
+
+        return getattr(self, name, default)
+
+    def to_dict(self) -> dict:
+        return {name: self.get(name) for name in self.FIELDS}
+
+    def to_json(self) -> str:
+        values = _variable_values(self)
+        # All the values are encoded by the C encoder in a single call and split back, unless
+        # a value contains a comma itself (e.g. a string), which is encoded one by one instead
+        encoded = _encode_array(values)[1:-1].split(",")
+
+        if len(encoded) != len(values):
+            encoded = map(encode_value, values)
+
+        return _JSON_TEMPLATE % tuple(encoded)
+
+
+_VARIABLE_FIELDS = tuple(field.name for field in fields(Microinverter))
+_variable_values = attrgetter(*_VARIABLE_FIELDS)
+_JSON_TEMPLATE = "{" + ",".join(
+    f"{encode_basestring_ascii(name)}:"
+    + ("%s" if name in _VARIABLE_FIELDS else encode_value(Microinverter.CONSTANTS[name]).replace("%", "%%"))
+    for name in Microinverter.FIELDS) + "}"
+
+
+def _encode_device(device) -> str:
+    if isinstance(device, Microinverter):
+        return device.to_json()
+
+    return json.dumps(device, separators=(",", ":"))
+
+
+def dumps_payload(payload: dict) -> bytes:
+    """
+    Returns the compact UTF-8 JSON of a plant payload. The devices of INFORMATION_MICRO_INVERTERS
+    may be Microinverter records (written with Microinverter.to_json()) or plain dicts. The bytes
+    are the same as json.dumps() of the payload with dict devices (compact separators), whether
+    orjson is installed or not: orjson writes some floats (1e-05) and non-ASCII text differently.
+    """
+    devices = payload.get(DEVICES_KEY)
+
+    if devices is None:
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    head = json.dumps({key: value for key, value in payload.items() if key != DEVICES_KEY}, separators=(",", ":"))
+    separator = "," if len(head) > 2 else ""
+
+    return f'{head[:-1]}{separator}"{DEVICES_KEY}":[{",".join(map(_encode_device, devices))}]}}'.encode("utf-8")
@@ -0,0 +1,164 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+from App.enrg.send_data import PostRequester
+from App.reports import HoymileReport
+from utils.tracing import with_context
+
+_END = object()
+
+
+@dataclass
+class StreamingPipeline:
+    """
+    StreamingPipeline sends each plant to ENRG as soon as its data is ready, instead of
+    fetching the whole fleet before building and uploading any payload.
+
+    Every plant flows through three stages connected by bounded queues:
+    - fetch: a pool of `fetch_workers` threads collects the plants (HoymileReport._collect_plant).
+    - transform: stores the raw readings, keeps the latest reading (HoymileReport._order_plant)
+      and builds the plant payload (HoymileReport.create_payload).
+    - upload: `sender.workers` threads send the payloads (PostRequester.send_batch) and
+      commit the reading cursor of every plant saved by ENRG or kept in the outbox. Each
+      request packs the payloads already waiting in the queue, up to `sender.batch_size`,
+      so UPLOAD_BATCH_SIZE and UPLOAD_GZIP apply as in a batch upload.
+
+    The queues hold at most `queue_size` items, so a slow stage throttles the previous one
+    and memory stays bounded. Unlike order_information_plants(), a plant that cannot be
+    consulted is logged and skipped without discarding the rest of the fleet.
+
+    Attributes:
+        logger (logging.Logger): Logger instance used for logging the pipeline.
+        hoymiles (HoymileReport): Report used to collect, order and build the payloads.
+        sender (PostRequester): Requester used to upload the payloads.
+        fetch_workers (int): Number of plants collected at the same time.
+        queue_size (int): Capacity of each queue between stages.
+
+    Methods:
+        run() -> int:
+            Runs the pipeline over every cached plant and returns the number of payloads saved
+            by ENRG. The plants whose upload failed or raised are logged.
+    """
+
+    logger: logging.Logger
+    hoymiles: HoymileReport
+    sender: PostRequester
+    fetch_workers: int = 4
+    queue_size: int = 16
+
+    def run(self) -> int:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        all_microinverters = self.hoymiles.get_list_microinverters_per_plant()
+        plant_queue = queue.Queue(maxsize=self.queue_size)
+        payload_queue = queue.Queue(maxsize=self.queue_size)
+        sent = []
+        failed = []
+
+        transformer = threading.Thread(target=with_context(self._transform), args=(plant_queue, payload_queue, current_date),
+                                       name="pipeline-transform")
+        uploaders = [threading.Thread(target=with_context(self._upload), args=(payload_queue, sent, failed), name=f"pipeline-upload-{index}")
+                     for index in range(max(1, self.sender.workers))]
+        transformer.start()
+
+        for uploader in uploaders:
+            uploader.start()
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.fetch_workers)) as executor:
+                for plant in all_microinverters:
+                    executor.submit(with_context(self._fetch), plant, current_date, plant_queue)
+        finally:
+            plant_queue.put(_END)
+            transformer.join()
+
+            for uploader in uploaders:
+                uploader.join()
+
+        self.logger.info(f"Pipeline finished: {len(sent)} of {len(all_microinverters)} plants sent")
+
+        if failed:
+            self.logger.error(f"Pipeline uploads failed for {len(failed)} plants: {failed}")
+
+        return len(sent)
+
+    def _fetch(self, plant: dict, current_date: str, plant_queue: queue.Queue) -> None:
+        try:
+            plant_data = self.hoymiles._collect_plant(plant, current_date)
+        except Exception as ex:
+            self.logger.error(f"Error while asking for the data of the plant {plant.get('id_plant')}: {ex}")
+            return
+
+        if plant_data is None:
+            self.logger.error(f"Plant {plant.get('id_plant')} skipped, its microinverters could not be consulted")
+            return
+
+        plant_queue.put(plant_data)
+
+    def _transform(self, plant_queue: queue.Queue, payload_queue: queue.Queue, current_date: str) -> None:
+        while True:
+            plant_data = plant_queue.get()
+
+            if plant_data is _END:
+                for _ in range(max(1, self.sender.workers)):
+                    payload_queue.put(_END)
+                return
+
+            try:
+                if self.hoymiles.store is not None:
+                    self.hoymiles.store.save_plants([plant_data], current_date)
+
+                self.hoymiles._order_plant(plant_data, current_date)
+
+                for payload in self.hoymiles.create_payload([plant_data]):
+                    payload_queue.put(payload)
+
+            except Exception as ex:
+                self.logger.error(f"Error while building the payload of the plant {plant_data.get('id_plant')}: {ex}")
+
+    def _upload(self, payload_queue: queue.Queue, sent: list, failed: list) -> None:
+        while True:
+            batch, finished = self._next_batch(payload_queue)
+
+            if batch:
+                self._upload_batch(batch, sent, failed)
+
+            if finished:
+                return
+
+    def _next_batch(self, payload_queue: queue.Queue) -> tuple:
+        # Waits for one payload, then takes the ones already queued up to the batch size
+        batch = []
+
+        while len(batch) < max(1, self.sender.batch_size):
+            try:
+                payload = payload_queue.get(block=not batch)
+            except queue.Empty:
+                break
+
+            if payload is _END:
+                return batch, True
+
+            batch.append(payload)
+
+        return batch, False
+
+    def _upload_batch(self, batch: list, sent: list, failed: list) -> None:
+        try:
+            saved_plants, stored_plants = self.sender.send_batch(batch)
+        except Exception as ex:
+            self.logger.error(f"Error while uploading the plants {[payload.get('ID_PLANT') for payload in batch]}: {ex}")
+            failed.extend(payload.get("ID_PLANT") for payload in batch)
+            return
+
+        for payload in batch:
+            if str(payload.get("ID_PLANT")) in saved_plants:
+                sent.append(payload.get("ID_PLANT"))
+            else:
+                failed.append(payload.get("ID_PLANT"))
+
+        if self.hoymiles.cursor is not None:
+            self.hoymiles.cursor.commit(saved_plants | stored_plants)
@@ -1,15 +1,28 @@
 from dataclasses import dataclass
 import logging
-import requests
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
+from typing import Optional
 from App.models.microinverters import Microinverter
+from App.storage.cursor import ReadingCursor, latest_reading
+from App.storage.readings import ReadingStore
+from App.storage.topology import TopologyCache
 from utils.configHandler import ConfigHandler
-import pytz
 import os
-import json
-
-from utils.helper import HelperReport
+import pytz
+import requests
+import threading
+import zlib
+
+from utils import jsonCodec
+from utils.circuitBreaker import CircuitBreakers
+from utils.httpClient import HttpClient
+from utils.metrics import Metrics
+from utils.rateLimiter import RateLimiter
+from utils.runContext import RunContext
+from utils.sharding import Shard
+from utils.solar import SolarSchedule
+from utils.tracing import Tracer, span
 
 @dataclass
 class HoymileReport:
@@ -28,30 +41,109 @@ class HoymileReport:
         logger (logging.Logger): Logger instance for capturing logs and errors.
         config_data (ConfigHandler): Configuration object with API URLs, retry policies, etc.
         key (str): API key for authenticating requests.
+        account (str): Name of the Hoymiles account of `key` ("" for the default account). It
+            names the topology snapshots of the account (plants.<account>.json, ...) and its
+            endpoint circuits, so several accounts can be collected side by side.
         hour (int): Current hour used to determine cache refresh logic.
+        rate_limiter (RateLimiter): Token bucket shared by every call to the API (built from config if omitted).
+        http_client (HttpClient): Pooled HTTP client used for every call (built from config if omitted).
+        cursor (ReadingCursor): Optional per-microinverter cursor; when set, only readings newer
+            than the cursor are processed and unchanged microinverters are skipped.
+        store (ReadingStore): Optional SQLite store where the raw series of every microinverter
+            is saved as soon as it is fetched (only its latest point is kept in memory), along
+            with the totals and statuses of every run.
+        run_context (RunContext): Parsed settings, endpoints, headers and payload timestamp of
+            the run (built from config_data if omitted). Replace it to start a new run.
+        metrics (Metrics): Optional registry where the latency, outcome and size of every
+            Hoymiles request and the collection time of every plant are recorded.
+        tracer (Tracer): Optional tracer recording the plant, device, lookup and HTTP attempt
+            spans of the run.
+        breakers (CircuitBreakers): Optional circuit breakers of the endpoints and plants. Calls
+            to an open endpoint fail fast, and a plant that cannot be collected (or whose circuit
+            is open) is reported as degraded and left out of the run instead of aborting it.
+        shard (Shard): Optional slice of the fleet collected by this process. Only its plants
+            are collected, and only the leader shard refreshes the topology snapshot.
+        solar (SolarSchedule): Optional sunrise and sunset schedule. Between dusk and dawn the
+            mi_data_day calls of a plant are skipped and only its total energy and status are
+            collected (NIGHT_MODE), marking the plant data with "night".
         MAX_RETRIES (int): Max attempts to retry API calls on failure (set during initialization).
 
     Methods:
         __post_init__():
-            Loads MAX_RETRIES from configuration.
+            Loads MAX_RETRIES, the rate limiter and the HTTP client from configuration,
+            and builds the request headers and endpoint URLs once from the run context.
 
         get_list_plants() -> list:
-            Retrieves a list of solar plants from the Hoymiles API.
-            Caches results in a local JSON file and refreshes data based on the current hour.
+            Returns the cached list of solar plants, fetching it from the Hoymiles API
+            only when there is no snapshot yet.
 
         get_list_microinverters_per_plant() -> list:
-            For each plant, retrieves the list of microinverter serial numbers.
-            Caches results and refreshes them based on the configured hour.
-
-        get_data_microinverters_per_plant() -> list:
+            Returns the cached microinverter serial numbers of each plant, stored in descending
+            order so that every run collects them already ordered. When the snapshot
+            is stale (TOPOLOGY_TTL) or the hour equals JSON_TIME, a refresh is started in the
+            background while the previous snapshot keeps being served. With a shard, only
+            the plants of the shard are returned and only the leader starts refreshes.
+
+        refresh_topology(full: bool = False) -> list:
+            Fetches the plant list and diffs it against the cached snapshot: findDevsByStation
+            is only called for new plants and for the rotating slice of known plants due today
+            (every plant is rechecked once per TOPOLOGY_RECHECK_DAYS), removed plants are evicted.
+            Both snapshots are replaced atomically; on failure the previous one is kept.
+            `full` rechecks every plant. Can be called on demand.
+
+        start_topology_refresh() / wait_topology_refresh():
+            Starts refresh_topology() in a background thread / waits for it to finish.
+
+        get_data_microinverters_per_plant(plants: Optional[list] = None) -> list:
             For each plant and its microinverters, retrieves generation data,
-            total energy, and plant status.
+            total energy, and plant status. `plants` defaults to the cached plant list.
+
+        _request(url: str, data_req: dict, context: str = "") -> Optional[dict]:
+            Sends a POST request to the Hoymiles API paced by the rate limiter, retrying
+            up to MAX_RETRIES times with exponential backoff on connection errors, timeouts,
+            HTTP errors or non-"0" status. Returns the decoded response or None when every
+            attempt failed.
+
+        _collect_plant(plant: dict, current_date: str) -> Optional[dict]:
+            Collects the generation data, total energy and status of a single plant.
+            Returns None if any microinverter could not be consulted.
+
+        _collect_plant_safe(plant: dict, current_date: str) -> Optional[dict]:
+            Same as _collect_plant(), but an unexpected error fails only that plant (None).
+
+        _collect_night_plant(plant: dict) -> Optional[dict]:
+            Collects a plant at night: its total energy and status, and with NIGHT_MODE = zeros
+            its microinverters without readings. No mi_data_day call is made.
+
+        _merge_plants(all_data_microinverters: list) -> list:
+            Drops the degraded plants (None) when circuit breakers are set; otherwise a single
+            missing plant empties the whole result.
 
         __get_total_energy(id_plant: int) -> str:
             Retrieves the total energy generated for a given plant ID.
 
         __get_plant_status(id_plant: int) -> dict:
             Retrieves the status of a given plant (e.g., online/offline).
+
+        create_payload(plant_data: list[dict]) -> list[dict]:
+            Builds one ENRG payload per plant, stamped with the run context timestamp.
+
+        _build_payloads(plant_data: list[dict], date_str_formatted: str) -> list[dict]:
+            Builds the payloads of create_payload() with Microinverter records.
+
+        order_information_plants() -> list:
+            Collects every plant and keeps only the latest reading of each microinverter.
+            With a cursor, microinverters without new readings are dropped.
+
+        _order_plants(data: list, current_date_formatted: str) -> list:
+            Saves the collected plants to the store and orders each of them with _order_plant().
+
+        _order_plant(plant: dict, current_date: str) -> dict:
+            Keeps the latest reading of each microinverter of a single plant (a single pass
+            over the "HH:MM" times). With a cursor, microinverters without new readings are
+            dropped and the new positions are staged, to be committed once the plant is
+            delivered. A plant left without microinverters is kept, so its generation and
+            status are still sent.
     """
 
 
@@ -59,281 +151,492 @@ class HoymileReport:
     config_data: ConfigHandler
     key: str
     hour: int
+    account: str = ""
+    rate_limiter: Optional[RateLimiter] = None
+    http_client: Optional[HttpClient] = None
+    cursor: Optional[ReadingCursor] = None
+    store: Optional[ReadingStore] = None
+    run_context: Optional[RunContext] = None
+    metrics: Optional[Metrics] = None
+    tracer: Optional[Tracer] = None
+    breakers: Optional[CircuitBreakers] = None
+    shard: Optional[Shard] = None
+    solar: Optional[SolarSchedule] = None
 
     def __post_init__(self):
-        self.MAX_RETRIES = int(self.config_data.get_retries())
+        if self.run_context is None:
+            self.run_context = RunContext.from_config(self.config_data)
 
-    def get_list_plants(self) -> list:
-        all_plants = []
-        next_page = 1
+        self.MAX_RETRIES = self.run_context.max_retries
 
-        get_plant_list = self.config_data.get_plant_list()
-        key = self.key
-        url = self.config_data.get_url() + get_plant_list + "key=" + key
+        if self.rate_limiter is None:
+            self.rate_limiter = RateLimiter.from_config(self.config_data)
 
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "*/*"
-        }
+        if self.http_client is None:
+            self.http_client = HttpClient.from_config(self.config_data)
 
-        try:
+        topology_ttl = self.config_data.get_topology_ttl()
+        self.plants_cache = TopologyCache(self.logger, self._account_file(self.config_data.get_plants_file()), topology_ttl)
+        self.micros_cache = TopologyCache(self.logger, self._account_file(self.config_data.get_micros_file()), topology_ttl)
+        self._refresh_lock = threading.Lock()
+        self._refresh_guard = threading.Lock()
+        self._refresh_thread = None
+        self._sorted_topology = None
 
-            name_file = "plants.json"
+        self.headers = dict(self.run_context.hoymiles_headers)
+        self.urls = {name: self._build_url(name)
+                     for name in ("plant_list", "specified_plant", "data_microinverter", "total_energy", "plant_status")}
+        # Metrics label of every URL: the last segment of its path (e.g. mi_data_day)
+        self.endpoint_names = {url: self.run_context.endpoints[name].split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+                               for name, url in self.urls.items()}
 
-            if self.hour == int(self.config_data.get_json_time()):
+    def _account_file(self, path: str) -> str:
+        if not self.account:
+            return path
 
-                if os.path.exists(name_file):
-                    os.remove(name_file)
+        root, extension = os.path.splitext(path)
+        return f"{root}.{self.account}{extension}"
 
-                while next_page is not None:
-                    data_req = {"next": next_page}
+    def _circuit(self, endpoint: str) -> str:
+        return f"{self.account}/{endpoint}" if self.account else endpoint
 
-                    for attempt in range(1, self.MAX_RETRIES + 1):
-                        response = requests.post(
-                            url, headers=headers, json=data_req)
+    def _build_url(self, endpoint: str) -> str:
+        endpoints = self.run_context.endpoints
+        return endpoints["url"] + endpoints[endpoint] + "key=" + self.key
 
-                        if response.status_code != 200:
-                           
-                            self.logger.error(
-                                f"Error {response.status_code}: {response}")
-                            time.sleep(6)
-                            continue
+    def _request(self, url: str, data_req: dict, context: str = "") -> Optional[dict]:
+        endpoint = self.endpoint_names.get(url, url)
 
-                        data = response.json()
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            if self.breakers is not None and not self.breakers.allow_endpoint(self._circuit(endpoint)):
+                self._short_circuit(endpoint)
+                return None
 
-                        if data["status"] != "0":
-                            self.logger.error(
-                                f"Error in the consult: {data['message']} with status {data['status']}")
-                            time.sleep(6)
-                            continue
+            self.rate_limiter.acquire()
+            body = jsonCodec.dumps(data_req)
+            start = time.perf_counter()
+
+            try:
+                response = self.http_client.post(
+                    url, headers=self.headers, data=body)
+            except requests.RequestException as ex:
+                # Timeouts and connection errors spend an attempt like any other failure
+                self._observe(endpoint, attempt, start, "error", body)
+                self.logger.error(f"Request to {endpoint} failed: {ex}{context}")
+                self._wait_before_retry(attempt, None, endpoint)
+                continue
+
+            if response.status_code != 200:
+                self._observe(endpoint, attempt, start, f"http_{response.status_code}", body, response)
+                self.logger.error(
+                    f"Error {response.status_code}: {response}")
+                self._wait_before_retry(attempt, response, endpoint)
+                continue
 
+            data = jsonCodec.loads(response.content)
 
-                        stations = data.get("data", {}).get("stations", [])
+            if data["status"] != "0":
+                self._observe(endpoint, attempt, start, "api_error", body, response)
+                self.logger.error(
+                    f"Error in the consult: {data['message']} with status {data['status']}{context}")
+                self._wait_before_retry(attempt, response, endpoint)
+                continue
 
-                        for entry in stations:
-                            all_plants.append({"id_plant": entry.get(
-                                "id"), "plant_name": entry.get("station_name")})
+            self._observe(endpoint, attempt, start, "ok", body, response)
+            return data
 
-                        next_page = data.get("data", {}).get("next", None)
+        if self.metrics is not None:
+            self.metrics.count_failure(endpoint)
 
-                        if not stations or next_page is None:
-                          
-                            output_file = "plants.txt"
-                            current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                            with open(output_file, "a", encoding="utf-8") as plants_file:
-                                plants_file.write(current_date + '\n')
-                                for plant in all_plants:
-                                    plants_file.write(
-                                        f'{plant["id_plant"]}, {plant["plant_name"]}\n')
-                                plants_file.write('\n')
+        return None
 
-                            with open(name_file, "w", encoding="utf-8") as file:
-                                json.dump(all_plants, file, indent=4,
-                                          ensure_ascii=False)
+    def _observe(self, endpoint: str, attempt: int, start: float, outcome: str, body: bytes, response=None) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_request(endpoint, time.perf_counter() - start, outcome, len(body),
+                                         0 if response is None else len(response.content))
 
-                            return all_plants
+        if self.tracer is not None:
+            self.tracer.complete(endpoint, start, "http", attempt=attempt, outcome=outcome)
 
-                        time.sleep(6)
-                        break
+        if self.breakers is not None:
+            # An answer with an API error still proves the endpoint is up
+            self.breakers.record_endpoint(self._circuit(endpoint), outcome in ("ok", "api_error"))
 
-                    else:
-                        self.logger.error(
-                            f"Unable to consult the list of plants, maximum number of attempts made. Max retries = {self.MAX_RETRIES}")
-                        return []
-            else:
-                if os.path.exists(name_file):
-                    with open("plants.json", "r", encoding="utf-8") as file:
-                        return json.load(file)  # No escapa caracteres Unicode
+    def _short_circuit(self, endpoint: str) -> None:
+        if self.metrics is not None:
+            self.metrics.count_short_circuit(endpoint)
 
-                else:
-                    return []
+        if self.tracer is not None:
+            self.tracer.complete(endpoint, time.perf_counter(), "http", outcome="circuit_open")
+
+    def _wait_before_retry(self, attempt: int, response, endpoint: str = "") -> None:
+        if self.breakers is not None and self.breakers.endpoint_open(self._circuit(endpoint)):
+            return
+
+        if self.metrics is not None and attempt < self.MAX_RETRIES:
+            self.metrics.count_retry(endpoint)
+
+        retry_after = None if response is None else self.rate_limiter.parse_retry_after(
+            response.headers.get("Retry-After"))
+
+        with span(self.tracer, "backoff", "retry", endpoint=endpoint, attempt=attempt):
+            if retry_after is not None:
+                self.logger.info(f"Hoymiles asked to wait {retry_after:.1f}s before retrying")
+                self.rate_limiter.throttle(retry_after)
+            elif attempt < self.MAX_RETRIES:
+                time.sleep(self.rate_limiter.backoff(attempt))
+
+    def get_list_plants(self) -> list:
+        all_plants = self.plants_cache.load()
+
+        if all_plants is not None:
+            return all_plants
+
+        return self._fetch_plants() or []
+
+    def _fetch_plants(self) -> Optional[list]:
+        all_plants = []
+        next_page = 1
+
+        url = self.urls["plant_list"]
+
+        try:
+
+            while next_page is not None:
+                data_req = {"next": next_page}
+
+                data = self._request(url, data_req)
+
+                if data is None:
+                    self.logger.error(
+                        f"Unable to consult the list of plants, maximum number of attempts made. Max retries = {self.MAX_RETRIES}")
+                    return None
+
+                stations = data.get("data", {}).get("stations", [])
+
+                for entry in stations:
+                    all_plants.append({"id_plant": entry.get(
+                        "id"), "plant_name": entry.get("station_name"), **self._plant_location(entry)})
+
+                next_page = data.get("data", {}).get("next", None)
+
+                if not stations or next_page is None:
+
+                    output_file = self._account_file("plants.txt")
+                    current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    with open(output_file, "a", encoding="utf-8") as plants_file:
+                        plants_file.write(current_date + '\n')
+                        for plant in all_plants:
+                            plants_file.write(
+                                f'{plant["id_plant"]}, {plant["plant_name"]}\n')
+                        plants_file.write('\n')
+
+                    self.plants_cache.write(all_plants)
+
+                    return all_plants
 
         except Exception as ex:
             self.logger.error(f"Error while asking for plants {ex}")
-            return []
+            return None
+
+    @staticmethod
+    def _plant_location(entry: dict) -> dict:
+        # Coordinates are kept in the snapshots only when the plant list reports them
+        return {name: entry.get(name) for name in ("latitude", "longitude") if entry.get(name) not in (None, "")}
 
     def get_list_microinverters_per_plant(self) -> list:
+        all_microinverters = self.micros_cache.load()
 
-        all_microinverters = []
-        micros_per_plant = self.config_data.get_specified_plant()
-        key = self.key
-        url = self.config_data.get_url() + micros_per_plant + "key=" + key
+        if all_microinverters is None:
+            return self._own_plants(self.refresh_topology())
 
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "*/*"
-        }
+        if all_microinverters is not self._sorted_topology:
+            # Snapshots written before the serial numbers were stored sorted are ordered once per load
+            for plant in all_microinverters:
+                plant["micros_id"].sort(reverse=True)
 
-        all_plants = self.get_list_plants()
-        try:
+            self._sorted_topology = all_microinverters
+
+        if (self.shard is None or self.shard.leader) and self._topology_refresh_due():
+            self.start_topology_refresh()
+
+        return self._own_plants(all_microinverters)
+
+    def _own_plants(self, all_microinverters: list) -> list:
+        if self.shard is None or self.shard.count == 1:
+            return all_microinverters
+
+        return [plant for plant in all_microinverters if self.shard.owns(plant.get("id_plant"))]
+
+    def _topology_refresh_due(self) -> bool:
+        if self.micros_cache.is_stale():
+            return True
 
-            name_file = "micros_id.json"
+        age = self.micros_cache.age()
+        return self.hour == int(self.config_data.get_json_time()) and age is not None and age > 3600
 
-            if self.hour == int(self.config_data.get_json_time()):
+    def start_topology_refresh(self) -> None:
+        with self._refresh_guard:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
 
-                if os.path.exists(name_file):
-                    os.remove(name_file)
+            self.logger.info("Refreshing the plant topology in the background")
+            self._refresh_thread = threading.Thread(
+                target=self.refresh_topology, name="topology-refresh")
+            self._refresh_thread.start()
 
-                for plant in all_plants:
-                    proy_id = plant.get("id_plant")
+    def wait_topology_refresh(self) -> None:
+        thread = self._refresh_thread
 
-                    data_req = {"id": proy_id}
-                    for attempt in range(1,  self.MAX_RETRIES + 1):
-                        response = requests.post(
-                            url, headers=headers, json=data_req)
+        if thread is not None:
+            thread.join()
 
-                        if response.status_code != 200:
-                            
-                            self.logger.error(
-                                f"Error {response.status_code}: {response}")
-                            time.sleep(6)
-                            continue
+    def refresh_topology(self, full: bool = False) -> list:
+        with self._refresh_lock:
+            previous = None if full else self.micros_cache.load()
+            all_plants = self._fetch_plants()
+            all_microinverters = None if all_plants is None else self._fetch_microinverters(all_plants, previous)
 
-                        data = response.json()
+            if all_microinverters is None:
+                self.logger.error("Topology refresh failed, keeping the previous snapshot")
+                return self.micros_cache.load() or []
 
-                        if data["status"] != "0":
-                            self.logger.error(
-                                f"Error in the consult: {data['message']} with status {data['status']} in the plant with id: {proy_id}")
-                            time.sleep(6)
-                            continue
+            self.micros_cache.write(all_microinverters)
+            self.logger.info(f"Topology refreshed: {len(all_microinverters)} plants")
 
-                        time.sleep(6)
-                        break
-                    else:
-                        self.logger.error(
-                            f"Unable to consult the list of plants, maximum number of attempts made. Max retries ={self.MAX_RETRIES}")
-                        return []
+            return all_microinverters
 
-                    micro_datas = list({item.get("mi_sn") for item in data.get(
-                        "data", {}).get("micro_datas", [])})
+    def _plants_to_recheck(self, all_plants: list, previous: Optional[list]) -> set:
+        if previous is None:
+            return {plant.get("id_plant") for plant in all_plants}
 
+        known_plants = {plant.get("id_plant") for plant in previous}
+        period = max(1, self.config_data.get_topology_recheck_days())
+        day_slot = datetime.now().toordinal() % period
 
+        return {plant.get("id_plant") for plant in all_plants
+                if plant.get("id_plant") not in known_plants
+                or zlib.crc32(str(plant.get("id_plant")).encode()) % period == day_slot}
+
+    def _fetch_microinverters(self, all_plants: list, previous: Optional[list] = None) -> Optional[list]:
+
+        all_microinverters = []
+        url = self.urls["specified_plant"]
+        previous_micros = {plant.get("id_plant"): plant.get("micros_id") for plant in previous or []}
+        plants_to_recheck = self._plants_to_recheck(all_plants, previous)
+
+        try:
+
+            for plant in all_plants:
+                proy_id = plant.get("id_plant")
+
+                if proy_id not in plants_to_recheck:
                     all_microinverters.append({"id_plant": proy_id, "plant_name": plant.get(
-                        "plant_name"), "micros_id": micro_datas})
+                        "plant_name"), "micros_id": sorted(previous_micros[proy_id], reverse=True), **self._plant_location(plant)})
+                    continue
 
-                with open(name_file, "w", encoding="utf-8") as file:
-                    json.dump(all_microinverters, file,
-                              indent=4, ensure_ascii=False)
+                data_req = {"id": proy_id}
+                data = self._request(
+                    url, data_req, f" in the plant with id: {proy_id}")
 
-                return all_microinverters
+                if data is None:
+                    self.logger.error(
+                        f"Unable to consult the list of plants, maximum number of attempts made. Max retries ={self.MAX_RETRIES}")
+                    return None
 
-            else:
-                if os.path.exists(name_file):
-                    with open("micros_id.json", "r", encoding="utf-8") as file:
-                        return json.load(file)  # No escapa caracteres Unicode
-                else:
-                    return []
+                micro_datas = sorted({item.get("mi_sn") for item in data.get(
+                    "data", {}).get("micro_datas", [])}, reverse=True)
+
+
+                all_microinverters.append({"id_plant": proy_id, "plant_name": plant.get(
+                    "plant_name"), "micros_id": micro_datas, **self._plant_location(plant)})
+
+            current_plants = {plant.get("id_plant") for plant in all_plants}
+            evicted_plants = [id_plant for id_plant in previous_micros if id_plant not in current_plants]
+            self.logger.info(
+                f"Topology diff: {len(plants_to_recheck)} plants queried, "
+                f"{len(all_plants) - len(plants_to_recheck)} reused, {len(evicted_plants)} evicted {evicted_plants}")
+
+            return all_microinverters
 
         except Exception as ex:
             self.logger.error(f"Error while asking for plants {ex}")
-            return []
+            return None
 
-    def get_data_microinverters_per_plant(self) -> list:
+    def get_data_microinverters_per_plant(self, plants: Optional[list] = None) -> list:
         all_data_microinverters = []
-        current_date = datetime.now()
-        current_date_formatted = current_date.strftime("%Y-%m-%d")
-
-        micros_per_plant = self.config_data.get_data_microinverter()
-        key = self.key
-        url = self.config_data.get_url() + micros_per_plant + "key=" + key
-       
+        current_date_formatted = datetime.now().strftime("%Y-%m-%d")
 
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "*/*"
-        }
-        all_microinverters = self.get_list_microinverters_per_plant()
+        all_microinverters = self.get_list_microinverters_per_plant() if plants is None else plants
 
         try:
-            for plants in all_microinverters:
-                data_microinverters = []
-                for microinverters in plants.get("micros_id"):
-                    data_req = {
-                        "station_id": plants.get("id_plant"),
-                        "date": current_date_formatted,
-                        "sn": microinverters
-                    }
-                    for attempt in range(1, self.MAX_RETRIES + 1):
-
-                        response = requests.post(
-                            url, headers=headers, json=data_req)
-                        if response.status_code != 200:
-                           
-                            self.logger.error(
-                                f"Error {response.status_code}: {response}")
-                            time.sleep(6)
-                            continue
-
-                        data = response.json()
-
-                        if data["status"] != "0":
-                            self.logger.error(
-                                f"Error in the consult: {data['message']} with status {data['status']} in the plant with id: {plants.get('id_plant')}")
-                            time.sleep(6)
-                            continue
-
-                        time.sleep(6)
-                        data_microinverters.append(
-                            {"id_micro": microinverters, "generation": data.get("data")})
-                        break
-                    else:
-                        self.logger.error(
-                            f"Unable to consult the list microinverters per plant, maximum number of attempts made. Max retries ={self.MAX_RETRIES}")
-                        return []
-
-                total_energy_per_plant = self.__get_total_energy(
-                    plants.get("id_plant"))
-                plant_status = self.__get_plant_status(plants.get("id_plant"))
-
-                all_data_microinverters.append({"id_plant": plants.get("id_plant"), "name_plant": plants.get(
-                    "plant_name"), "total_energy": total_energy_per_plant, "plant_status": plant_status, "data_inverters": data_microinverters})
-
-           
-
-            return all_data_microinverters
-        
+            for plant in all_microinverters:
+                plant_data = self._collect_plant_safe(plant, current_date_formatted)
+
+                if plant_data is None and self.breakers is None:
+                    return []
+
+                all_data_microinverters.append(plant_data)
+
+            return self._merge_plants(all_data_microinverters)
+
         except Exception as ex:
             self.logger.error(
                 f"Error while asking for microinverters data {ex}")
             return []
 
-    def __get_total_energy(self, id_plant: int) -> str:
+    def _collect_plant_safe(self, plant: dict, current_date: str) -> Optional[dict]:
+        try:
+            return self._collect_plant(plant, current_date)
+        except Exception as ex:
+            self.logger.error(f"Error while collecting the plant {plant.get('id_plant')}: {ex}")
+            self._plant_failed(plant.get("id_plant"))
+            return None
+
+    def _collect_plant(self, plant: dict, current_date: str) -> Optional[dict]:
+        id_plant = plant.get("id_plant")
+        data_microinverters = []
+        start = time.perf_counter()
+
+        with span(self.tracer, "plant", "plant", plant=id_plant, devices=len(plant.get("micros_id"))) as plant_span:
+            if not self._plant_allowed(id_plant):
+                plant_span["outcome"] = "degraded"
+                return None
+
+            if self._is_night(plant):
+                plant_data = self._collect_night_plant(plant)
+                plant_span["outcome"] = "failed" if plant_data is None else "night"
+                return plant_data
+
+            for microinverter in plant.get("micros_id"):
+                data_microinverter = self._get_generation(
+                    id_plant, microinverter, current_date)
+
+                if data_microinverter is None:
+                    self._plant_failed(id_plant)
+                    plant_span["outcome"] = "failed"
+                    return None
+
+                data_microinverters.append(data_microinverter)
+
+            total_energy_per_plant, plant_status = self._get_plant_summary(id_plant)
+
+            if not self._plant_succeeded(id_plant, total_energy_per_plant, plant_status):
+                plant_span["outcome"] = "failed"
+                return None
+
+            plant_span["outcome"] = "ok"
+
+        if self.metrics is not None:
+            self.metrics.observe_plant(id_plant, time.perf_counter() - start)
+
+        return self._build_plant_data(plant, total_energy_per_plant, plant_status, data_microinverters)
+
+    def _is_night(self, plant: dict) -> bool:
+        return self.solar is not None and self.solar.is_night(plant)
+
+    def _collect_night_plant(self, plant: dict) -> Optional[dict]:
+        id_plant = plant.get("id_plant")
+        total_energy_per_plant, plant_status = self._get_plant_summary(id_plant)
+
+        if not self._plant_succeeded(id_plant, total_energy_per_plant, plant_status):
+            return None
+
+        data_microinverters = [] if self.solar.night_mode == "status" else [
+            {"id_micro": microinverter, "generation": []} for microinverter in plant.get("micros_id")]
+        plant_data = self._build_plant_data(plant, total_energy_per_plant, plant_status, data_microinverters)
+        plant_data["night"] = True
+
+        return plant_data
 
-        url_total_energy_plant = self.config_data.get_total_energy()
-        key = self.key
-        url = self.config_data.get_url() + url_total_energy_plant + "key=" + key
+    def _plant_allowed(self, id_plant) -> bool:
+        if self.breakers is None or self.breakers.allow_plant(id_plant):
+            return True
 
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "*/*"
+        self._report_degraded(id_plant, "its circuit is open")
+        return False
+
+    def _plant_failed(self, id_plant) -> None:
+        if self.breakers is not None:
+            self.breakers.record_plant(id_plant, False)
+            self._report_degraded(id_plant, "its data could not be consulted")
+
+    def _plant_succeeded(self, id_plant, total_energy, plant_status) -> bool:
+        if self.breakers is None:
+            return True
+
+        if total_energy is None or plant_status is None:
+            self._plant_failed(id_plant)
+            return False
+
+        self.breakers.record_plant(id_plant, True)
+        return True
+
+    def _report_degraded(self, id_plant, reason: str) -> None:
+        self.logger.warning(f"Plant {id_plant} degraded and skipped in this run: {reason}")
+
+        if self.metrics is not None:
+            self.metrics.count_degraded(id_plant)
+
+    def _merge_plants(self, all_data_microinverters: list) -> list:
+        if self.breakers is not None:
+            return [plant_data for plant_data in all_data_microinverters if plant_data is not None]
+
+        if any(plant_data is None for plant_data in all_data_microinverters):
+            return []
+
+        return list(all_data_microinverters)
+
+    def _build_plant_data(self, plant: dict, total_energy, plant_status, data_microinverters: list) -> dict:
+        return {"id_plant": plant.get("id_plant"), "name_plant": plant.get(
+            "plant_name"), "total_energy": total_energy, "plant_status": plant_status, "data_inverters": data_microinverters}
+
+    def _get_generation(self, id_plant: int, sn: str, current_date: str) -> Optional[dict]:
+        url = self.urls["data_microinverter"]
+
+        data_req = {
+            "station_id": id_plant,
+            "date": current_date,
+            "sn": sn
         }
 
-        data_req = {"station_id": id_plant}
+        with span(self.tracer, "device", "device", plant=id_plant, sn=sn) as device_span:
+            data = self._request(
+                url, data_req, f" in the plant with id: {id_plant}")
+            device_span["outcome"] = "failed" if data is None else "ok"
 
-        try:
+        if data is None:
+            self.logger.error(
+                f"Unable to consult the list microinverters per plant, maximum number of attempts made. Max retries ={self.MAX_RETRIES}")
+            return None
 
-            for attempt in range(1,  self.MAX_RETRIES + 1):
-                response = requests.post(
-                    url, headers=headers, json=data_req)
+        generation = data.get("data")
 
-                if response.status_code != 200:
-                    
-                    self.logger.error(
-                        f"Error {response.status_code}: {response}")
-                    time.sleep(6)
-                    continue
+        if generation:
+            if self.store is not None:
+                # The raw series goes to the store right away, only the newest point stays in memory
+                self.store.save_readings(sn, id_plant, current_date, generation)
 
-                data = response.json()
+            generation = [latest_reading(generation)]
 
-                if data["status"] != "0":
-                    self.logger.error(
-                        f"Error in the consult: {data['message']} with status {data['status']}")
-                    time.sleep(6)
-                    continue
+        return {"id_micro": sn, "generation": generation}
 
-                time.sleep(6)
-                break
-            else:
+    def _get_plant_summary(self, id_plant: int) -> tuple:
+        return self.__get_total_energy(id_plant), self.__get_plant_status(id_plant)
+
+    def __get_total_energy(self, id_plant: int) -> str:
+
+        url = self.urls["total_energy"]
+
+        data_req = {"station_id": id_plant}
+
+        try:
+
+            with span(self.tracer, "total_energy", "lookup", plant=id_plant) as lookup_span:
+                data = self._request(url, data_req)
+                lookup_span["outcome"] = "failed" if data is None else "ok"
+
+            if data is None:
                 self.logger.error(
                     f"Unable to consult the total energy, maximum number of attempts made. Max retries ={self.MAX_RETRIES}")
                 return None
@@ -350,40 +653,17 @@ class HoymileReport:
 
     def __get_plant_status(self, id_plant: int) -> dict:
 
-        url_plant_status = self.config_data.get_plant_status()
-        key = self.key
-        url = self.config_data.get_url() + url_plant_status + "key=" + key
-
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "*/*"
-        }
+        url = self.urls["plant_status"]
 
         data_req = {"id": id_plant}
 
         try:
 
-            for attempt in range(1,  self.MAX_RETRIES + 1):
-                response = requests.post(
-                    url, headers=headers, json=data_req)
+            with span(self.tracer, "plant_status", "lookup", plant=id_plant) as lookup_span:
+                data = self._request(url, data_req)
+                lookup_span["outcome"] = "failed" if data is None else "ok"
 
-                if response.status_code != 200:
-                    self.logger.error(
-                        f"Error {response.status_code}: {response}")
-                    time.sleep(6)
-                    continue
-
-                data = response.json()
-
-                if data["status"] != "0":
-                    self.logger.error(
-                        f"Error in the consult: {data['message']} with status {data['status']}")
-                    time.sleep(6)
-                    continue
-
-                time.sleep(6)
-                break
-            else:
+            if data is None:
                 self.logger.error(
                     f"Unable to consult the operation state of the plant, maximum number of attempts made. Max retries ={self.MAX_RETRIES}")
                 return None
@@ -401,14 +681,19 @@ class HoymileReport:
     def information_processing(self,data) -> None:
     
        
-        json_string = json.dumps(self.create_payload(data), indent=4)  # `indent=4` para hacerlo legible
+        json_bytes = jsonCodec.dumps(self.create_payload(data), default=Microinverter.to_dict)
        
-        with open('datoslala.json', 'w') as archivo_json:
+        with open('datoslala.json', 'wb') as archivo_json:
         
-            archivo_json.write(json_string)
+            archivo_json.write(json_bytes)
 
     def create_payload(self,plant_data: list[dict]):
-        
+        date_str_formatted = self.run_context.timestamp
+
+        with span(self.tracer, "create_payload", "payload", plants=len(plant_data)):
+            return self._build_payloads(plant_data, date_str_formatted)
+
+    def _build_payloads(self, plant_data: list[dict], date_str_formatted: str) -> list[dict]:
         data_plant = []
         payload_plant = []
 
@@ -416,28 +701,19 @@ class HoymileReport:
             generation = plant.get("total_energy")
             id_plant = plant.get("id_plant")
             plant_status = plant.get("plant_status")
+            # Set before the devices, so a plant sent without microinverters (night status) has its alarms
+            alarms = {
+                "OFFLINE": plant_status.get("offline"),
+                "UNSTABLE": plant_status.get("unstable"),
+                "UMATCHED": plant_status.get("umatched"),
+                "MICROINVERT_WARN": plant_status.get("mi_warn"),
+                "GRID_WARN": plant_status.get("g_warn"),
+                "LAST_AT": date_str_formatted
+            }
 
             for microinverter in plant.get("data_inverters"):
                 if microinverter.get("generation") and microinverter.get("generation") != []:
                     last_generation = microinverter.get("generation")[0]
-                    date_obj = datetime.now()
-                        
-                        
-                    dateHelper =HelperReport()
-                    rounded_time=dateHelper.round_time_down(date_obj,self.config_data.get_interval_time())
-                    # Restar 5 horas
-                    adjusted_time = rounded_time - timedelta(hours=5)
-
-                    # Convertir a string
-                    date_str_formatted = adjusted_time.strftime("%Y-%m-%d %H:%M:%S")
-                    alarms = {
-                        "OFFLINE": plant_status.get("offline"),
-                        "UNSTABLE": plant_status.get("unstable"),
-                        "UMATCHED": plant_status.get("umatched"),
-                        "MICROINVERT_WARN": plant_status.get("mi_warn"),
-                        "GRID_WARN": plant_status.get("g_warn"),
-                        "LAST_AT": date_str_formatted
-                    }
 
                     ac_data = last_generation.get("ac")
                     temp_microinverter = ac_data.get("temp")
@@ -459,17 +735,6 @@ class HoymileReport:
 
 
                 else:
-                    date_obj = datetime.now()
-                        
-                        
-                    dateHelper =HelperReport()
-                    rounded_time=dateHelper.round_time_down(date_obj,self.config_data.get_interval_time())
-                    # Restar 5 horas
-                    adjusted_time = rounded_time - timedelta(hours=5)
-
-                    # Convertir a string
-                    date_str_formatted = adjusted_time.strftime("%Y-%m-%d %H:%M:%S")
-
                     ac_data = {"ua": 0.0, "ub": 0.0, "uc": 0.0, "temp": 0.0}
                     dc_voltage = [0.0] * 8
                     dc_current = [0.0] * 8
@@ -480,15 +745,6 @@ class HoymileReport:
                     voltage_3_ac = 0.0
 
                     #current_1_ac = generation/p
-
-                    alarms = {
-                        "OFFLINE": plant_status.get("offline"),
-                        "UNSTABLE": plant_status.get("unstable"),
-                        "UMATCHED": plant_status.get("umatched"),
-                        "MICROINVERT_WARN": plant_status.get("mi_warn"),
-                        "GRID_WARN": plant_status.get("g_warn"),
-                        "LAST_AT": date_str_formatted
-                    }
         
                 payload = Microinverter(
                     DATE = date_str_formatted,
@@ -513,31 +769,10 @@ class HoymileReport:
                     VOLTAGE_1_AC = voltage_1_ac,
                     VOLTAGE_2_AC = voltage_2_ac,
                     VOLTAGE_3_AC = voltage_3_ac,
-                    CURRENT_1_AC = 0.0,
-                    CURRENT_2_AC = 0.0,
-                    CURRENT_3_AC = 0.0,
-                    IRRADIANCE = 0.0,
-                    TEMPERATURE_PANEL = 0.0,
-                    TEMPERATURE_ENVIRONMENT = 0.0,
-                    TEMPERATURE_PCB = 0.0,
-                    TYPE_INVERTER = 9, #PREGUNTAR CUAL ES
-                    POWER_FACTOR = 0.0,
-                    TYPE_DEVICE = 0.0,
-                    POWER_SNAPSHOT = 0.0,
                     GRID_FREQUENCY = grid_freq,
-                    HEATSINK_TEMPERATURE = 0.0,
-                    APPARENT_POWER = 0.0,
-                    REACTIVE_POWER = 0.0,
-                    WIND_SPEED = 0.0,
-                    WIND_DIRECTION = 0.0,
-                    HUMIDITY = 0.0,
-                    F1 = 0.0,
-                    F2 = 0.0,
-                    F3 = 0.0,
-                    F4 = 0.0,
                 )
             
-                data_plant.append(payload.__dict__)
+                data_plant.append(payload)
 
             payload_plant.append({
                 "GENERATION": round(float(generation)/1000,1),
@@ -553,18 +788,55 @@ class HoymileReport:
         return payload_plant
 
     def order_information_plants(self):
-        data = self.get_data_microinverters_per_plant()
-        for plant in data:
-            plant["data_inverters"] = sorted(plant["data_inverters"], key=lambda x: x["id_micro"], reverse=True)
-
-            for microinverters in plant["data_inverters"]:
-                generation = microinverters.get("generation",[])
-                
-                if generation:
-                    latest_gen = max(generation, key=lambda gen: datetime.strptime(gen["time"], '%H:%M'))
-                    microinverters["generation"] = [latest_gen]
-                
-                else:
-                    microinverters["generation"] = []
- 
-        return data
\ No newline at end of file
+        current_date_formatted = datetime.now().strftime("%Y-%m-%d")
+
+        with span(self.tracer, "get_data_microinverters_per_plant", "collect") as collect_span:
+            data = self.get_data_microinverters_per_plant()
+            collect_span["plants"] = len(data)
+
+        return self._order_plants(data, current_date_formatted)
+
+    def _order_plants(self, data: list, current_date_formatted: str) -> list:
+        if self.store is not None:
+            self.store.save_plants(data, current_date_formatted)
+
+        total_microinverters = sum(len(plant["data_inverters"]) for plant in data)
+        data = [self._order_plant(plant, current_date_formatted) for plant in data]
+
+        if self.cursor is not None:
+            skipped_microinverters = total_microinverters - sum(len(plant["data_inverters"]) for plant in data)
+            self.logger.info(f"Microinverters without new readings skipped: {skipped_microinverters}")
+
+        night_plants = sum(1 for plant in data if plant.get("night"))
+
+        if night_plants:
+            self.logger.info(f"Plants collected in night mode ({self.solar.night_mode}), without device calls: {night_plants}")
+
+        return data
+
+    def _order_plant(self, plant: dict, current_date: str) -> dict:
+        data_inverters = []
+
+        for microinverters in plant["data_inverters"]:
+            generation = microinverters.get("generation",[])
+
+            if generation:
+                latest_gen = latest_reading(generation)
+
+                if self.cursor is not None:
+                    if not self.cursor.is_newer(microinverters["id_micro"], current_date, latest_gen["time"]):
+                        continue
+
+                    self.cursor.stage(
+                        plant["id_plant"], microinverters["id_micro"], current_date, latest_gen["time"])
+
+                microinverters["generation"] = [latest_gen]
+
+            else:
+                microinverters["generation"] = []
+
+            data_inverters.append(microinverters)
+
+        plant["data_inverters"] = data_inverters
+
+        return plant
@@ -0,0 +1,102 @@
+import logging
+import signal
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from utils.helper import HelperReport
+
+
+@dataclass
+class CollectorDaemon:
+    """
+    CollectorDaemon runs a collection cycle repeatedly, aligned to INTERVAL_TIME boundaries.
+
+    The services used by the job (HoymileReport, AuthService, HTTP pools and in-memory
+    caches) are created once by the caller and kept alive between cycles. Each cycle runs
+    in a worker thread; if the previous cycle is still running when the next boundary is
+    reached, that cycle is skipped. SIGINT and SIGTERM stop the daemon after the running
+    cycle finishes.
+
+    Boundaries are the minutes of the hour that are multiples of the interval, the same
+    rounding as the payload timestamps, so the interval must divide 60; any other value
+    would leave an uneven gap at every hour wrap and raises ValueError.
+
+    Attributes:
+        logger (logging.Logger): Logger instance used for logging the cycles.
+        interval_minutes (int): Minutes between two cycles (INTERVAL_TIME), a divisor of 60.
+        job (Callable[[], None]): Collection cycle to execute.
+        run_on_start (bool): Whether a cycle is fired immediately at startup.
+
+    Methods:
+        run() -> None:
+            Blocks, firing the job at every boundary until stop() is called.
+
+        stop() -> None:
+            Requests a clean shutdown.
+
+        next_run(now: datetime) -> datetime:
+            Returns the next boundary after `now`, using HelperReport.round_time_down.
+    """
+
+    logger: logging.Logger
+    interval_minutes: int
+    job: Callable[[], None]
+    run_on_start: bool = True
+
+    def __post_init__(self):
+        if self.interval_minutes < 1 or 60 % self.interval_minutes:
+            raise ValueError(f"Invalid INTERVAL_TIME {self.interval_minutes}, expected a divisor of 60 "
+                             f"(1, 2, 3, 4, 5, 6, 10, 12, 15, 20, 30 or 60)")
+
+        self._stop_event = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def next_run(self, now: datetime) -> datetime:
+        return HelperReport.round_time_down(now, self.interval_minutes) + timedelta(minutes=self.interval_minutes)
+
+    def stop(self, *_) -> None:
+        self.logger.info("Stopping the collector daemon...")
+        self._stop_event.set()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        self.logger.info(f"Collector daemon started, interval of {self.interval_minutes} minutes")
+
+        if self.run_on_start:
+            self._start_cycle()
+
+        while not self._stop_event.is_set():
+            next_run = self.next_run(datetime.now())
+            self.logger.info(f"Next collection cycle at {next_run:%Y-%m-%d %H:%M:%S}")
+
+            if self._stop_event.wait(max(0.0, (next_run - datetime.now()).total_seconds())):
+                break
+
+            self._start_cycle()
+
+        if self._worker is not None and self._worker.is_alive():
+            self.logger.info("Waiting for the running cycle to finish...")
+            self._worker.join()
+
+        self.logger.info("Collector daemon stopped")
+
+    def _start_cycle(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            self.logger.error("Previous collection cycle is still running, skipping this cycle")
+            return
+
+        self._worker = threading.Thread(target=self._run_job, name="collection-cycle")
+        self._worker.start()
+
+    def _run_job(self) -> None:
+        started = datetime.now()
+
+        try:
+            self.job()
+        except Exception as ex:
+            self.logger.error(f"Error in the collection cycle: {ex}")
+
+        self.logger.info(f"Collection cycle finished in {(datetime.now() - started).total_seconds():.1f}s")
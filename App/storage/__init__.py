@@ -0,0 +1,4 @@
+from .cursor import ReadingCursor
+from .readings import ReadingStore
+from .topology import TopologyCache
+from .outbox import Outbox
@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from App.storage.files import write_json_atomic
+from utils import jsonCodec
+
+
+@dataclass
+class ReadingCursor:
+    """
+    ReadingCursor keeps, for every microinverter, the last reading already processed.
+
+    The cursor of a device is the date and "HH:MM" time of the newest mi_data_day point
+    that was turned into a payload. Readings at or before the cursor are skipped, so a
+    device whose latest point has not changed is neither rebuilt nor uploaded again.
+    Cursors are stored in a JSON file that is replaced atomically on save.
+
+    A reading only moves the cursor once its payload is safe: the new positions are staged
+    per plant while the payloads are built and committed for the plants that ENRG saved
+    (or that were stored in the outbox). The readings of a failed upload are sent again
+    on the next run.
+
+    Attributes:
+        logger (logging.Logger): Logger instance used for logging errors.
+        cursor_file (str): Path to the JSON file where the cursors are stored.
+        cursors (dict): Mapping of serial number to {"date": str, "time": str}.
+
+    Methods:
+        load() -> None:
+            Loads the cursors from the cursor file if it exists.
+
+        save() -> None:
+            Writes the cursors to the cursor file (temporary file plus rename).
+
+        is_newer(sn: str, date: str, time: str) -> bool:
+            Returns whether a reading of a device is newer than its cursor.
+
+        stage(id_plant, sn: str, date: str, time: str) -> None:
+            Records the reading a device of a plant will move to once the plant is committed.
+
+        commit(id_plants) -> None:
+            Moves the cursors of the devices staged for the given plants.
+
+        discard() -> None:
+            Drops the staged positions that were not committed.
+    """
+
+    logger: logging.Logger
+    cursor_file: str = "cursors.json"
+    cursors: dict = field(default_factory=dict, init=False)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._staged = {}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.cursor_file):
+            return
+
+        try:
+            self.cursors = jsonCodec.load_file(self.cursor_file)
+        except Exception as ex:
+            self.logger.error(f"Failed while reading the file {self.cursor_file}: {ex}")
+            self.cursors = {}
+
+    def save(self) -> None:
+        try:
+            with self._lock:
+                snapshot = dict(self.cursors)
+
+            write_json_atomic(self.cursor_file, snapshot)
+        except Exception as ex:
+            self.logger.error(f"Error at saving the file {self.cursor_file}: {ex}")
+
+    def is_newer(self, sn: str, date: str, time: str) -> bool:
+        last_time = self._last_minutes(sn, date)
+        return last_time is None or to_minutes(time) > last_time
+
+    def stage(self, id_plant, sn: str, date: str, time: str) -> None:
+        with self._lock:
+            self._staged.setdefault(str(id_plant), {})[sn] = {"date": date, "time": time}
+
+    def commit(self, id_plants) -> None:
+        with self._lock:
+            for id_plant in id_plants:
+                self.cursors.update(self._staged.pop(str(id_plant), {}))
+
+    def discard(self) -> None:
+        with self._lock:
+            self._staged = {}
+
+    def _last_minutes(self, sn: str, date: str) -> Optional[int]:
+        cursor = self.cursors.get(sn)
+
+        if cursor is None or cursor.get("date") != date:
+            return None
+
+        return to_minutes(cursor["time"])
+
+
+def to_minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def latest_reading(generation: list) -> Optional[dict]:
+    """
+    Returns the reading with the latest "HH:MM" time in a single pass (the first one on ties).
+    """
+    return max(generation, key=lambda reading: to_minutes(reading["time"]), default=None)
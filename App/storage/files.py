@@ -0,0 +1,10 @@
+from utils import jsonCodec
+from utils.atomicFile import write_atomic
+
+
+def write_json_atomic(path: str, data) -> None:
+    """
+    Writes `data` as compact JSON to `path` atomically (see utils.atomicFile.write_atomic),
+    so readers see either the previous or the new content.
+    """
+    write_atomic(path, jsonCodec.dumps(data))
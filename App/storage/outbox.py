@@ -0,0 +1,129 @@
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+from App.models.microinverters import dumps_payload
+from utils import jsonCodec
+
+
+@dataclass
+class Outbox:
+    """
+    Outbox is a durable SQLite queue for the payloads sent to ENRG.
+
+    Payloads are enqueued before they are sent and acknowledged (deleted) only after ENRG
+    confirms the plant was saved. Payloads that were not confirmed stay in the queue and are
+    replayed, oldest first, on the next run or daemon cycle, so an ENRG outage does not
+    require asking Hoymiles for the same data again. A payload that keeps failing is moved
+    aside ("dead") after max_attempts so it does not block the queue forever. Dead payloads
+    are kept for retention_days for inspection, then purged so the database does not grow
+    without bound.
+
+    Attributes:
+        logger (logging.Logger): Logger instance used for logging errors.
+        db_file (str): Path to the SQLite database file.
+        max_attempts (int): Attempts after which a payload is no longer replayed.
+        retention_days (float): Days a dead payload is kept after it was enqueued.
+
+    Methods:
+        enqueue(payloads: List[Dict]) -> List[int]:
+            Stores the payloads and returns their entry ids.
+
+        pending(limit: int) -> List[tuple]:
+            Returns up to `limit` (entry_id, payload) pairs, oldest first.
+
+        ack(entry_ids: List[int]) -> None:
+            Deletes the entries confirmed by ENRG.
+
+        mark_failed(entry_ids: List[int], error: str) -> None:
+            Increments the attempts of the entries and records the last error.
+
+        purge(now: Optional[datetime] = None) -> int:
+            Deletes the dead payloads older than retention_days and returns how many were deleted.
+
+        count() -> int:
+            Returns the number of payloads waiting to be delivered.
+
+        close() -> None:
+            Closes the database connection.
+    """
+
+    logger: logging.Logger
+    db_file: str = "outbox.db"
+    max_attempts: int = 24
+    retention_days: float = 7.0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+
+        with self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id_plant TEXT,
+                    payload TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    last_error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, id);
+            """)
+
+    def enqueue(self, payloads: List[Dict]) -> List[int]:
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entry_ids = []
+
+        with self._lock, self._connection:
+            for payload in payloads:
+                cursor = self._connection.execute(
+                    "INSERT INTO outbox (id_plant, payload, created_at) VALUES (?, ?, ?)",
+                    (str(payload.get("ID_PLANT")), dumps_payload(payload).decode("utf-8"), created_at))
+                entry_ids.append(cursor.lastrowid)
+
+        return entry_ids
+
+    def pending(self, limit: int) -> List[tuple]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, payload FROM outbox WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,)).fetchall()
+
+        return [(entry_id, jsonCodec.loads(payload)) for entry_id, payload in rows]
+
+    def ack(self, entry_ids: List[int]) -> None:
+        if not entry_ids:
+            return
+
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM outbox WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+
+    def mark_failed(self, entry_ids: List[int], error: str) -> None:
+        if not entry_ids:
+            return
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE status END WHERE id = ?",
+                [(error, self.max_attempts, entry_id) for entry_id in entry_ids])
+
+    def purge(self, now: Optional[datetime] = None) -> int:
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM outbox WHERE status = 'dead' AND created_at < ?", (cutoff,)).rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,191 @@
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from utils import jsonCodec
+
+
+@dataclass
+class ReadingStore:
+    """
+    ReadingStore persists the raw Hoymiles readings in an embedded SQLite database.
+
+    It keeps every mi_data_day point per microinverter, every station_today_production
+    total and every gpw status, so that reprocessing, debugging and payload regeneration
+    can read locally instead of calling the API again. The database runs in WAL mode so
+    readers are not blocked by the writer. The series of a microinverter is written in one
+    transaction as soon as it is fetched, so the collectors only keep its newest point in
+    memory; the totals and statuses of a run are written in a single transaction.
+
+    Tables:
+        micro_readings: one row per (sn, date, time), primary key on those columns.
+        plant_totals: one row per total energy lookup, indexed on (station_id, date).
+        plant_status: one row per status lookup, indexed on (station_id, date).
+
+    Attributes:
+        logger (logging.Logger): Logger instance used for logging errors.
+        db_file (str): Path to the SQLite database file.
+
+    Methods:
+        save_readings(sn: str, station_id: int, date: str, generation: list) -> None:
+            Stores the mi_data_day series of a microinverter.
+
+        save_plants(plants: list, date: str) -> None:
+            Stores the readings, totals and statuses of the collected plants in bulk.
+
+        get_readings(sn: str, date: str) -> list:
+            Returns the stored readings of a microinverter for a date, ordered by time.
+
+        get_plant_day(station_id: int, date: str) -> Optional[dict]:
+            Rebuilds a plant entry shaped like get_data_microinverters_per_plant() output.
+
+        close() -> None:
+            Closes every connection opened by the store. The store stays usable: the next call
+            opens a new connection. run_cycle() calls it after every cycle, since every cycle
+            collects on new worker threads and each of them opens its own connection.
+    """
+
+    logger: logging.Logger
+    db_file: str = "readings.db"
+
+    def __post_init__(self):
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+
+            with self._connections_lock:
+                self._connections.append(connection)
+
+        return connection
+
+    def _create_schema(self) -> None:
+        with self._connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS micro_readings (
+                    sn TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    station_id INTEGER NOT NULL,
+                    reading TEXT NOT NULL,
+                    PRIMARY KEY (sn, date, time)
+                );
+                CREATE INDEX IF NOT EXISTS idx_micro_readings_station
+                    ON micro_readings (station_id, date);
+
+                CREATE TABLE IF NOT EXISTS plant_totals (
+                    station_id INTEGER NOT NULL,
+                    date TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    plant_name TEXT,
+                    total_energy TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_plant_totals_station
+                    ON plant_totals (station_id, date);
+
+                CREATE TABLE IF NOT EXISTS plant_status (
+                    station_id INTEGER NOT NULL,
+                    date TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    status TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_plant_status_station
+                    ON plant_status (station_id, date);
+            """)
+
+    def save_readings(self, sn: str, station_id: int, date: str, generation: list) -> None:
+        readings = [(sn, date, reading.get("time"), station_id, jsonCodec.dumps(reading).decode("utf-8"))
+                    for reading in generation]
+
+        try:
+            with self._connection() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO micro_readings (sn, date, time, station_id, reading) VALUES (?, ?, ?, ?, ?)",
+                    readings)
+        except sqlite3.Error as ex:
+            self.logger.error(f"Error while saving the readings of {sn} in {self.db_file}: {ex}")
+
+    def save_plants(self, plants: list, date: str) -> None:
+        fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        readings = []
+        totals = []
+        statuses = []
+
+        for plant in plants:
+            station_id = plant.get("id_plant")
+
+            for microinverter in plant.get("data_inverters", []):
+                for reading in microinverter.get("generation") or []:
+                    readings.append((microinverter.get("id_micro"), date, reading.get("time"),
+                                     station_id, jsonCodec.dumps(reading).decode("utf-8")))
+
+            totals.append((station_id, date, fetched_at, plant.get("name_plant"),
+                           None if plant.get("total_energy") is None else str(plant.get("total_energy"))))
+            statuses.append((station_id, date, fetched_at, jsonCodec.dumps(plant.get("plant_status")).decode("utf-8")))
+
+        try:
+            with self._connection() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO micro_readings (sn, date, time, station_id, reading) VALUES (?, ?, ?, ?, ?)",
+                    readings)
+                connection.executemany(
+                    "INSERT INTO plant_totals (station_id, date, fetched_at, plant_name, total_energy) VALUES (?, ?, ?, ?, ?)",
+                    totals)
+                connection.executemany(
+                    "INSERT INTO plant_status (station_id, date, fetched_at, status) VALUES (?, ?, ?, ?)",
+                    statuses)
+        except sqlite3.Error as ex:
+            self.logger.error(f"Error while saving the readings in {self.db_file}: {ex}")
+
+    def get_readings(self, sn: str, date: str) -> list:
+        rows = self._connection().execute(
+            "SELECT reading FROM micro_readings WHERE sn = ? AND date = ? ORDER BY time",
+            (sn, date)).fetchall()
+
+        return [jsonCodec.loads(reading) for (reading,) in rows]
+
+    def get_plant_day(self, station_id: int, date: str) -> Optional[dict]:
+        connection = self._connection()
+        total = connection.execute(
+            "SELECT plant_name, total_energy FROM plant_totals WHERE station_id = ? AND date = ? "
+            "ORDER BY fetched_at DESC LIMIT 1", (station_id, date)).fetchone()
+
+        if total is None:
+            return None
+
+        status = connection.execute(
+            "SELECT status FROM plant_status WHERE station_id = ? AND date = ? "
+            "ORDER BY fetched_at DESC LIMIT 1", (station_id, date)).fetchone()
+
+        data_inverters = {}
+
+        for sn, reading in connection.execute(
+                "SELECT sn, reading FROM micro_readings WHERE station_id = ? AND date = ? ORDER BY sn, time",
+                (station_id, date)):
+            data_inverters.setdefault(sn, []).append(jsonCodec.loads(reading))
+
+        return {"id_plant": station_id, "name_plant": total[0], "total_energy": total[1],
+                "plant_status": jsonCodec.loads(status[0]) if status else None,
+                "data_inverters": [{"id_micro": sn, "generation": generation}
+                                   for sn, generation in data_inverters.items()]}
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+
+            self._connections.clear()
+
+        self._local = threading.local()
@@ -0,0 +1,78 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from App.storage.files import write_json_atomic
+from utils import jsonCodec
+
+
+@dataclass
+class TopologyCache:
+    """
+    TopologyCache stores a snapshot of the plant topology (plants or microinverters per plant)
+    in a JSON file with a time-to-live.
+
+    The snapshot is replaced atomically, so a refresh that fails halfway leaves the previous
+    snapshot in place and callers keep serving it until a refresh succeeds. The last loaded
+    snapshot is kept in memory and reused while the file modification time is unchanged.
+
+    Attributes:
+        logger (logging.Logger): Logger instance used for logging errors.
+        cache_file (str): Path to the JSON file holding the snapshot.
+        ttl (int): Seconds after which the snapshot is considered stale.
+
+    Methods:
+        load() -> Optional[list]:
+            Returns the cached snapshot, or None if there is none.
+
+        write(data: list) -> None:
+            Replaces the snapshot atomically (temporary file plus rename).
+
+        age() -> Optional[float]:
+            Returns the age in seconds of the snapshot, or None if there is none.
+
+        is_stale() -> bool:
+            Returns True if there is no snapshot or it is older than the TTL.
+    """
+
+    logger: logging.Logger
+    cache_file: str
+    ttl: int = 86400
+
+    def __post_init__(self):
+        self._data = None
+        self._mtime = None
+
+    def load(self) -> Optional[list]:
+        try:
+            mtime = os.path.getmtime(self.cache_file)
+        except OSError:
+            return None
+
+        if self._data is not None and mtime == self._mtime:
+            return self._data
+
+        try:
+            self._data = jsonCodec.load_file(self.cache_file)
+            self._mtime = mtime
+            return self._data
+        except Exception as ex:
+            self.logger.error(f"Failed while reading the file {self.cache_file}: {ex}")
+            return None
+
+    def write(self, data: list) -> None:
+        write_json_atomic(self.cache_file, data)
+        self._data = data
+        self._mtime = os.path.getmtime(self.cache_file)
+
+    def age(self) -> Optional[float]:
+        try:
+            return time.time() - os.path.getmtime(self.cache_file)
+        except OSError:
+            return None
+
+    def is_stale(self) -> bool:
+        age = self.age()
+        return age is None or age > self.ttl
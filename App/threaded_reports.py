@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from App.reports import HoymileReport
+from utils.tracing import with_context
+
+
+@dataclass
+class ThreadedHoymileReport(HoymileReport):
+    """
+    ThreadedHoymileReport collects each plant as an independent task on a thread pool.
+
+    A task performs the whole work of one plant (its mi_data_day calls plus the total
+    energy and plant status lookups) sequentially, so a pool of PLANT_WORKERS threads
+    collects that many plants at the same time. Results are merged back in the order
+    of the cached plant list, so order_information_plants() and create_payload() work
+    unchanged.
+
+    Attributes:
+        PLANT_WORKERS (int): Size of the worker pool (set during initialization).
+
+    Methods:
+        get_data_microinverters_per_plant(plants: Optional[list] = None) -> list:
+            Collects every plant on the worker pool and returns the results in plant order.
+            Returns an empty list if any microinverter could not be consulted, unless circuit
+            breakers are set, in which case only the degraded plants are left out.
+    """
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.PLANT_WORKERS = max(1, self.config_data.get_plant_workers())
+
+    def get_data_microinverters_per_plant(self, plants: Optional[list] = None) -> list:
+        current_date_formatted = datetime.now().strftime("%Y-%m-%d")
+
+        all_microinverters = self.get_list_microinverters_per_plant() if plants is None else plants
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.PLANT_WORKERS) as executor:
+                futures = [executor.submit(with_context(self._collect_plant_safe), plant, current_date_formatted)
+                           for plant in all_microinverters]
+                all_data_microinverters = [future.result() for future in futures]
+
+            return self._merge_plants(all_data_microinverters)
+
+        except Exception as ex:
+            self.logger.error(
+                f"Error while asking for microinverters data {ex}")
+            return []
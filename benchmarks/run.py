@@ -0,0 +1,259 @@
+import argparse
+import configparser
+import functools
+import json
+import logging
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import main  # noqa: E402
+from App.enrg.send_data import PostRequester  # noqa: E402
+from App.pipeline import StreamingPipeline  # noqa: E402
+from App.reports import HoymileReport  # noqa: E402
+from App.storage.readings import ReadingStore  # noqa: E402
+from utils.configHandler import ConfigHandler, ConfigHandlerKey  # noqa: E402
+from utils.sharding import Shard  # noqa: E402
+from utils.logger import LoggerHandler  # noqa: E402
+
+HOYMILES_ENDPOINTS = ("findMyStations", "findDevsByStation", "mi_data_day", "station_today_production", "gpw")
+
+
+@dataclass
+class StageTimer:
+    """
+    StageTimer accumulates the time spent in the instrumented methods of a run.
+
+    Methods are wrapped on their class for the duration of the benchmark. The time of a
+    stage called from another stage on the same thread is subtracted from the caller, so
+    every stage reports its own time. Stages running on several threads (pipeline,
+    concurrent uploads) report the sum over the threads.
+
+    Methods:
+        instrument(cls, method: str, stage: str) -> None:
+            Wraps cls.method so that its calls are accounted to `stage`.
+
+        restore() -> None:
+            Puts back every wrapped method.
+    """
+
+    totals: dict = field(default_factory=dict)
+    counts: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._patched = []
+
+    def instrument(self, cls, method: str, stage: str) -> None:
+        original = cls.__dict__[method]
+        timer = self
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            stack = timer._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+
+                if stack:
+                    stack[-1] += elapsed
+
+                with timer._lock:
+                    timer.totals[stage] = timer.totals.get(stage, 0.0) + elapsed - nested
+                    timer.counts[stage] = timer.counts.get(stage, 0) + 1
+
+        setattr(cls, method, wrapper)
+        self._patched.append((cls, method, original))
+
+    def restore(self) -> None:
+        for cls, method, original in reversed(self._patched):
+            setattr(cls, method, original)
+
+        self._patched.clear()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(args, port: int) -> subprocess.Popen:
+    command = [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port),
+               "--plants", str(args.plants), "--micros-per-plant", str(args.micros_per_plant),
+               "--points-per-day", str(args.points_per_day), "--latency-ms", str(args.latency_ms),
+               "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate),
+               "--enrg-error-rate", str(args.enrg_error_rate), "--error-endpoints", args.error_endpoints]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.05)
+
+    process.kill()
+    raise RuntimeError("The stub server did not start")
+
+
+def stub_calls(url: str) -> dict:
+    with urllib.request.urlopen(f"{url}/calls") as response:
+        return json.loads(response.read())
+
+
+def write_config(work_dir: str, url: str, settings: dict) -> None:
+    config = configparser.ConfigParser(interpolation=None)
+    config.optionxform = str
+    config.read(os.path.join(REPO_ROOT, "config.ini"))
+    config.set("ENDPOINT", "URL", url)
+    config.set("ENDPOINT", "TOKEN_URL", f"{url}/api/token/create")
+    config.set("ENDPOINT", "ENRG_URL", f"{url}/api/micro-inverter/values")
+
+    for key, value in settings.items():
+        config.set("SETTING", key, value)
+
+    with open(os.path.join(work_dir, "config.ini"), "w") as file:
+        config.write(file)
+
+    with open(os.path.join(work_dir, "key.ini"), "w") as file:
+        file.write("[PASSWORD]\nKEY = benchmark\nCREDENTIALS = benchmark\n")
+
+
+def run_benchmark(args) -> dict:
+    settings = {"RATE_LIMIT": "0"}
+    settings.update(dict(item.split("=", 1) for item in args.set))
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    stub = start_stub(args, port)
+    work_dir = tempfile.mkdtemp(prefix="hoymiles-bench-")
+    previous_dir = os.getcwd()
+    timer = StageTimer()
+
+    try:
+        write_config(work_dir, url, settings)
+        os.chdir(work_dir)
+
+        config_handler = ConfigHandler("config.ini")
+        logger = LoggerHandler(config_data=config_handler).get_logger()
+
+        if not args.verbose:
+            for handler in logger.handlers:
+                if not isinstance(handler, logging.FileHandler):
+                    handler.setLevel(logging.WARNING)
+
+        # The same services as main.py, so NIGHT_MODE, accounts and every other setting apply
+        services = main.build_services(config_handler, ConfigHandlerKey("key.ini"), logger, args.shard)
+        hoymiles = services.hoymiles
+        report_class = type(hoymiles)
+
+        timer.instrument(HoymileReport, "refresh_topology", "topology")
+        timer.instrument(report_class, "get_data_microinverters_per_plant", "collect")
+        timer.instrument(HoymileReport, "_collect_plant", "collect")
+        timer.instrument(HoymileReport, "order_information_plants", "order")
+        timer.instrument(ReadingStore, "save_readings", "store")
+        timer.instrument(ReadingStore, "save_plants", "store")
+        timer.instrument(HoymileReport, "create_payload", "payload")
+        timer.instrument(StreamingPipeline, "run", "pipeline")
+        timer.instrument(PostRequester, "send_post_requests", "upload")
+        timer.instrument(PostRequester, "send_batch", "upload")
+        timer.instrument(PostRequester, "replay_outbox", "replay")
+
+        start = time.perf_counter()
+        hoymiles.refresh_topology(full=True)
+        topology_time = time.perf_counter() - start
+        calls_before = stub_calls(url)
+
+        start = time.perf_counter()
+        services.run_cycle()
+        cycle_time = time.perf_counter() - start
+        calls_after = stub_calls(url)
+
+        services.close()
+    finally:
+        timer.restore()
+        os.chdir(previous_dir)
+        stub.terminate()
+        stub.wait()
+
+    calls = {endpoint: calls_after.get(endpoint, 0) - calls_before.get(endpoint, 0) for endpoint in calls_after}
+    hoymiles_calls = sum(calls.get(endpoint, 0) for endpoint in HOYMILES_ENDPOINTS)
+    total_calls = sum(calls.values())
+
+    return {
+        "fleet": {"plants": args.plants, "micros_per_plant": args.micros_per_plant, "points_per_day": args.points_per_day,
+                  "latency_ms": args.latency_ms, "error_rate": args.error_rate, "enrg_error_rate": args.enrg_error_rate},
+        "settings": settings,
+        "topology_s": round(topology_time, 3),
+        "wall_s": round(cycle_time, 3),
+        "calls": calls,
+        "calls_per_s": round(total_calls / cycle_time, 1) if cycle_time else None,
+        "hoymiles_calls_per_s": round(hoymiles_calls / cycle_time, 1) if cycle_time else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages_s": {stage: round(total, 3) for stage, total in timer.totals.items()},
+        "work_dir": work_dir,
+    }
+
+
+def print_report(result: dict) -> None:
+    fleet = result["fleet"]
+    print(f"Fleet: {fleet['plants']} plants, ~{fleet['micros_per_plant']} microinverters per plant, "
+          f"{fleet['points_per_day']} points per day, latency {fleet['latency_ms']} ms, "
+          f"error rate {fleet['error_rate']} (ENRG {fleet['enrg_error_rate']})")
+    print(f"Settings: {' '.join(f'{key}={value}' for key, value in result['settings'].items())}")
+    print(f"Topology refresh: {result['topology_s']:.3f}s")
+    print(f"Collection cycle: {result['wall_s']:.3f}s, {result['calls_per_s']} calls/s "
+          f"({result['hoymiles_calls_per_s']} Hoymiles calls/s), peak RSS {result['peak_rss_mb']} MB")
+    print(f"Calls: {' '.join(f'{endpoint}={count}' for endpoint, count in sorted(result['calls'].items()))}")
+    print("Stages (self time, summed over threads):")
+
+    for stage, total in sorted(result["stages_s"].items(), key=lambda item: -item[1]):
+        print(f"  {stage:<10} {total:8.3f}s")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Runs main.py's collection flow against a local stub of the Hoymiles and ENRG APIs.")
+    parser.add_argument("--plants", type=int, default=100, help="Number of plants of the synthetic fleet.")
+    parser.add_argument("--micros-per-plant", type=int, default=10, help="Average number of microinverters per plant.")
+    parser.add_argument("--points-per-day", type=int, default=144, help="Readings in every mi_data_day series.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean latency added to every request.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Maximum random deviation of the latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of Hoymiles requests failing with HTTP 503.")
+    parser.add_argument("--enrg-error-rate", type=float, default=0.0, help="Fraction of ENRG requests failing with HTTP 503.")
+    parser.add_argument("--error-endpoints", default="", metavar="NAME,...",
+                        help="Hoymiles endpoints affected by --error-rate (e.g. mi_data_day,gpw). Every one by default.")
+    parser.add_argument("--shard", type=Shard.parse, default=Shard(), metavar="i/N",
+                        help="Runs the cycle of shard i of N, as main.py --shard does.")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Overrides a [SETTING] of config.ini (repeatable). RATE_LIMIT defaults to 0.")
+    parser.add_argument("--json", metavar="PATH", help="Also writes the results as JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Shows the application log on the console.")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(result, file, indent=4)
+
+
+if __name__ == "__main__":
+    main_cli()
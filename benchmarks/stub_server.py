@@ -0,0 +1,264 @@
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+@dataclass
+class StubFleet:
+    """
+    StubFleet synthesizes a Hoymiles fleet: plants, their microinverters and the
+    mi_data_day series of every microinverter, all derived from a fixed seed.
+
+    Attributes:
+        plants (int): Number of plants.
+        micros_per_plant (int): Average number of microinverters per plant (1 to 2x).
+        points_per_day (int): Number of 5-minute readings in every mi_data_day series.
+        variants (int): Number of distinct series; microinverters share them by serial number,
+            so the stub does not become the bottleneck of the benchmark.
+        seed (int): Seed of the synthetic fleet.
+
+    Methods:
+        stations() -> list:
+            Returns the findMyStations entries ({"id", "station_name"}).
+
+        micros(id_plant: int) -> list:
+            Returns the serial numbers of a plant.
+
+        series(sn: str) -> bytes:
+            Returns the encoded mi_data_day response of a microinverter (readings oldest first).
+    """
+
+    plants: int = 100
+    micros_per_plant: int = 10
+    points_per_day: int = 144
+    variants: int = 64
+    seed: int = 7
+    _micros: dict = field(default_factory=dict, init=False)
+    _series: dict = field(default_factory=dict, init=False)
+
+    def __post_init__(self):
+        rng = random.Random(self.seed)
+
+        for index in range(self.plants):
+            id_plant = 1000000 + index * 10
+            count = rng.randint(1, max(1, 2 * self.micros_per_plant - 1))
+            self._micros[id_plant] = [str(106100000000 + index * 1000 + micro) for micro in range(count)]
+
+    def stations(self) -> list:
+        return [{"id": id_plant, "station_name": f"Plant {id_plant}"} for id_plant in self._micros]
+
+    def micros(self, id_plant: int) -> list:
+        return self._micros.get(id_plant, [])
+
+    def series(self, sn: str) -> bytes:
+        variant = zlib.crc32(sn.encode("utf-8")) % self.variants
+
+        if variant not in self._series:
+            response = {"status": "0", "message": "", "data": self._readings(variant)}
+            self._series[variant] = json.dumps(response).encode("utf-8")
+
+        return self._series[variant]
+
+    def _readings(self, variant: int) -> list:
+        rng = random.Random(self.seed * 1000 + variant)
+        readings = []
+
+        for point in range(self.points_per_day):
+            minutes = 5 * 60 + point * 5
+            power = rng.uniform(0.0, 12.0)
+            readings.append({
+                "time": f"{minutes // 60 % 24:02d}:{minutes % 60:02d}",
+                "ac": {"temp": round(rng.uniform(20.0, 60.0), 1), "freq": round(rng.uniform(59.9, 60.1), 2),
+                       "ua": round(rng.uniform(118.0, 122.0), 1), "ub": 0.0, "uc": 0.0},
+                "dc": [{"u": round(rng.uniform(30.0, 40.0), 1), "i": round(power / 4, 2)} for _ in range(4)],
+            })
+
+        return readings
+
+
+@dataclass
+class StubServer:
+    """
+    StubServer is a local stand-in for the Hoymiles, token and ENRG endpoints of config.ini.
+
+    The Hoymiles endpoints are matched by the last segment of the path (findMyStations,
+    findDevsByStation, mi_data_day, station_today_production and gpw), the token endpoint by
+    token/create and ENRG by any other path. Every request can be delayed and can fail with
+    an HTTP 503 to reproduce slow or unreliable APIs. GET /calls returns the request counters.
+
+    Attributes:
+        fleet (StubFleet): Synthetic fleet served by the Hoymiles endpoints.
+        host (str): Interface to listen on.
+        port (int): Port to listen on (0 picks a free port).
+        latency_ms (float): Mean added latency per request.
+        jitter_ms (float): Maximum random deviation of the latency.
+        error_rate (float): Fraction of Hoymiles requests answered with HTTP 503.
+        error_endpoints (tuple): Hoymiles endpoints affected by error_rate (every one if empty).
+        enrg_error_rate (float): Fraction of ENRG requests answered with HTTP 503.
+        page_size (int): Stations returned per findMyStations page.
+
+    Methods:
+        start() -> StubServer:
+            Starts serving in a background thread.
+
+        stop() -> None:
+            Stops the server.
+
+        url -> str:
+            Base URL of the server.
+
+        calls() -> dict:
+            Returns the number of requests received per endpoint.
+    """
+
+    fleet: StubFleet
+    host: str = "127.0.0.1"
+    port: int = 0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    enrg_error_rate: float = 0.0
+    page_size: int = 50
+    error_endpoints: tuple = ()
+
+    def __post_init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "StubServer":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._reply(200, stub.calls())
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                if self.headers.get("Content-Encoding") == "gzip":
+                    raw = gzip.decompress(raw)
+
+                status, body = stub.handle(self.path.split("?")[0], json.loads(raw or b"{}"))
+                self._reply(status, body)
+
+            def _reply(self, status: int, body):
+                data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name="stub-server", daemon=True).start()
+
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def calls(self) -> dict:
+        with self._lock:
+            return dict(self._calls)
+
+    def handle(self, path: str, body) -> tuple:
+        endpoint = path.rstrip("/").rsplit("/", 1)[-1]
+
+        if endpoint == "create":
+            endpoint = "token"
+        elif endpoint not in ("findMyStations", "findDevsByStation", "mi_data_day", "station_today_production", "gpw"):
+            endpoint = "enrg"
+
+        with self._lock:
+            self._calls[endpoint] = self._calls.get(endpoint, 0) + 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            if endpoint == "enrg":
+                failed = self._random.random() < self.enrg_error_rate
+            else:
+                failed = (not self.error_endpoints or endpoint in self.error_endpoints) and self._random.random() < self.error_rate
+
+        if delay:
+            time.sleep(delay)
+
+        if failed and endpoint != "token":
+            return 503, {"message": "Service unavailable"}
+
+        if endpoint == "token":
+            return 200, {"token": "benchmark-token", "expiration": "2099-01-01T00:00:00+00:00"}
+
+        if endpoint == "enrg":
+            payloads = body if isinstance(body, list) else [body]
+            return 200, {"data": {"results": [{"id_plant": payload.get("ID_PLANT")} for payload in payloads]}}
+
+        if endpoint == "mi_data_day":
+            return 200, self.fleet.series(str(body.get("sn")))
+
+        return 200, {"status": "0", "message": "", "data": self._hoymiles_data(endpoint, body)}
+
+    def _hoymiles_data(self, endpoint: str, body: dict):
+        if endpoint == "findMyStations":
+            page = int(body.get("next") or 1)
+            stations = self.fleet.stations()
+            start = (page - 1) * self.page_size
+            next_page = page + 1 if start + self.page_size < len(stations) else None
+            return {"stations": stations[start:start + self.page_size], "next": next_page}
+
+        if endpoint == "findDevsByStation":
+            return {"micro_datas": [{"mi_sn": sn} for sn in self.fleet.micros(body.get("id"))]}
+
+        if endpoint == "station_today_production":
+            return str(len(self.fleet.micros(body.get("station_id"))) * 2500)
+
+        return {"offline": False, "unstable": False, "umatched": False, "mi_warn": False, "g_warn": False}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Hoymiles, token and ENRG APIs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--plants", type=int, default=100)
+    parser.add_argument("--micros-per-plant", type=int, default=10)
+    parser.add_argument("--points-per-day", type=int, default=144)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--enrg-error-rate", type=float, default=0.0)
+    parser.add_argument("--error-endpoints", default="")
+    args = parser.parse_args()
+
+    fleet = StubFleet(plants=args.plants, micros_per_plant=args.micros_per_plant, points_per_day=args.points_per_day)
+    server = StubServer(fleet=fleet, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        error_rate=args.error_rate, enrg_error_rate=args.enrg_error_rate,
+                        error_endpoints=tuple(filter(None, args.error_endpoints.split(",")))).start()
+    print(f"Stub server listening on {server.url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,245 @@
 from App.authentication.token import AuthService
 from App.enrg.send_data import PostRequester
 from App.reports import HoymileReport
+from App.async_reports import AsyncHoymileReport
+from App.threaded_reports import ThreadedHoymileReport
+from App.accounts import MultiAccountReport
+from App.pipeline import StreamingPipeline
+from App.scheduler import CollectorDaemon
+from App.storage.cursor import ReadingCursor
+from App.storage.outbox import Outbox
+from App.storage.readings import ReadingStore
+from utils.circuitBreaker import CircuitBreakers
 from utils.configHandler import ConfigHandler, ConfigHandlerKey
+from utils.httpClient import HttpClient
+from utils.metrics import Metrics, write_merged_summary
+from utils.rateLimiter import RateLimiter
+from utils.runContext import RunContext
+from utils.sharding import Shard
+from utils.solar import SolarSchedule
 from utils.logger import LoggerHandler
+from utils.tracing import Tracer, span
+from contextlib import ExitStack
+from dataclasses import dataclass
 from datetime import datetime, time
+from typing import Optional
+import argparse
+import logging
 import pytz
 
+
+def current_hour() -> int:
+    colombia_tz = pytz.timezone("America/Bogota")
+    now = datetime.now(colombia_tz).replace(minute=0, second=0, microsecond=0)
+    return now.hour
+
+
+def build_sender(run_context: RunContext, get_token: AuthService, logger, http_client: HttpClient, payloads: list, outbox: Outbox = None, metrics: Metrics = None, tracer: Tracer = None) -> PostRequester:
+    config_handler = run_context.config
+    token=get_token.get_token()
+    return PostRequester(url=run_context.endpoints["enrg"],token=token,logger= logger,payloads=payloads,http_client=http_client,
+                         batch_size=config_handler.get_upload_batch_size(),
+                         batch_max_bytes=config_handler.get_upload_batch_bytes(),
+                         compress=config_handler.get_upload_gzip(),
+                         auth_service=get_token,
+                         workers=config_handler.get_upload_workers(),
+                         max_retries=config_handler.get_upload_retries(),
+                         rate_limiter=RateLimiter(rate=0, burst=1,
+                                                  backoff_base=config_handler.get_backoff_base(),
+                                                  backoff_max=config_handler.get_backoff_max()),
+                         outbox=outbox,
+                         run_context=run_context,
+                         metrics=metrics,
+                         tracer=tracer)
+
+
+@dataclass
+class Services:
+    """
+    Services holds the long-lived objects of a process, built once by build_services() and
+    shared by every collection cycle (daemon mode included).
+
+    Attributes:
+        run_context (RunContext): Parsed settings and endpoints of the process.
+        hoymiles (HoymileReport): Report of the only account, or a MultiAccountReport.
+        get_token (AuthService): Token service of the ENRG API.
+        http_client (HttpClient): Pooled HTTP client shared by every API.
+        logger (logging.Logger): Logger of the process.
+        store (ReadingStore): Optional SQLite store of the raw readings (STORE_READINGS).
+        outbox (Outbox): Optional durable queue of the undelivered payloads (OUTBOX).
+        metrics (Metrics): Optional metrics registry (METRICS).
+        tracer (Tracer): Optional tracer of the runs (TRACE).
+
+    Methods:
+        run_cycle() -> None:
+            Runs one collection cycle with run_cycle().
+
+        close() -> None:
+            Closes the store and the outbox, waits for a pending topology refresh and closes
+            the HTTP pools.
+    """
+
+    run_context: RunContext
+    hoymiles: HoymileReport
+    get_token: AuthService
+    http_client: HttpClient
+    logger: logging.Logger
+    store: Optional[ReadingStore] = None
+    outbox: Optional[Outbox] = None
+    metrics: Optional[Metrics] = None
+    tracer: Optional[Tracer] = None
+
+    def run_cycle(self) -> None:
+        run_cycle(self.hoymiles, self.get_token, self.run_context, self.logger, self.http_client, self.outbox, self.metrics, self.tracer)
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+
+        if self.outbox is not None:
+            self.outbox.close()
+
+        self.hoymiles.wait_topology_refresh()
+        self.http_client.close()
+
+
+def build_services(config_handler: ConfigHandler, config_key: ConfigHandlerKey, logger: logging.Logger, shard: Shard = Shard()) -> Services:
+    run_context = RunContext.from_config(config_handler)
+    keys = config_key.get_keys()
+    http_client = HttpClient.from_config(config_handler)
+    # Shards always write their JSON summary, it is how the summary of the whole run is merged
+    metrics = Metrics(prometheus_file=shard.path(config_handler.get_metrics_file()) if config_handler.get_metrics() else "",
+                      json_file=shard.path(config_handler.get_metrics_json()),
+                      labels={"shard": shard.label} if shard.count > 1 else {}) if config_handler.get_metrics() or shard.count > 1 else None
+    tracer = Tracer(trace_dir=shard.path(config_handler.get_trace_dir()), keep=config_handler.get_trace_keep()) if config_handler.get_trace() else None
+    # Built once, so the circuits keep their state from one cycle to the next in daemon mode
+    breakers = CircuitBreakers.from_config(config_handler, logger) if config_handler.get_circuit_breaker() else None
+    cursor = ReadingCursor(logger=logger, cursor_file=shard.path(config_handler.get_cursor_file())) if config_handler.get_incremental() else None
+    solar = SolarSchedule.from_config(config_handler) if config_handler.get_night_mode() != "off" else None
+    store = ReadingStore(logger=logger, db_file=shard.path(config_handler.get_readings_db())) if config_handler.get_store_readings() else None
+    report_classes = {"async": AsyncHoymileReport, "thread": ThreadedHoymileReport}
+    report_class = report_classes.get(config_handler.get_collection_mode(), HoymileReport)
+    # One report per Hoymiles account, each with its own topology snapshots and rate limiter
+    reports = {account: report_class(logger=logger, config_data=config_handler, key=key, account=account, hour=current_hour(), http_client=http_client, cursor=cursor, store=store, run_context=run_context, metrics=metrics, tracer=tracer, breakers=breakers, shard=shard, solar=solar)
+               for account, key in keys.items()}
+    hoymiles = next(iter(reports.values())) if len(reports) == 1 else MultiAccountReport(logger=logger, reports=reports)
+    outbox = Outbox(logger=logger, db_file=shard.path(config_handler.get_outbox_db()), max_attempts=config_handler.get_outbox_max_attempts(), retention_days=config_handler.get_outbox_retention_days()) if config_handler.get_outbox() else None
+    get_token= AuthService(logger=logger,url=run_context.endpoints["token"],credential=config_key.get_credentials(),http_client=http_client,run_context=run_context,metrics=metrics)
+
+    return Services(run_context=run_context, hoymiles=hoymiles, get_token=get_token, http_client=http_client, logger=logger,
+                    store=store, outbox=outbox, metrics=metrics, tracer=tracer)
+
+
+def run_stage(name: str, metrics: Metrics = None, tracer: Tracer = None) -> ExitStack:
+    stage = ExitStack()
+
+    if metrics is not None:
+        stage.enter_context(metrics.stage(name))
+
+    stage.enter_context(span(tracer, name, "stage"))
+
+    return stage
+
+
+def run_cycle(hoymiles: HoymileReport, get_token: AuthService, run_context: RunContext, logger, http_client: HttpClient, outbox: Outbox = None, metrics: Metrics = None, tracer: Tracer = None) -> None:
+    config_handler = run_context.config
+    run_context = run_context.at(datetime.now())
+    hoymiles.hour = current_hour()
+    hoymiles.run_context = run_context
+    sender = lambda payloads: build_sender(run_context, get_token, logger, http_client, payloads, outbox, metrics, tracer)
+
+    if metrics is not None:
+        metrics.reset(run_context.timestamp)
+
+    if tracer is not None:
+        tracer.reset(run_context.started_at)
+
+    with span(tracer, "run", "run", timestamp=run_context.timestamp):
+        if outbox is not None:
+            with run_stage("replay", metrics, tracer):
+                sender([]).replay_outbox(config_handler.get_outbox_replay_limit(), config_handler.get_outbox_replay_rate())
+
+        if config_handler.get_pipeline():
+            with run_stage("pipeline", metrics, tracer):
+                pipeline = StreamingPipeline(logger=logger, hoymiles=hoymiles, sender=sender([]),
+                                             fetch_workers=config_handler.get_plant_workers(),
+                                             queue_size=config_handler.get_pipeline_queue_size())
+                pipeline.run()
+        else:
+            with run_stage("collect", metrics, tracer):
+                data_plants=hoymiles.order_information_plants()
+
+            with run_stage("payload", metrics, tracer):
+                payloads=hoymiles.create_payload(data_plants)
+            # hoymiles.information_processing(data_plants)
+
+            with run_stage("upload", metrics, tracer):
+                saved_plants, stored_plants = sender(payloads).send_post_requests()
+
+            logger.info(f"Upload finished: {len(saved_plants)} of {len(payloads)} plants sent, "
+                        f"{len(stored_plants)} kept in the outbox")
+
+            if hoymiles.cursor is not None:
+                # Only the readings of the plants saved by ENRG (or kept in the outbox) are done
+                hoymiles.cursor.commit(saved_plants | stored_plants)
+
+    if hoymiles.cursor is not None:
+        hoymiles.cursor.discard()
+        hoymiles.cursor.save()
+
+    if hoymiles.store is not None:
+        # The worker threads of this cycle are gone, their connections would leak in daemon mode
+        hoymiles.store.close()
+
+    if metrics is not None:
+        if hoymiles.breakers is not None:
+            metrics.observe_circuits(hoymiles.breakers.states())
+
+        try:
+            metrics.write()
+
+            if hoymiles.shard is not None and hoymiles.shard.count > 1:
+                json_file = config_handler.get_metrics_json()
+                merged = write_merged_summary(json_file, hoymiles.shard.all_paths(json_file), run_context.timestamp)
+                logger.info(f"Run summary of {len(merged['shards'])}/{hoymiles.shard.count} shards merged into {json_file}")
+        except OSError as ex:
+            logger.error(f"Error at saving the metrics: {ex}")
+
+    if tracer is not None:
+        try:
+            logger.info(f"Trace of the run saved to {tracer.write()}")
+        except OSError as ex:
+            logger.error(f"Error at saving the trace: {ex}")
+
 if __name__ == "__main__":
     # start = time.time()
+    parser = argparse.ArgumentParser(description="Collects Hoymiles data and sends it to ENRG.")
+    parser.add_argument("--refresh-topology", action="store_true",
+                        help="Refresh plants.json and micros_id.json from the API and exit.")
+    parser.add_argument("--full", action="store_true",
+                        help="With --refresh-topology, recheck the microinverters of every plant.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and fire a collection cycle at every INTERVAL_TIME boundary.")
+    parser.add_argument("--shard", type=Shard.parse, default=Shard(), metavar="i/N",
+                        help="Collect only the plants of shard i of N (stable hash of id_plant); run one process per shard.")
+    args = parser.parse_args()
+    shard = args.shard
 
     config_handler = ConfigHandler("config.ini")
     config_key = ConfigHandlerKey("key.ini")
-    logger_handler = LoggerHandler()
+    logger_handler = LoggerHandler(config_data=config_handler, label=f"shard {shard.label}" if shard.count > 1 else "")
     logger = logger_handler.get_logger()
-    key = config_key.get_key()
-    colombia_tz = pytz.timezone("America/Bogota")
-    now = datetime.now(colombia_tz).replace(minute=0, second=0, microsecond=0)
-    hour = now.hour
-    hoymiles = HoymileReport(logger=logger, config_data=config_handler, key=key, hour=int(hour))
-    data_plants=hoymiles.order_information_plants()
-    
-    payloads=hoymiles.create_payload(data_plants)
-    # hoymiles.information_processing(data_plants)
-    
-    get_token= AuthService(logger=logger,url=config_handler.get_url_token(),credential=config_key.get_credentials())
-    token=get_token.get_token()
-    send_data = PostRequester(url=config_handler.get_url_enrg(),token=token,logger= logger,payloads=payloads)
-    send_data.send_post_requests()
+    services = build_services(config_handler, config_key, logger, shard)
+
+    if args.refresh_topology:
+        services.hoymiles.refresh_topology(full=args.full)
+    elif args.daemon:
+        daemon = CollectorDaemon(logger=logger, interval_minutes=services.run_context.interval_time, job=services.run_cycle)
+        daemon.run()
+    else:
+        services.run_cycle()
+
+    services.close()
     # end = time.time()
     # duration = end - start
     # print(f"Tiempo de ejecución: {duration:.2f} segundos")
-
-
-    
\ No newline at end of file
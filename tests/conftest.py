@@ -0,0 +1,131 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+
+import pytest
+
+from utils.configHandler import ConfigHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATUS = {"offline": False, "unstable": False, "umatched": False, "mi_warn": False, "g_warn": False}
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code: int = 200):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode("utf-8")
+        self.headers = {}
+
+
+class FakeHttpClient:
+    """
+    Answers the Hoymiles and ENRG endpoints of config.ini like the real APIs.
+
+    `errors` maps an endpoint (last segment of the path, "enrg" for ENRG) to the outcomes of
+    its next calls: an exception is raised, an int is answered as that HTTP status.
+    `stations` maps the id of every plant listed by the account to its microinverters.
+    Every payload received by ENRG is kept in `uploads`, batched and gzip bodies included.
+    """
+
+    def __init__(self, errors: dict = None, stations: dict = None):
+        self.errors = {endpoint: list(outcomes) for endpoint, outcomes in (errors or {}).items()}
+        self.stations = stations or {}
+        self.calls = []
+        self.uploads = []
+
+    def post(self, url: str, json=None, data=None, headers=None) -> FakeResponse:
+        endpoint = url.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+
+        if not url.startswith("https://wapi.hoymiles.com"):
+            endpoint = "enrg"
+
+        self.calls.append(endpoint)
+        outcomes = self.errors.get(endpoint)
+
+        if outcomes:
+            outcome = outcomes.pop(0)
+
+            if isinstance(outcome, Exception):
+                raise outcome
+
+            return FakeResponse({"message": "error"}, outcome)
+
+        body = json if data is None else _loads(data, headers)
+
+        if endpoint == "enrg":
+            # A batch is a JSON list of plant payloads, answered with one result per plant
+            batch = body if isinstance(body, list) else [body]
+            self.uploads.extend(batch)
+            return FakeResponse({"data": {"results": [{"id_plant": payload.get("ID_PLANT")} for payload in batch]}})
+
+        return FakeResponse({"status": "0", "message": "", "data": self._hoymiles_data(endpoint, body)})
+
+    def _hoymiles_data(self, endpoint: str, body: dict):
+        if endpoint == "mi_data_day":
+            return [{"time": "10:00", "ac": {"temp": 40.0, "freq": 60.0, "ua": 120.0, "ub": 0.0, "uc": 0.0},
+                     "dc": [{"u": 35.0, "i": 2.0}]},
+                    {"time": "10:05", "ac": {"temp": 41.0, "freq": 60.0, "ua": 121.0, "ub": 0.0, "uc": 0.0},
+                     "dc": [{"u": 36.0, "i": 2.5}]}]
+
+        if endpoint == "findMyStations":
+            return {"stations": [{"id": id_plant, "station_name": f"Plant {id_plant}"} for id_plant in self.stations],
+                    "next": None}
+
+        if endpoint == "findDevsByStation":
+            return {"micro_datas": [{"mi_sn": sn} for sn in self.stations[body["id"]]]}
+
+        if endpoint == "station_today_production":
+            return "25000"
+
+        return dict(STATUS)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeAuthService:
+    def get_token(self, autherization: bool = True) -> str:
+        return "token"
+
+
+def _loads(data, headers: dict = None):
+    if (headers or {}).get("Content-Encoding") == "gzip":
+        data = gzip.decompress(data)
+
+    return json.loads(data.decode("utf-8") if isinstance(data, bytes) else data)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch) -> ConfigHandler:
+    """
+    config.ini of the repository in a temporary working directory, with the settings that
+    depend on the clock or pace the requests turned off. Tests override settings with
+    config.config.set("SETTING", name, value).
+    """
+    shutil.copy(os.path.join(ROOT, "config.ini"), tmp_path / "config.ini")
+    monkeypatch.chdir(tmp_path)
+    config_data = ConfigHandler(str(tmp_path / "config.ini"))
+    config_data.config.set("SETTING", "NIGHT_MODE", "off")
+    config_data.config.set("SETTING", "RATE_LIMIT", "0")
+
+    return config_data
+
+
+@pytest.fixture
+def logger() -> logging.Logger:
+    return logging.getLogger("tests")
+
+
+@pytest.fixture
+def fleet() -> list:
+    """Topology snapshot of two plants with two microinverters each."""
+    return [{"id_plant": 1, "plant_name": "Plant 1", "micros_id": ["SN12", "SN11"]},
+            {"id_plant": 2, "plant_name": "Plant 2", "micros_id": ["SN22", "SN21"]}]
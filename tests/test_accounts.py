@@ -0,0 +1,51 @@
+import pytest
+
+from App.accounts import MultiAccountReport
+from App.reports import HoymileReport
+from main import run_cycle
+from tests.conftest import FakeAuthService, FakeHttpClient
+from utils.configHandler import ConfigHandlerKey
+from utils.runContext import RunContext
+
+
+def key_config(tmp_path, text: str) -> ConfigHandlerKey:
+    (tmp_path / "key.ini").write_text(text)
+    return ConfigHandlerKey(str(tmp_path / "key.ini"))
+
+
+def test_keys_of_every_account(tmp_path):
+    config_key = key_config(tmp_path, "[PASSWORD]\nKEY = main%%3D\n\n[ACCOUNT north]\nKEY = north%%3D\n\n"
+                                      "[ACCOUNT empty]\nNAME = no key\n")
+
+    assert config_key.get_keys() == {"": "main=", "north": "north="}
+
+
+def test_missing_key_is_a_configuration_error(tmp_path):
+    config_key = key_config(tmp_path, "[PASSWORD]\nCREDENTIALS = credentials\n\n[ACCOUNT north]\nNAME = no key\n")
+
+    with pytest.raises(ValueError, match="No Hoymiles key"):
+        config_key.get_keys()
+
+
+def test_plant_listed_by_two_accounts_is_sent_once(config, logger):
+    http_client = FakeHttpClient()
+    snapshots = {"a": [{"id_plant": 1, "plant_name": "Plant 1", "micros_id": ["SN11"]},
+                       {"id_plant": 2, "plant_name": "Plant 2", "micros_id": ["SN21", "SN22"]}],
+                 "b": [{"id_plant": 2, "plant_name": "Plant 2", "micros_id": ["SN21", "SN22"]},
+                       {"id_plant": 3, "plant_name": "Plant 3", "micros_id": ["SN31"]}]}
+    reports = {}
+
+    for account, plants in snapshots.items():
+        reports[account] = HoymileReport(logger=logger, config_data=config, key=account, account=account, hour=0,
+                                         http_client=http_client)
+        reports[account].micros_cache.write(plants)
+
+    hoymiles = MultiAccountReport(logger=logger, reports=reports)
+
+    run_cycle(hoymiles, FakeAuthService(), RunContext.from_config(config), logger, http_client)
+
+    assert sorted(upload["ID_PLANT"] for upload in http_client.uploads) == [1, 2, 3]
+    # Plant 2 is collected once, by the first account listing it
+    assert http_client.calls.count("mi_data_day") == 4
+    assert hoymiles._owners[2] is reports["a"]
+    assert hoymiles._owners[3] is reports["b"]
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+from App.reports import HoymileReport
+from App.storage.cursor import ReadingCursor
+from App.storage.outbox import Outbox
+from App.storage.readings import ReadingStore
+from App.threaded_reports import ThreadedHoymileReport
+from main import run_cycle
+from tests.conftest import FakeAuthService, FakeHttpClient
+from utils.runContext import RunContext
+
+
+def run(config, logger, fleet, http_client, cursor, outbox=None) -> None:
+    report = HoymileReport(logger=logger, config_data=config, key="key", hour=0, http_client=http_client, cursor=cursor)
+    report.micros_cache.write(fleet)
+    run_cycle(report, FakeAuthService(), RunContext.from_config(config), logger, http_client, outbox)
+
+
+def devices(upload: dict) -> list:
+    return [device["ID_DEVICE"] for device in upload["INFORMATION_MICRO_INVERTERS"]]
+
+
+def uploads_by_plant(http_client: FakeHttpClient) -> dict:
+    return {upload["ID_PLANT"]: devices(upload) for upload in http_client.uploads}
+
+
+def test_failed_upload_keeps_the_cursor(config, logger, fleet):
+    config.config.set("SETTING", "UPLOAD_RETRIES", "1")
+    config.config.set("SETTING", "UPLOAD_WORKERS", "1")
+    cursor = ReadingCursor(logger=logger)
+    http_client = FakeHttpClient(errors={"enrg": [503]})
+
+    run(config, logger, fleet, http_client, cursor)
+
+    assert set(ReadingCursor(logger=logger).cursors) == {"SN21", "SN22"}
+
+    http_client = FakeHttpClient()
+    run(config, logger, fleet, http_client, cursor)
+
+    # Plant 1 is sent again with its readings, plant 2 only with its plant-level data
+    assert uploads_by_plant(http_client) == {1: ["SN12", "SN11"], 2: []}
+    assert set(ReadingCursor(logger=logger).cursors) == {"SN11", "SN12", "SN21", "SN22"}
+
+
+def test_payload_kept_in_the_outbox_moves_the_cursor(config, logger, fleet):
+    config.config.set("SETTING", "UPLOAD_RETRIES", "1")
+    cursor = ReadingCursor(logger=logger)
+    outbox = Outbox(logger=logger, db_file="outbox.db")
+    http_client = FakeHttpClient(errors={"enrg": [503, 503]})
+
+    run(config, logger, fleet, http_client, cursor, outbox)
+
+    assert set(cursor.cursors) == {"SN11", "SN12", "SN21", "SN22"}
+    assert outbox.count() == 2
+    outbox.close()
+
+
+def test_outbox_write_failure_keeps_the_cursor(config, logger, fleet, monkeypatch):
+    config.config.set("SETTING", "UPLOAD_RETRIES", "1")
+    config.config.set("SETTING", "UPLOAD_WORKERS", "1")
+    cursor = ReadingCursor(logger=logger)
+    outbox = Outbox(logger=logger, db_file="outbox.db")
+
+    def disk_full(payloads):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(outbox, "enqueue", disk_full)
+    http_client = FakeHttpClient(errors={"enrg": [503]})
+
+    run(config, logger, fleet, http_client, cursor, outbox)
+
+    assert set(cursor.cursors) == {"SN21", "SN22"}
+    outbox.close()
+
+
+def test_plant_without_new_readings_is_still_sent(config, logger, fleet):
+    cursor = ReadingCursor(logger=logger)
+    run(config, logger, fleet, FakeHttpClient(), cursor)
+
+    http_client = FakeHttpClient()
+    run(config, logger, fleet, http_client, cursor)
+
+    assert uploads_by_plant(http_client) == {1: [], 2: []}
+    assert all(upload["GENERATION"] == 25.0 and upload["STATE_OPERATION"] for upload in http_client.uploads)
+
+
+def test_store_connections_are_closed_after_every_cycle(config, logger, fleet):
+    store = ReadingStore(logger=logger, db_file="readings.db")
+    report = ThreadedHoymileReport(logger=logger, config_data=config, key="key", hour=0,
+                                   http_client=FakeHttpClient(), store=store)
+    report.micros_cache.write(fleet)
+
+    for _ in range(3):
+        run_cycle(report, FakeAuthService(), RunContext.from_config(config), logger, report.http_client)
+
+        assert store._connections == []
+
+    assert store.get_plant_day(1, datetime.now().strftime("%Y-%m-%d"))["total_energy"] == "25000"
+    store.close()
@@ -0,0 +1,70 @@
+import re
+
+from App.reports import HoymileReport
+from main import run_cycle
+from tests.conftest import FakeAuthService, FakeHttpClient
+from utils import jsonCodec
+from utils.circuitBreaker import CircuitBreakers
+from utils.metrics import Metrics
+from utils.runContext import RunContext
+
+SAMPLE = re.compile(r'^hoymiles_[a-z_]+(\{([a-z_]+="[^"]*",?)+\})? -?[0-9.e+-]+$')
+
+
+def test_prometheus_textfile_format(tmp_path):
+    metrics = Metrics(prometheus_file=str(tmp_path / "metrics.prom"), json_file="",
+                      buckets=(0.1, 1.0), labels={"shard": "1/2"})
+    metrics.observe_request("mi_data_day", 0.05, "ok", 120, 900)
+    metrics.observe_request("mi_data_day", 0.5, "http_500", 120, 20)
+    metrics.observe_request("mi_data_day", 2.0, "ok", 120, 900)
+    metrics.count_retry("mi_data_day")
+    metrics.observe_plant(7, 2.55)
+    metrics.write()
+
+    text = (tmp_path / "metrics.prom").read_text()
+    lines = text.splitlines()
+
+    assert text.endswith("\n")
+    assert all(line.startswith(("# HELP hoymiles_", "# TYPE hoymiles_")) or SAMPLE.match(line) for line in lines)
+
+    # Every metric is declared once, before its samples
+    declared = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert len(declared) == len(set(declared))
+    assert lines.index("# TYPE hoymiles_request_duration_seconds histogram") < lines.index(
+        'hoymiles_request_duration_seconds_count{endpoint="mi_data_day",shard="1/2"} 3')
+
+    # Cumulative buckets, the +Inf bucket counts every attempt
+    assert 'hoymiles_request_duration_seconds_bucket{endpoint="mi_data_day",le="0.1",shard="1/2"} 1' in lines
+    assert 'hoymiles_request_duration_seconds_bucket{endpoint="mi_data_day",le="1.0",shard="1/2"} 2' in lines
+    assert 'hoymiles_request_duration_seconds_bucket{endpoint="mi_data_day",le="+Inf",shard="1/2"} 3' in lines
+    assert 'hoymiles_requests_total{endpoint="mi_data_day",outcome="http_500",shard="1/2"} 1' in lines
+    assert 'hoymiles_request_retries_total{endpoint="mi_data_day",shard="1/2"} 1' in lines
+    assert 'hoymiles_request_bytes_received_total{endpoint="mi_data_day",shard="1/2"} 1820' in lines
+    assert 'hoymiles_plant_collect_seconds{plant="7",shard="1/2"} 2.55' in lines
+    assert 'hoymiles_plants_collected{shard="1/2"} 1' in lines
+
+
+def test_summary_of_a_run_with_a_failed_plant(config, logger, fleet):
+    config.config.set("SETTING", "PLANT_WORKERS", "1")
+    metrics = Metrics(prometheus_file="metrics.prom", json_file="metrics.json")
+    run_context = RunContext.from_config(config)
+    # Every attempt of the first microinverter of plant 1 fails
+    http_client = FakeHttpClient(errors={"mi_data_day": [500] * run_context.max_retries})
+    report = HoymileReport(logger=logger, config_data=config, key="key", hour=0, http_client=http_client,
+                           metrics=metrics, breakers=CircuitBreakers.from_config(config, logger))
+    report.micros_cache.write(fleet)
+
+    run_cycle(report, FakeAuthService(), run_context, logger, http_client, metrics=metrics)
+
+    summary = jsonCodec.load_file("metrics.json")
+    mi_data_day = summary["endpoints"]["mi_data_day"]
+
+    assert mi_data_day["outcomes"] == {"http_500": 3, "ok": 2}
+    assert mi_data_day["attempts"] == 5
+    assert mi_data_day["retries"] == 2
+    assert mi_data_day["failures"] == 1
+    assert summary["degraded_plants"] == ["1"]
+    assert list(summary["plants_s"]) == ["2"]
+    assert summary["endpoints"]["enrg"]["outcomes"] == {"ok": 1}
+    assert set(summary["stages_s"]) == {"collect", "payload", "upload"}
+    assert "hoymiles_plants_degraded 1" in open("metrics.prom").read().splitlines()
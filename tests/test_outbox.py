@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+from App.enrg.send_data import PostRequester
+from App.storage.outbox import Outbox
+from tests.conftest import FakeHttpClient
+
+
+def test_replay_purges_expired_dead_payloads(logger, tmp_path):
+    outbox = Outbox(logger=logger, db_file=str(tmp_path / "outbox.db"), max_attempts=1, retention_days=7)
+    dead, expired, pending = outbox.enqueue([{"ID_PLANT": 1}, {"ID_PLANT": 2}, {"ID_PLANT": 3}])
+    outbox.mark_failed([dead, expired], "HTTP 503")
+    old = (datetime.now() - timedelta(days=8)).strftime("%Y-%m-%d %H:%M:%S")
+
+    with outbox._connection:
+        outbox._connection.execute("UPDATE outbox SET created_at = ? WHERE id = ?", (old, expired))
+
+    sender = PostRequester(url="https://enrg.test/values", token="token", payloads=[], logger=logger,
+                           http_client=FakeHttpClient(), outbox=outbox)
+
+    assert sender.replay_outbox(limit=10, rate=0) == 1
+    assert outbox._connection.execute("SELECT id, status FROM outbox").fetchall() == [(dead, "dead")]
+    outbox.close()
@@ -0,0 +1,72 @@
+import queue
+import sqlite3
+
+from App.enrg.send_data import PostRequester
+from App.pipeline import StreamingPipeline, _END
+from App.reports import HoymileReport
+from App.storage.cursor import ReadingCursor
+from tests.conftest import FakeHttpClient
+
+
+def build_pipeline(config, logger, fleet, http_client, cursor) -> StreamingPipeline:
+    report = HoymileReport(logger=logger, config_data=config, key="key", hour=0, http_client=http_client, cursor=cursor)
+    report.micros_cache.write(fleet)
+    sender = PostRequester(url="https://enrg.test/values", token="token", payloads=[], logger=logger,
+                           http_client=http_client, max_retries=1)
+
+    # A single fetch worker keeps the order of the plants, so the failed upload is plant 1
+    return StreamingPipeline(logger=logger, hoymiles=report, sender=sender, fetch_workers=1)
+
+
+def test_failed_send_is_not_counted_as_sent(config, logger, fleet, caplog):
+    cursor = ReadingCursor(logger=logger)
+    http_client = FakeHttpClient(errors={"enrg": [503]})
+
+    sent = build_pipeline(config, logger, fleet, http_client, cursor).run()
+
+    assert sent == 1
+    assert "Pipeline uploads failed for 1 plants: [1]" in caplog.text
+    assert set(cursor.cursors) == {"SN21", "SN22"}
+
+
+def test_send_payload_reports_delivery(logger):
+    http_client = FakeHttpClient(errors={"enrg": [503]})
+    sender = PostRequester(url="https://enrg.test/values", token="token", payloads=[], logger=logger,
+                           http_client=http_client, max_retries=1)
+
+    assert sender.send_payload({"ID_PLANT": 1}) is False
+    assert sender.send_payload({"ID_PLANT": 1}) is True
+
+
+def test_upload_error_fails_only_its_plants(config, logger, fleet, caplog, monkeypatch):
+    cursor = ReadingCursor(logger=logger)
+    pipeline = build_pipeline(config, logger, fleet, FakeHttpClient(), cursor)
+    send_batch = pipeline.sender.send_batch
+
+    def locked_outbox(batch):
+        if batch[0]["ID_PLANT"] == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return send_batch(batch)
+
+    monkeypatch.setattr(pipeline.sender, "send_batch", locked_outbox)
+
+    assert pipeline.run() == 1
+    assert "Pipeline uploads failed for 1 plants: [1]" in caplog.text
+    assert set(cursor.cursors) == {"SN21", "SN22"}
+
+
+def test_queued_payloads_are_sent_in_batches(config, logger, fleet):
+    http_client = FakeHttpClient()
+    pipeline = build_pipeline(config, logger, fleet, http_client, None)
+    pipeline.sender.batch_size = 2
+    payload_queue = queue.Queue()
+
+    for payload in [{"ID_PLANT": 1}, {"ID_PLANT": 2}, {"ID_PLANT": 3}]:
+        payload_queue.put(payload)
+
+    payload_queue.put(_END)
+    sent = []
+    pipeline._upload(payload_queue, sent, [])
+
+    assert http_client.calls == ["enrg", "enrg"]
+    assert sent == [1, 2, 3]
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+from App.async_reports import AsyncHoymileReport
+from App.reports import HoymileReport
+from App.storage.readings import ReadingStore
+from App.threaded_reports import ThreadedHoymileReport
+from tests.conftest import FakeHttpClient
+from utils.circuitBreaker import CircuitBreakers
+
+COLLECTORS = [HoymileReport, ThreadedHoymileReport, AsyncHoymileReport]
+
+
+def build_report(report_class, config, logger, fleet, http_client, **kwargs) -> HoymileReport:
+    report = report_class(logger=logger, config_data=config, key="key", hour=0, http_client=http_client, **kwargs)
+    report.micros_cache.write(fleet)
+    return report
+
+
+@pytest.mark.parametrize("report_class", COLLECTORS)
+def test_transport_error_is_retried(report_class, config, logger, fleet):
+    http_client = FakeHttpClient(errors={"mi_data_day": [requests.Timeout("read timed out")]})
+    report = build_report(report_class, config, logger, fleet, http_client)
+
+    data = report.get_data_microinverters_per_plant()
+
+    assert [plant["id_plant"] for plant in data] == [1, 2]
+    assert http_client.calls.count("mi_data_day") == 5
+
+
+@pytest.mark.parametrize("report_class", COLLECTORS)
+def test_transport_errors_degrade_only_their_plant(report_class, config, logger, fleet):
+    timeouts = [requests.ConnectionError("connection reset")] * 3
+    http_client = FakeHttpClient(errors={"mi_data_day": timeouts})
+    # A single plant worker keeps the order of the calls, so the failures hit plant 1
+    config.config.set("SETTING", "PLANT_WORKERS", "1")
+    config.config.set("SETTING", "MAX_CONCURRENCY", "1")
+    breakers = CircuitBreakers(logger=logger, endpoint_threshold=10)
+    report = build_report(report_class, config, logger, fleet, http_client, breakers=breakers)
+
+    data = report.get_data_microinverters_per_plant()
+
+    assert [plant["id_plant"] for plant in data] == [2]
+    assert "plant:1" in breakers._circuits
+
+
+def test_transport_errors_open_the_endpoint_circuit(config, logger, fleet):
+    timeouts = [requests.Timeout("read timed out")] * 3
+    http_client = FakeHttpClient(errors={"mi_data_day": timeouts})
+    breakers = CircuitBreakers(logger=logger, endpoint_threshold=3)
+    report = build_report(HoymileReport, config, logger, fleet, http_client, breakers=breakers)
+
+    assert report.get_data_microinverters_per_plant() == []
+    assert breakers.states() == {"endpoint:mi_data_day": "open"}
+    assert http_client.calls.count("mi_data_day") == 3
+
+
+def test_unexpected_error_fails_only_its_plant(config, logger, fleet, monkeypatch):
+    breakers = CircuitBreakers(logger=logger)
+    report = build_report(HoymileReport, config, logger, fleet, FakeHttpClient(), breakers=breakers)
+    collect_plant = report._collect_plant
+
+    def broken_plant(plant, current_date):
+        if plant["id_plant"] == 1:
+            raise KeyError("micros_id")
+        return collect_plant(plant, current_date)
+
+    monkeypatch.setattr(report, "_collect_plant", broken_plant)
+
+    assert [plant["id_plant"] for plant in report.get_data_microinverters_per_plant()] == [2]
+
+
+def test_store_gets_the_series_and_memory_only_the_latest_point(config, logger, fleet):
+    store = ReadingStore(logger=logger, db_file="readings.db")
+    report = build_report(HoymileReport, config, logger, fleet, FakeHttpClient(), store=store)
+
+    data = report.get_data_microinverters_per_plant()
+
+    assert [[reading["time"] for reading in device["generation"]]
+            for plant in data for device in plant["data_inverters"]] == [["10:05"]] * 4
+    assert [reading["time"] for reading in store.get_readings("SN11", datetime.now().strftime("%Y-%m-%d"))] == ["10:00", "10:05"]
+    store.close()
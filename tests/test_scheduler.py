@@ -0,0 +1,22 @@
+from datetime import datetime
+
+import pytest
+
+from App.scheduler import CollectorDaemon
+
+
+@pytest.mark.parametrize("interval", [0, 7, 45, 90])
+def test_interval_must_divide_an_hour(logger, interval):
+    with pytest.raises(ValueError):
+        CollectorDaemon(logger=logger, interval_minutes=interval, job=lambda: None)
+
+
+@pytest.mark.parametrize("interval, now, expected", [
+    (15, datetime(2026, 1, 1, 10, 50, 12), datetime(2026, 1, 1, 11, 0)),
+    (20, datetime(2026, 1, 1, 10, 20), datetime(2026, 1, 1, 10, 40)),
+    (60, datetime(2026, 1, 1, 23, 59, 59), datetime(2026, 1, 2, 0, 0)),
+])
+def test_next_run_is_the_next_boundary(logger, interval, now, expected):
+    daemon = CollectorDaemon(logger=logger, interval_minutes=interval, job=lambda: None)
+
+    assert daemon.next_run(now) == expected
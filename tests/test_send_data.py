@@ -0,0 +1,127 @@
+import gzip
+import json
+import threading
+
+from App.enrg.send_data import PostRequester
+from App.storage.outbox import Outbox
+from tests.conftest import FakeHttpClient, FakeResponse
+
+
+def payload(id_plant, devices: list = ()) -> dict:
+    return {"ID_PLANT": id_plant, "INFORMATION_MICRO_INVERTERS": [{"ID_DEVICE": device} for device in devices]}
+
+
+def build_sender(logger, http_client=None, **kwargs) -> PostRequester:
+    return PostRequester(url="https://enrg.test/values", token="token", payloads=kwargs.pop("payloads", []), logger=logger,
+                         http_client=http_client or FakeHttpClient(), **kwargs)
+
+
+def test_batches_are_cut_by_size(logger):
+    sender = build_sender(logger, batch_size=3)
+    payloads = [payload(id_plant) for id_plant in range(7)]
+
+    batches = sender._build_batches(sender._track(payloads))
+
+    assert [[entry[0]["ID_PLANT"] for entry in batch] for batch, _ in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert [json.loads(body) for _, body in batches] == [payloads[:3], payloads[3:6], payloads[6:]]
+
+
+def test_batches_are_cut_by_bytes(logger):
+    payloads = [payload(id_plant) for id_plant in range(5)]
+    part = len(build_sender(logger)._encode(payloads[0]))
+    # Room for two payloads: brackets plus two parts and their separators
+    sender = build_sender(logger, batch_size=10, batch_max_bytes=2 + 2 * (part + 1))
+
+    batches = sender._build_batches(sender._track(payloads))
+
+    assert [len(batch) for batch, _ in batches] == [2, 2, 1]
+    assert all(len(body) <= sender.batch_max_bytes for _, body in batches)
+
+
+def test_oversized_payload_is_sent_alone(logger):
+    sender = build_sender(logger, batch_size=10, batch_max_bytes=1)
+
+    batches = sender._build_batches(sender._track([payload(1), payload(2)]))
+
+    assert [len(batch) for batch, _ in batches] == [1, 1]
+
+
+def test_bodies_are_gzip_encoded(logger):
+    http_client = FakeHttpClient()
+    bodies = []
+    post = http_client.post
+
+    def record(url, json=None, data=None, headers=None):
+        bodies.append((data, headers.get("Content-Encoding")))
+        return post(url, json=json, data=data, headers=headers)
+
+    http_client.post = record
+    payloads = [payload(1, ["D1"]), payload(2, ["D2"])]
+    sender = build_sender(logger, http_client, payloads=payloads, batch_size=2, compress=True)
+
+    saved_plants, _ = sender.send_post_requests()
+
+    assert saved_plants == {"1", "2"}
+    assert [(json.loads(gzip.decompress(data)), encoding) for data, encoding in bodies] == [(payloads, "gzip")]
+
+
+def test_batch_response_is_mapped_to_plants_and_devices(logger, caplog):
+    sender = build_sender(logger, batch_size=2)
+    batch = [payload(1, ["D1"]), payload(2, ["D2"])]
+    result = {"data": {"results": [{"id_plant": 1},
+                                   {"status": "error", "id_device": "D2", "message": "unknown device"}]}}
+
+    assert sender._handle_batch_response(result, batch) == {"1"}
+    assert "Plant information not saved (missing 'id_plant'): 2" in caplog.text
+    assert "Plant 2 - Device D2 - unknown device" in caplog.text
+
+
+class ExpiringTokenClient(FakeHttpClient):
+    """Answers 401 to the first `senders` requests at once, then accepts the new token only."""
+
+    def __init__(self, senders: int):
+        super().__init__()
+        self.barrier = threading.Barrier(senders, timeout=5)
+        self.lock = threading.Lock()
+
+    def post(self, url: str, json=None, data=None, headers=None) -> FakeResponse:
+        if headers["Authorization"] != "Bearer new-token":
+            # Every sender holds the expired token before any of them refreshes it
+            self.barrier.wait()
+            return FakeResponse({"message": "expired"}, 401)
+
+        with self.lock:
+            return super().post(url, json=json, data=data, headers=headers)
+
+
+class CountingAuthService:
+    def __init__(self):
+        self.calls = 0
+
+    def get_token(self, autherization: bool = True) -> str:
+        self.calls += 1
+        return "new-token"
+
+
+def test_concurrent_401s_refresh_the_token_once(logger):
+    auth_service = CountingAuthService()
+    payloads = [payload(id_plant) for id_plant in range(4)]
+    sender = build_sender(logger, ExpiringTokenClient(senders=4), payloads=payloads, workers=4, auth_service=auth_service)
+
+    saved_plants, _ = sender.send_post_requests()
+
+    assert saved_plants == {"0", "1", "2", "3"}
+    assert auth_service.calls == 1
+
+
+def test_outbox_ids_travel_with_their_payload(logger, tmp_path):
+    outbox = Outbox(logger=logger, db_file=str(tmp_path / "outbox.db"))
+    # The same dict sent twice is stored twice, and both entries are settled
+    repeated = payload(1)
+    sender = build_sender(logger, payloads=[repeated, repeated, payload(2)], batch_size=2, outbox=outbox)
+
+    saved_plants, stored_plants = sender.send_post_requests()
+
+    assert (saved_plants, stored_plants) == ({"1", "2"}, set())
+    assert outbox.count() == 0
+    outbox.close()
@@ -0,0 +1,79 @@
+import json
+from dataclasses import dataclass
+
+import pytest
+
+from App.models.microinverters import Microinverter, dumps_payload
+from App.reports import HoymileReport
+from tests.conftest import STATUS
+from utils import jsonCodec
+
+
+@pytest.fixture(params=["json", "orjson"])
+def backend(request, monkeypatch) -> str:
+    """Runs the test with the standard json module and, when it is installed, with orjson."""
+    if request.param == "orjson":
+        monkeypatch.setattr(jsonCodec, "orjson", pytest.importorskip("orjson"))
+    else:
+        monkeypatch.setattr(jsonCodec, "orjson", None)
+
+    monkeypatch.setattr(jsonCodec, "BACKEND", request.param)
+    return request.param
+
+
+def reading(dc_inputs: int, **ac) -> dict:
+    return {"time": "10:05",
+            "ac": dict({"temp": 41.5, "freq": 60.01, "ua": 121.3, "ub": 0.0, "uc": 0.0}, **ac),
+            "dc": [{"u": 30.0 + index, "i": 0.1 * index} for index in range(dc_inputs)]}
+
+
+def plants() -> list:
+    devices = [
+        {"id_micro": "SN-8", "generation": [reading(8)]},
+        # Fewer DC inputs than the 8 ENRG fields
+        {"id_micro": "SN-2", "generation": [reading(2)]},
+        # No reading at all (night, or every reading older than the cursor)
+        {"id_micro": "SN-0", "generation": []},
+        # Floats the json module writes with an exponent, and a comma inside a string
+        {"id_micro": "SN,9", "generation": [reading(1, temp=1e-05, freq=1e16, ua=-0.0)]},
+        {"id_micro": 1234567, "generation": [reading(4, temp=0.1 + 0.2)]},
+    ]
+    return [{"id_plant": 1, "total_energy": "25000", "plant_status": dict(STATUS), "data_inverters": devices},
+            {"id_plant": 2, "total_energy": "0", "plant_status": dict(STATUS), "data_inverters": []}]
+
+
+def as_dicts(payload: dict) -> dict:
+    return dict(payload, INFORMATION_MICRO_INVERTERS=[device.to_dict() for device in payload["INFORMATION_MICRO_INVERTERS"]])
+
+
+def test_payload_bytes_match_json_dumps_of_dicts(backend, config, logger):
+    report = HoymileReport(logger=logger, config_data=config, key="key", hour=0)
+
+    for payload in report.create_payload(plants()):
+        expected = json.dumps(as_dicts(payload), separators=(",", ":")).encode("utf-8")
+
+        assert dumps_payload(payload) == expected
+        assert dumps_payload(as_dicts(payload)) == expected
+        assert jsonCodec.loads(dumps_payload(payload)) == as_dicts(payload)
+
+
+def test_record_serializer_matches_its_dict(backend):
+    device = Microinverter(DATE="2026-01-01 10:00:00", ID_DEVICE="SNñ", TEMPERATURE_INVERTER=1e-05, VOLTAGE_1_DC=35)
+
+    assert device.to_json() == json.dumps(device.to_dict(), separators=(",", ":"))
+    assert list(json.loads(device.to_json())) == list(Microinverter.FIELDS)
+
+
+@dataclass
+class Point:
+    x: float
+    name: str
+
+
+def test_codec_round_trip(backend):
+    document = {"plants": [{"id": 1, "name": "Planta Bogotá", "values": [0.5, -0.0, 1e16, None, True]}],
+                "next": None}
+
+    assert jsonCodec.loads(jsonCodec.dumps(document)) == document
+    assert jsonCodec.loads(jsonCodec.dumps(document).decode("utf-8")) == document
+    assert jsonCodec.dumps([Point(1.5, "a")], default=lambda point: {"x": point.x, "name": point.name}) == b'[{"x":1.5,"name":"a"}]'
@@ -0,0 +1,46 @@
+import pytest
+
+import main
+from tests.conftest import FakeAuthService, FakeHttpClient
+from utils import jsonCodec
+from utils.configHandler import ConfigHandlerKey
+from utils.sharding import Shard
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 7, 16])
+def test_every_plant_lands_in_exactly_one_shard(count):
+    shards = [Shard(index, count) for index in range(count)]
+    owners = {}
+
+    for id_plant in list(range(5000)) + ["1234567", "plant-a"]:
+        owners[id_plant] = [shard.index for shard in shards if shard.owns(id_plant)]
+
+    assert all(len(indexes) == 1 for indexes in owners.values())
+    # The id is hashed as text, so the int and str forms of an id land on the same shard
+    assert all(shard.owns(id_plant) == shard.owns(str(id_plant)) for shard in shards for id_plant in range(100))
+
+    if count > 1:
+        # CRC-32 spreads the fleet, no shard is left empty or holds most of it
+        sizes = [sum(1 for indexes in owners.values() if indexes == [index]) for index in range(count)]
+        assert min(sizes) > 0 and max(sizes) < 2 * len(owners) / count
+
+
+def test_sharded_runs_merge_their_summary_without_metrics(config, logger, fleet, tmp_path, monkeypatch):
+    assert config.get_metrics() is False
+    (tmp_path / "key.ini").write_text("[PASSWORD]\nKEY = key\nTOKEN = \nCREDENTIALS = credentials\n")
+    monkeypatch.setattr(main.HttpClient, "from_config", lambda config_data: FakeHttpClient())
+
+    for index in range(2):
+        services = main.build_services(config, ConfigHandlerKey(str(tmp_path / "key.ini")), logger, Shard(index, 2))
+        services.get_token = FakeAuthService()
+        services.hoymiles.micros_cache.write(fleet)
+        services.run_cycle()
+        services.close()
+
+    merged = jsonCodec.load_file(config.get_metrics_json())
+
+    assert merged["complete"] is True
+    assert set(merged["shards"]) == {"0/2", "1/2"}
+    assert sorted(merged["plants_s"]) == ["1", "2"]
+    assert not (tmp_path / config.get_metrics_file()).exists()
+    assert not list(tmp_path.glob("*.prom"))
@@ -0,0 +1,113 @@
+import logging
+import zlib
+from datetime import datetime
+
+from App.reports import HoymileReport
+from tests.conftest import FakeHttpClient
+
+PERIOD = 7
+
+
+def rotates_today(id_plant) -> bool:
+    return zlib.crc32(str(id_plant).encode()) % PERIOD == datetime.now().toordinal() % PERIOD
+
+
+def plant_ids(rotating: bool, count: int, start: int = 100) -> list:
+    ids = []
+    id_plant = start
+
+    while len(ids) < count:
+        if rotates_today(id_plant) == rotating:
+            ids.append(id_plant)
+        id_plant += 1
+
+    return ids
+
+
+def snapshot_entry(id_plant, micros_id: list) -> dict:
+    return {"id_plant": id_plant, "plant_name": f"Plant {id_plant}", "micros_id": micros_id}
+
+
+def build_report(config, logger, stations: dict, previous: list = None) -> tuple:
+    config.config.set("SETTING", "TOPOLOGY_RECHECK_DAYS", str(PERIOD))
+    http_client = FakeHttpClient(stations=stations)
+    report = HoymileReport(logger=logger, config_data=config, key="key", hour=0, http_client=http_client)
+
+    if previous is not None:
+        report.micros_cache.write(previous)
+
+    return report, http_client
+
+
+def micros_by_plant(topology: list) -> dict:
+    return {plant["id_plant"]: plant["micros_id"] for plant in topology}
+
+
+def test_first_refresh_queries_every_plant(config, logger):
+    stations = {1: ["SN11", "SN12"], 2: ["SN21"]}
+    report, http_client = build_report(config, logger, stations)
+
+    assert report._plants_to_recheck([{"id_plant": 1}, {"id_plant": 2}], None) == {1, 2}
+    assert micros_by_plant(report.refresh_topology()) == {1: ["SN12", "SN11"], 2: ["SN21"]}
+    assert http_client.calls.count("findDevsByStation") == 2
+
+
+def test_new_and_rotating_plants_are_queried_and_the_rest_reused(config, logger):
+    (rotating,), (kept,) = plant_ids(True, 1), plant_ids(False, 1)
+    new = max(rotating, kept) + 1
+    # The API now reports other microinverters for every plant
+    stations = {rotating: ["SN-NEW-R"], kept: ["SN-NEW-K"], new: ["SN-NEW-N"]}
+    previous = [snapshot_entry(rotating, ["SN-OLD-R"]), snapshot_entry(kept, ["SN-OLD-K"])]
+    report, http_client = build_report(config, logger, stations, previous)
+
+    topology = report.refresh_topology()
+
+    assert micros_by_plant(topology) == {rotating: ["SN-NEW-R"], kept: ["SN-OLD-K"], new: ["SN-NEW-N"]}
+    assert http_client.calls.count("findDevsByStation") == 2
+    assert micros_by_plant(report.micros_cache.load()) == micros_by_plant(topology)
+
+
+def test_reused_snapshot_is_sorted_and_not_queried(config, logger):
+    kept = plant_ids(False, 3)
+    stations = {id_plant: ["SN-API"] for id_plant in kept}
+    previous = [snapshot_entry(id_plant, ["SN1", "SN3", "SN2"]) for id_plant in kept]
+    report, http_client = build_report(config, logger, stations, previous)
+
+    topology = report.refresh_topology()
+
+    assert micros_by_plant(topology) == {id_plant: ["SN3", "SN2", "SN1"] for id_plant in kept}
+    assert "findDevsByStation" not in http_client.calls
+
+
+def test_plants_no_longer_listed_are_evicted(config, logger, caplog):
+    kept, evicted = plant_ids(False, 2)
+    previous = [snapshot_entry(kept, ["SN1"]), snapshot_entry(evicted, ["SN2"])]
+    report, _ = build_report(config, logger, {kept: ["SN1"]}, previous)
+    caplog.set_level(logging.INFO)
+
+    topology = report.refresh_topology()
+
+    assert micros_by_plant(topology) == {kept: ["SN1"]}
+    assert f"1 evicted [{evicted}]" in caplog.text
+
+
+def test_full_refresh_queries_every_plant(config, logger):
+    kept = plant_ids(False, 2)
+    stations = {id_plant: [f"SN-NEW-{id_plant}"] for id_plant in kept}
+    previous = [snapshot_entry(id_plant, ["SN-OLD"]) for id_plant in kept]
+    report, http_client = build_report(config, logger, stations, previous)
+
+    topology = report.refresh_topology(full=True)
+
+    assert micros_by_plant(topology) == {id_plant: [f"SN-NEW-{id_plant}"] for id_plant in kept}
+    assert http_client.calls.count("findDevsByStation") == 2
+
+
+def test_failed_query_keeps_the_previous_snapshot(config, logger):
+    (rotating,) = plant_ids(True, 1)
+    previous = [snapshot_entry(rotating, ["SN-OLD"])]
+    report, _ = build_report(config, logger, {rotating: ["SN-NEW"]}, previous)
+    report.http_client.errors["findDevsByStation"] = [503] * report.MAX_RETRIES
+
+    assert micros_by_plant(report.refresh_topology()) == {rotating: ["SN-OLD"]}
+    assert micros_by_plant(report.micros_cache.load()) == {rotating: ["SN-OLD"]}
@@ -1,3 +1,6 @@
 from .configHandler import ConfigHandler,ConfigHandlerKey
 from .helper import HelperReport
-from.logger import logging
\ No newline at end of file
+from.logger import logging
+from .rateLimiter import RateLimiter
+from .httpClient import HttpClient
+from .runContext import RunContext
\ No newline at end of file
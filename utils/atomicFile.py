@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Writes `data` to `path` through a temporary file in the same directory followed by a
+    rename, so readers see either the previous or the new content. The mode of an
+    existing file is kept.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+
+    with tempfile.NamedTemporaryFile("wb", dir=directory,
+                                     suffix=".tmp", delete=False) as file:
+        temp_name = file.name
+
+        try:
+            file.write(data)
+        except Exception:
+            file.close()
+            os.remove(temp_name)
+            raise
+
+    mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+    os.chmod(temp_name, mode)
+    os.replace(temp_name, path)
@@ -0,0 +1,197 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Circuit breaker with closed, open and half-open states.
+
+    A closed circuit lets every call through and counts consecutive failures; after
+    `failure_threshold` of them it opens. An open circuit rejects calls until `cooldown`
+    seconds have passed, then turns half-open and lets a single probe through: its
+    success closes the circuit, its failure opens it again for another cooldown. A probe
+    that never reports back is replaced by a new one after a cooldown.
+
+    Not thread-safe on its own; CircuitBreakers serializes the access.
+
+    Attributes:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        cooldown (float): Seconds an open circuit rejects calls before probing.
+        state (str): "closed", "open" or "half_open".
+        failures (int): Consecutive failures counted so far.
+
+    Methods:
+        allow(now: float) -> bool:
+            Returns whether a call may go through at monotonic time `now`.
+
+        record_success() -> None:
+            Closes the circuit.
+
+        record_failure(now: float) -> None:
+            Counts a failure, opening the circuit when the threshold is reached or the probe failed.
+    """
+
+    failure_threshold: int = 5
+    cooldown: float = 60.0
+    state: str = field(default=CLOSED, init=False)
+    failures: int = field(default=0, init=False)
+    opened_at: float = field(default=0.0, init=False)
+    probe_at: Optional[float] = field(default=None, init=False)
+
+    def allow(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN:
+            if now - self.opened_at < self.cooldown:
+                return False
+
+            self.state = HALF_OPEN
+            self.probe_at = None
+
+        if self.probe_at is not None and now - self.probe_at < self.cooldown:
+            return False
+
+        self.probe_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.probe_at = None
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self.probe_at = None
+
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = now
+
+
+@dataclass
+class CircuitBreakers:
+    """
+    Thread-safe registry of the circuit breakers of the Hoymiles endpoints and plants.
+
+    Endpoint circuits (one per endpoint, e.g. mi_data_day) count failed request attempts
+    (connection errors and non-200 responses), so an endpoint that is down fails fast
+    instead of sleeping through MAX_RETRIES backoffs for every device. Plant circuits count
+    failed collections of a plant, so a plant with a broken gateway is skipped as degraded
+    for a cooldown. The registry lives as long as the process, which keeps the state of
+    the circuits from one run to the next in daemon mode. Every state change is logged.
+
+    Attributes:
+        logger (logging.Logger): Logger of the state changes.
+        endpoint_threshold (int): Consecutive failed attempts that open an endpoint circuit.
+        endpoint_cooldown (float): Seconds an endpoint circuit stays open.
+        plant_threshold (int): Consecutive failed collections that open a plant circuit.
+        plant_cooldown (float): Seconds a plant circuit stays open.
+
+    Methods:
+        from_config(config_data, logger) -> CircuitBreakers:
+            Builds the registry from the BREAKER_* settings.
+
+        allow_endpoint(endpoint: str) / allow_plant(id_plant) -> bool:
+            Returns whether a call to the endpoint / a collection of the plant may go through.
+
+        record_endpoint(endpoint: str, ok: bool) / record_plant(id_plant, ok: bool) -> None:
+            Reports the result of an attempt / a collection.
+
+        endpoint_open(endpoint: str) -> bool:
+            Returns whether the circuit of the endpoint is open, without probing it.
+
+        states() -> dict:
+            Returns the state of every circuit that is not closed ("endpoint:<name>", "plant:<id>").
+    """
+
+    logger: logging.Logger
+    endpoint_threshold: int = 5
+    endpoint_cooldown: float = 120.0
+    plant_threshold: int = 3
+    plant_cooldown: float = 900.0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._circuits = {}
+
+    @classmethod
+    def from_config(cls, config_data, logger: logging.Logger) -> "CircuitBreakers":
+        return cls(logger=logger,
+                   endpoint_threshold=config_data.get_breaker_endpoint_failures(),
+                   endpoint_cooldown=config_data.get_breaker_endpoint_cooldown(),
+                   plant_threshold=config_data.get_breaker_plant_failures(),
+                   plant_cooldown=config_data.get_breaker_plant_cooldown())
+
+    def allow_endpoint(self, endpoint: str) -> bool:
+        return self._allow(f"endpoint:{endpoint}")
+
+    def allow_plant(self, id_plant) -> bool:
+        return self._allow(f"plant:{id_plant}")
+
+    def record_endpoint(self, endpoint: str, ok: bool) -> None:
+        self._record(f"endpoint:{endpoint}", ok)
+
+    def record_plant(self, id_plant, ok: bool) -> None:
+        self._record(f"plant:{id_plant}", ok)
+
+    def endpoint_open(self, endpoint: str) -> bool:
+        with self._lock:
+            breaker = self._circuits.get(f"endpoint:{endpoint}")
+            return breaker is not None and breaker.state == OPEN
+
+    def states(self) -> dict:
+        with self._lock:
+            return {name: breaker.state for name, breaker in self._circuits.items() if breaker.state != CLOSED}
+
+    def _allow(self, name: str) -> bool:
+        with self._lock:
+            breaker = self._circuits.get(name)
+
+            if breaker is None:
+                return True
+
+            previous = breaker.state
+            allowed = breaker.allow(time.monotonic())
+
+            if breaker.state != previous:
+                self.logger.info(f"Circuit {name} is half-open, probing")
+
+            return allowed
+
+    def _record(self, name: str, ok: bool) -> None:
+        with self._lock:
+            breaker = self._circuits.get(name)
+
+            if breaker is None:
+                if ok:
+                    return
+
+                threshold, cooldown = ((self.plant_threshold, self.plant_cooldown) if name.startswith("plant:")
+                                       else (self.endpoint_threshold, self.endpoint_cooldown))
+                breaker = self._circuits[name] = CircuitBreaker(failure_threshold=threshold, cooldown=cooldown)
+
+            previous = breaker.state
+
+            if ok:
+                breaker.record_success()
+            else:
+                breaker.record_failure(time.monotonic())
+
+            if breaker.state == OPEN and previous != OPEN:
+                self.logger.error(f"Circuit {name} opened after {breaker.failures} failures, "
+                                  f"calls fail fast for {breaker.cooldown:.0f}s")
+            elif breaker.state == CLOSED and previous != CLOSED:
+                self.logger.info(f"Circuit {name} closed")
+
+            if ok:
+                # Healthy circuits are dropped, so the registry only grows with the failing ones
+                del self._circuits[name]
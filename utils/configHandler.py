@@ -52,6 +52,145 @@ class ConfigHandler:
         
         get_interval_time() -> int:
             Returns the time interval (in seconds or minutes) from settings.
+
+        get_collection_mode() -> str:
+            Returns the collection mode ("sync", "thread" or "async") from settings.
+
+        get_max_concurrency() -> int:
+            Returns the maximum number of in-flight Hoymiles requests from settings.
+
+        get_plant_workers() -> int:
+            Returns the size of the per-plant worker pool from settings.
+
+        get_pipeline() -> bool:
+            Returns whether plants are streamed through fetch, transform and upload stages.
+
+        get_pipeline_queue_size() -> int:
+            Returns the capacity of the queues between pipeline stages from settings.
+
+        get_upload_batch_size() -> int:
+            Returns the maximum number of plant payloads per ENRG request from settings.
+
+        get_upload_batch_bytes() -> int:
+            Returns the maximum uncompressed size in bytes of an ENRG batch from settings.
+
+        get_upload_gzip() -> bool:
+            Returns whether the ENRG request bodies are gzip-encoded.
+
+        get_upload_workers() -> int:
+            Returns the number of concurrent ENRG senders from settings.
+
+        get_upload_retries() -> int:
+            Returns the maximum number of attempts per ENRG request from settings.
+
+        get_outbox() -> bool:
+            Returns whether payloads go through the durable outbox.
+
+        get_outbox_db() -> str:
+            Returns the path of the outbox SQLite database from settings.
+
+        get_outbox_replay_limit() -> int:
+            Returns the maximum number of outbox payloads replayed per run from settings.
+
+        get_outbox_replay_rate() -> float:
+            Returns the maximum outbox replay requests per second from settings.
+
+        get_outbox_max_attempts() -> int:
+            Returns the attempts after which an outbox payload is no longer replayed.
+
+        get_outbox_retention_days() -> float:
+            Returns the days a dead outbox payload is kept before it is purged.
+
+        get_incremental() -> bool:
+            Returns whether only readings newer than the per-microinverter cursor are processed.
+
+        get_cursor_file() -> str:
+            Returns the path of the per-microinverter cursor file from settings.
+
+        get_store_readings() -> bool:
+            Returns whether the raw readings are saved in the local SQLite store.
+
+        get_readings_db() -> str:
+            Returns the path of the SQLite readings database from settings.
+
+        get_topology_ttl() -> int:
+            Returns the time-to-live in seconds of the topology snapshots from settings.
+
+        get_topology_recheck_days() -> int:
+            Returns the number of days over which every known plant is rechecked from settings.
+
+        get_plants_file() -> str:
+            Returns the path of the plants snapshot from settings.
+
+        get_micros_file() -> str:
+            Returns the path of the microinverters snapshot from settings.
+
+        get_rate_limit() -> float:
+            Returns the Hoymiles quota in requests per second from settings.
+
+        get_rate_burst() -> int:
+            Returns the number of requests allowed back to back from settings.
+
+        get_backoff_base() -> float:
+            Returns the base delay in seconds of the retry backoff from settings.
+
+        get_backoff_max() -> float:
+            Returns the maximum delay in seconds of the retry backoff from settings.
+
+        get_connect_timeout() -> float:
+            Returns the HTTP connect timeout in seconds from settings.
+
+        get_read_timeout() -> float:
+            Returns the HTTP read timeout in seconds from settings.
+
+        get_pool_connections() -> int:
+            Returns the number of per-host connection pools from settings.
+
+        get_pool_maxsize() -> int:
+            Returns the maximum number of kept-alive connections per host from settings.
+
+        get_metrics() -> bool:
+            Returns whether the metrics of every run are exported.
+
+        get_metrics_file() -> str:
+            Returns the path of the Prometheus textfile from settings.
+
+        get_metrics_json() -> str:
+            Returns the path of the JSON metrics summary from settings.
+
+        get_trace() -> bool:
+            Returns whether a Chrome trace of every run is written.
+
+        get_trace_dir() -> str:
+            Returns the directory of the trace files from settings.
+
+        get_trace_keep() -> int:
+            Returns the number of trace files kept from settings (0 keeps every file).
+
+        get_circuit_breaker() -> bool:
+            Returns whether failing endpoints and plants are cut off by circuit breakers.
+
+        get_breaker_endpoint_failures() -> int:
+            Returns the consecutive failed attempts that open the circuit of an endpoint.
+
+        get_breaker_endpoint_cooldown() -> float:
+            Returns the seconds the circuit of an endpoint stays open before probing.
+
+        get_breaker_plant_failures() -> int:
+            Returns the consecutive failed collections that open the circuit of a plant.
+
+        get_breaker_plant_cooldown() -> float:
+            Returns the seconds the circuit of a plant stays open before probing.
+
+        get_night_mode() -> str:
+            Returns what is collected between dusk and dawn: "status" (plant totals and status only),
+            "zeros" (plus zero readings for every microinverter) or "off" (every device, all night).
+
+        get_night_margin() -> float:
+            Returns the minutes before sunrise and after sunset that are still collected as day.
+
+        get_solar_latitude() / get_solar_longitude() -> float:
+            Returns the location used for the sunrise and sunset of the plants without coordinates.
     """
 
     config_file: str
@@ -99,6 +238,147 @@ class ConfigHandler:
     
     def get_interval_time(self)->int:
         return int(self.config.get("SETTING","INTERVAL_TIME"))
+
+    def get_collection_mode(self) -> str:
+        return self.config.get("SETTING", "COLLECTION_MODE", fallback="sync").strip().lower()
+
+    def get_max_concurrency(self) -> int:
+        return self.config.getint("SETTING", "MAX_CONCURRENCY", fallback=8)
+
+    def get_plant_workers(self) -> int:
+        return self.config.getint("SETTING", "PLANT_WORKERS", fallback=4)
+
+    def get_pipeline(self) -> bool:
+        return self.config.getboolean("SETTING", "PIPELINE", fallback=False)
+
+    def get_pipeline_queue_size(self) -> int:
+        return self.config.getint("SETTING", "PIPELINE_QUEUE_SIZE", fallback=16)
+
+    def get_upload_batch_size(self) -> int:
+        return self.config.getint("SETTING", "UPLOAD_BATCH_SIZE", fallback=1)
+
+    def get_upload_batch_bytes(self) -> int:
+        return self.config.getint("SETTING", "UPLOAD_BATCH_BYTES", fallback=1048576)
+
+    def get_upload_gzip(self) -> bool:
+        return self.config.getboolean("SETTING", "UPLOAD_GZIP", fallback=False)
+
+    def get_upload_workers(self) -> int:
+        return self.config.getint("SETTING", "UPLOAD_WORKERS", fallback=4)
+
+    def get_upload_retries(self) -> int:
+        return self.config.getint("SETTING", "UPLOAD_RETRIES", fallback=3)
+
+    def get_outbox(self) -> bool:
+        return self.config.getboolean("SETTING", "OUTBOX", fallback=False)
+
+    def get_outbox_db(self) -> str:
+        return self.config.get("SETTING", "OUTBOX_DB", fallback="outbox.db")
+
+    def get_outbox_replay_limit(self) -> int:
+        return self.config.getint("SETTING", "OUTBOX_REPLAY_LIMIT", fallback=500)
+
+    def get_outbox_replay_rate(self) -> float:
+        return self.config.getfloat("SETTING", "OUTBOX_REPLAY_RATE", fallback=5.0)
+
+    def get_outbox_max_attempts(self) -> int:
+        return self.config.getint("SETTING", "OUTBOX_MAX_ATTEMPTS", fallback=24)
+
+    def get_outbox_retention_days(self) -> float:
+        return self.config.getfloat("SETTING", "OUTBOX_RETENTION_DAYS", fallback=7.0)
+
+    def get_incremental(self) -> bool:
+        return self.config.getboolean("SETTING", "INCREMENTAL", fallback=False)
+
+    def get_cursor_file(self) -> str:
+        return self.config.get("SETTING", "CURSOR_FILE", fallback="cursors.json")
+
+    def get_store_readings(self) -> bool:
+        return self.config.getboolean("SETTING", "STORE_READINGS", fallback=False)
+
+    def get_readings_db(self) -> str:
+        return self.config.get("SETTING", "READINGS_DB", fallback="readings.db")
+
+    def get_topology_ttl(self) -> int:
+        return self.config.getint("SETTING", "TOPOLOGY_TTL", fallback=86400)
+
+    def get_topology_recheck_days(self) -> int:
+        return self.config.getint("SETTING", "TOPOLOGY_RECHECK_DAYS", fallback=7)
+
+    def get_plants_file(self) -> str:
+        return self.config.get("SETTING", "PLANTS_FILE", fallback="plants.json")
+
+    def get_micros_file(self) -> str:
+        return self.config.get("SETTING", "MICROS_FILE", fallback="micros_id.json")
+
+    def get_rate_limit(self) -> float:
+        return self.config.getfloat("SETTING", "RATE_LIMIT", fallback=1.0)
+
+    def get_rate_burst(self) -> int:
+        return self.config.getint("SETTING", "RATE_BURST", fallback=5)
+
+    def get_backoff_base(self) -> float:
+        return self.config.getfloat("SETTING", "BACKOFF_BASE", fallback=1.0)
+
+    def get_backoff_max(self) -> float:
+        return self.config.getfloat("SETTING", "BACKOFF_MAX", fallback=60.0)
+
+    def get_connect_timeout(self) -> float:
+        return self.config.getfloat("SETTING", "CONNECT_TIMEOUT", fallback=5.0)
+
+    def get_read_timeout(self) -> float:
+        return self.config.getfloat("SETTING", "READ_TIMEOUT", fallback=30.0)
+
+    def get_pool_connections(self) -> int:
+        return self.config.getint("SETTING", "POOL_CONNECTIONS", fallback=4)
+
+    def get_pool_maxsize(self) -> int:
+        return self.config.getint("SETTING", "POOL_MAXSIZE", fallback=10)
+
+    def get_metrics(self) -> bool:
+        return self.config.getboolean("SETTING", "METRICS", fallback=False)
+
+    def get_metrics_file(self) -> str:
+        return self.config.get("SETTING", "METRICS_FILE", fallback="metrics.prom")
+
+    def get_metrics_json(self) -> str:
+        return self.config.get("SETTING", "METRICS_JSON", fallback="metrics.json")
+
+    def get_trace(self) -> bool:
+        return self.config.getboolean("SETTING", "TRACE", fallback=False)
+
+    def get_trace_dir(self) -> str:
+        return self.config.get("SETTING", "TRACE_DIR", fallback="traces")
+
+    def get_trace_keep(self) -> int:
+        return self.config.getint("SETTING", "TRACE_KEEP", fallback=48)
+
+    def get_circuit_breaker(self) -> bool:
+        return self.config.getboolean("SETTING", "CIRCUIT_BREAKER", fallback=False)
+
+    def get_breaker_endpoint_failures(self) -> int:
+        return self.config.getint("SETTING", "BREAKER_ENDPOINT_FAILURES", fallback=5)
+
+    def get_breaker_endpoint_cooldown(self) -> float:
+        return self.config.getfloat("SETTING", "BREAKER_ENDPOINT_COOLDOWN", fallback=120.0)
+
+    def get_breaker_plant_failures(self) -> int:
+        return self.config.getint("SETTING", "BREAKER_PLANT_FAILURES", fallback=3)
+
+    def get_breaker_plant_cooldown(self) -> float:
+        return self.config.getfloat("SETTING", "BREAKER_PLANT_COOLDOWN", fallback=900.0)
+
+    def get_night_mode(self) -> str:
+        return self.config.get("SETTING", "NIGHT_MODE", fallback="off").strip().lower()
+
+    def get_night_margin(self) -> float:
+        return self.config.getfloat("SETTING", "NIGHT_MARGIN", fallback=30.0)
+
+    def get_solar_latitude(self) -> float:
+        return self.config.getfloat("SETTING", "SOLAR_LATITUDE", fallback=4.711)
+
+    def get_solar_longitude(self) -> float:
+        return self.config.getfloat("SETTING", "SOLAR_LONGITUDE", fallback=-74.0721)
     
 
 
@@ -113,6 +393,11 @@ class ConfigHandlerKey(ConfigHandler):
         get_key() -> str:
             Returns the decrypted key by URL-decoding the stored key.
 
+        get_keys() -> dict:
+            Returns the decrypted key of every Hoymiles account by name: the [PASSWORD] KEY is
+            the default account ("") and every [ACCOUNT <name>] section with a KEY adds one.
+            Raises ValueError when no account has a KEY.
+
         get_token_save() -> str:
             Returns the saved token from the configuration.
 
@@ -125,6 +410,22 @@ class ConfigHandlerKey(ConfigHandler):
 
     def get_key(self) -> str:
         return urllib.parse.unquote(self.config.get("PASSWORD", "KEY"))
+
+    def get_keys(self) -> dict:
+        keys = {}
+
+        if self.config.has_option("PASSWORD", "KEY"):
+            keys[""] = self.get_key()
+
+        for section in self.config.sections():
+            if section.startswith("ACCOUNT ") and self.config.has_option(section, "KEY"):
+                keys[section[len("ACCOUNT "):].strip()] = urllib.parse.unquote(self.config.get(section, "KEY"))
+
+        if not keys:
+            raise ValueError(f"No Hoymiles key in {self.config_file}, expected KEY in [PASSWORD] "
+                             f"or in an [ACCOUNT <name>] section")
+
+        return keys
     
     def get_token_save(self) -> str:
         return self.config.get("PASSWORD","TOKEN")
@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.configHandler import ConfigHandler
+
+
+@dataclass
+class HttpClient:
+    """
+    Shared HTTP client used for the Hoymiles, token and ENRG endpoints.
+
+    Wraps a single requests.Session so that connections are pooled and kept alive
+    per host instead of opening a new TCP/TLS connection for every request. Every
+    request is sent with a connect and read timeout.
+
+    Attributes:
+        connect_timeout (float): Seconds to wait while opening a connection.
+        read_timeout (float): Seconds to wait for the server response.
+        pool_connections (int): Number of per-host connection pools kept by the session.
+        pool_maxsize (int): Maximum number of connections kept alive per host.
+        session (requests.Session): Pooled session shared by every caller.
+
+    Methods:
+        from_config(config_data: ConfigHandler) -> HttpClient:
+            Builds a client from the [SETTING] section.
+
+        post(url: str, json=None, data=None, headers=None) -> requests.Response:
+            Sends a POST request through the pooled session.
+
+        close() -> None:
+            Closes every pooled connection.
+    """
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    pool_connections: int = 4
+    pool_maxsize: int = 10
+    session: requests.Session = field(init=False)
+
+    def __post_init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_connections,
+                              pool_maxsize=self.pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_config(cls, config_data: ConfigHandler) -> "HttpClient":
+        return cls(connect_timeout=config_data.get_connect_timeout(),
+                   read_timeout=config_data.get_read_timeout(),
+                   pool_connections=config_data.get_pool_connections(),
+                   pool_maxsize=config_data.get_pool_maxsize())
+
+    @property
+    def timeout(self) -> tuple:
+        return (self.connect_timeout, self.read_timeout)
+
+    def post(self, url: str, json=None, data=None, headers: Optional[dict] = None) -> requests.Response:
+        return self.session.post(url, json=json, data=data, headers=headers, timeout=self.timeout)
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,39 @@
+"""
+JSON codec used on the hot paths: Hoymiles responses and requests, the topology and
+cursor files, and the ENRG responses. The payloads sent to ENRG are written by
+App.models.microinverters.dumps_payload(), which does not depend on the backend.
+
+orjson is used when it is installed and the standard json module otherwise. Both
+backends work on bytes, write compact UTF-8 JSON (no indentation, non-ASCII characters
+kept as is) and hand dataclasses to `default` instead of serializing them natively.
+"""
+
+import json
+from typing import Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library is used instead
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]):
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def dumps(obj, default: Optional[Callable] = None) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+
+    return json.dumps(obj, default=default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def load_file(path: str):
+    with open(path, "rb") as file:
+        return loads(file.read())
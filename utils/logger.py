@@ -1,5 +1,6 @@
 import logging
 from dataclasses import dataclass
+from typing import Optional
 import os
 
 from utils.configHandler import ConfigHandler
@@ -13,16 +14,20 @@ class LoggerHandler:
 
     Attributes:
         name (str): Logger name, defaults to `__name__`.
+        config_data (ConfigHandler): Parsed configuration (config.ini is read if omitted).
+        label (str): Optional tag written before every message (e.g. "shard 1/4").
         logger (logging.Logger): Configured logger instance.
 
     Methods:
         get_logger() -> logging.Logger: Returns the configured logger instance.
     """
     name: str = "app_logger"
+    config_data: Optional[ConfigHandler] = None
+    label: str = ""
 
     def __post_init__(self):
-        from utils.helper import HelperReport
-        helper = HelperReport()
+        configHandler = self.config_data or ConfigHandler("config.ini")
+        helper = HelperReport(configHandler)
         helper.check_log_sizes()
 
         self.logger = logging.getLogger(self.name)
@@ -36,14 +41,13 @@ class LoggerHandler:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
 
-        from utils.configHandler import ConfigHandler
-        configHandler = ConfigHandler("config.ini")
         file_handler = logging.FileHandler(
             str(configHandler.get_name_log()), mode="a")
         file_handler.setLevel(logging.INFO)
 
+        prefix = f"[{self.label}] " if self.label else ""
         formatter = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(message)s")
+            f"%(asctime)s - %(levelname)s - {prefix}%(message)s")
         console_handler.setFormatter(formatter)
         file_handler.setFormatter(formatter)
 
@@ -0,0 +1,367 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from utils import jsonCodec
+from utils.atomicFile import write_atomic
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, shard summaries are then merged without a lock
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+@dataclass
+class Metrics:
+    """
+    Thread-safe registry of the metrics of a collection run.
+
+    Records, per endpoint (findMyStations, findDevsByStation, mi_data_day,
+    station_today_production, gpw, token, enrg): a latency histogram of every attempt,
+    the attempts per outcome, retries, requests that failed after every attempt, and the
+    bytes sent and received, and the calls rejected by an open circuit breaker. It also
+    records the duration of every stage of the run and of the collection of every plant,
+    the plants reported as degraded and the circuits that are not closed. The metrics of a run are written as a Prometheus
+    textfile (node_exporter textfile collector) and a JSON summary, then reset.
+
+    `labels` (e.g. {"shard": "1/4"}) are added to every Prometheus series and to the JSON
+    summary, so the files of several shards can be collected side by side; the summaries
+    of the shards of a run are combined with merge_summaries().
+
+    Attributes:
+        prometheus_file (str): Path of the Prometheus textfile ("" to skip it).
+        json_file (str): Path of the JSON summary ("" to skip it).
+        buckets (tuple): Upper bounds in seconds of the latency histogram buckets.
+        top_plants (int): Number of slowest plants exported to Prometheus.
+        labels (dict): Labels added to every series and to the summary.
+        run (str): Id of the run, shared by the shards of the same run (set by reset()).
+
+    Methods:
+        observe_request(endpoint: str, seconds: float, outcome: str, bytes_sent: int, bytes_received: int) -> None:
+            Records one attempt of an outbound request ("ok", "http_<status>", "api_error", "error").
+
+        count_retry(endpoint: str) / count_failure(endpoint: str) -> None:
+            Counts a retried attempt / a request that failed after every attempt.
+
+        count_short_circuit(endpoint: str) -> None:
+            Counts a request rejected by the open circuit of its endpoint.
+
+        count_degraded(id_plant) -> None:
+            Records a plant skipped as degraded.
+
+        observe_circuits(states: dict) -> None:
+            Records the state of the circuits that are not closed.
+
+        stage(name: str) -> ContextManager:
+            Adds the time spent in the block to the duration of a stage.
+
+        observe_plant(id_plant, seconds: float) -> None:
+            Records the collection time of a plant.
+
+        summary() -> dict:
+            Returns the JSON summary of the run.
+
+        write() -> None:
+            Writes the Prometheus textfile and the JSON summary.
+
+        reset(run: str = "") -> None:
+            Clears every metric before the next run.
+    """
+
+    prometheus_file: str = "metrics.prom"
+    json_file: str = "metrics.json"
+    buckets: tuple = DEFAULT_BUCKETS
+    top_plants: int = 20
+    labels: dict = field(default_factory=dict)
+    run: str = field(default="", init=False)
+    started_at: float = field(init=False)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, run: str = "") -> None:
+        with self._lock:
+            self.run = run
+            self.started_at = time.time()
+            self._latencies = {}
+            self._outcomes = {}
+            self._retries = {}
+            self._failures = {}
+            self._short_circuits = {}
+            self._degraded = set()
+            self._circuits = {}
+            self._bytes_sent = {}
+            self._bytes_received = {}
+            self._stages = {}
+            self._plants = {}
+
+    def observe_request(self, endpoint: str, seconds: float, outcome: str = "ok",
+                        bytes_sent: int = 0, bytes_received: int = 0) -> None:
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds)
+            self._outcomes[(endpoint, outcome)] = self._outcomes.get((endpoint, outcome), 0) + 1
+            self._bytes_sent[endpoint] = self._bytes_sent.get(endpoint, 0) + bytes_sent
+            self._bytes_received[endpoint] = self._bytes_received.get(endpoint, 0) + bytes_received
+
+    def count_retry(self, endpoint: str) -> None:
+        with self._lock:
+            self._retries[endpoint] = self._retries.get(endpoint, 0) + 1
+
+    def count_failure(self, endpoint: str) -> None:
+        with self._lock:
+            self._failures[endpoint] = self._failures.get(endpoint, 0) + 1
+
+    def count_short_circuit(self, endpoint: str) -> None:
+        with self._lock:
+            self._short_circuits[endpoint] = self._short_circuits.get(endpoint, 0) + 1
+
+    def count_degraded(self, id_plant) -> None:
+        with self._lock:
+            self._degraded.add(str(id_plant))
+
+    def observe_circuits(self, states: dict) -> None:
+        with self._lock:
+            self._circuits = dict(states)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - start)
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def observe_plant(self, id_plant, seconds: float) -> None:
+        with self._lock:
+            self._plants[str(id_plant)] = self._plants.get(str(id_plant), 0.0) + seconds
+
+    def summary(self) -> dict:
+        with self._lock:
+            endpoints = {}
+
+            for endpoint in sorted(set(self._latencies) | set(self._short_circuits)):
+                ordered = sorted(self._latencies.get(endpoint, [])) or [0.0]
+                endpoints[endpoint] = {
+                    "attempts": len(self._latencies.get(endpoint, [])),
+                    "outcomes": {outcome: count for (name, outcome), count in sorted(self._outcomes.items())
+                                 if name == endpoint},
+                    "retries": self._retries.get(endpoint, 0),
+                    "failures": self._failures.get(endpoint, 0),
+                    "short_circuits": self._short_circuits.get(endpoint, 0),
+                    "bytes_sent": self._bytes_sent.get(endpoint, 0),
+                    "bytes_received": self._bytes_received.get(endpoint, 0),
+                    "total_s": round(sum(ordered), 3),
+                    "p50_s": round(_quantile(ordered, 0.50), 4),
+                    "p95_s": round(_quantile(ordered, 0.95), 4),
+                    "p99_s": round(_quantile(ordered, 0.99), 4),
+                    "max_s": round(ordered[-1], 4),
+                }
+
+            plants = sorted(self._plants.items(), key=lambda item: -item[1])
+
+            return {
+                "run": self.run,
+                "labels": dict(self.labels),
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+                "wall_s": round(time.time() - self.started_at, 3),
+                "endpoints": endpoints,
+                "stages_s": {name: round(seconds, 3) for name, seconds in self._stages.items()},
+                "plants_s": {id_plant: round(seconds, 3) for id_plant, seconds in plants},
+                "degraded_plants": sorted(self._degraded),
+                "circuits": dict(sorted(self._circuits.items())),
+            }
+
+    def prometheus(self) -> str:
+        summary = self.summary()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP hoymiles_{name} {help_text}")
+            lines.append(f"# TYPE hoymiles_{name} {kind}")
+
+        with self._lock:
+            latencies = {endpoint: list(values) for endpoint, values in self._latencies.items()}
+
+        metric("request_duration_seconds", "histogram", "Duration of every outbound request attempt.")
+
+        for endpoint, values in sorted(latencies.items()):
+            counts = [0] * len(self.buckets)
+
+            for value in values:
+                index = bisect_left(self.buckets, value)
+
+                if index < len(counts):
+                    counts[index] += 1
+
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'hoymiles_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+
+            lines.append(f'hoymiles_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {len(values)}')
+            lines.append(f'hoymiles_request_duration_seconds_sum{{endpoint="{endpoint}"}} {sum(values)}')
+            lines.append(f'hoymiles_request_duration_seconds_count{{endpoint="{endpoint}"}} {len(values)}')
+
+        metric("requests_total", "counter", "Request attempts per endpoint and outcome.")
+
+        for endpoint, values in summary["endpoints"].items():
+            for outcome, count in values["outcomes"].items():
+                lines.append(f'hoymiles_requests_total{{endpoint="{endpoint}",outcome="{outcome}"}} {count}')
+
+        for name, key, help_text in (("request_retries_total", "retries", "Attempts that were retried."),
+                                     ("request_failures_total", "failures", "Requests that failed after every attempt."),
+                                     ("request_short_circuits_total", "short_circuits", "Requests rejected by an open circuit."),
+                                     ("request_bytes_sent_total", "bytes_sent", "Bytes sent in request bodies."),
+                                     ("request_bytes_received_total", "bytes_received", "Bytes received in response bodies.")):
+            metric(name, "counter", help_text)
+
+            for endpoint, values in summary["endpoints"].items():
+                lines.append(f'hoymiles_{name}{{endpoint="{endpoint}"}} {values[key]}')
+
+        metric("stage_duration_seconds", "gauge", "Duration of every stage of the last run.")
+
+        for name, seconds in summary["stages_s"].items():
+            lines.append(f'hoymiles_stage_duration_seconds{{stage="{name}"}} {seconds}')
+
+        metric("plant_collect_seconds", "gauge", f"Collection time of the {self.top_plants} slowest plants of the last run.")
+
+        for id_plant, seconds in list(summary["plants_s"].items())[:self.top_plants]:
+            lines.append(f'hoymiles_plant_collect_seconds{{plant="{id_plant}"}} {seconds}')
+
+        metric("plants_collected", "gauge", "Plants collected in the last run.")
+        lines.append(f"hoymiles_plants_collected {len(summary['plants_s'])}")
+        metric("plants_degraded", "gauge", "Plants skipped as degraded in the last run.")
+        lines.append(f"hoymiles_plants_degraded {len(summary['degraded_plants'])}")
+        metric("circuit_state", "gauge", "Circuits that are not closed (open or half_open).")
+
+        for circuit, state in summary["circuits"].items():
+            lines.append(f'hoymiles_circuit_state{{circuit="{circuit}",state="{state}"}} 1')
+
+        metric("run_wall_seconds", "gauge", "Wall time of the last run.")
+        lines.append(f"hoymiles_run_wall_seconds {summary['wall_s']}")
+        metric("run_timestamp_seconds", "gauge", "Start of the last run (Unix time).")
+        lines.append(f"hoymiles_run_timestamp_seconds {self.started_at}")
+
+        if self.labels:
+            lines = [_add_labels(line, self.labels) for line in lines]
+
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        if self.prometheus_file:
+            write_atomic(self.prometheus_file, self.prometheus().encode("utf-8"))
+
+        if self.json_file:
+            write_atomic(self.json_file, jsonCodec.dumps(self.summary()))
+
+
+def merge_summaries(summaries: list) -> dict:
+    """
+    Merges the JSON summaries of the shards of a run. Counters, bytes and totals are
+    added up, stages and wall time take the slowest shard (shards run side by side), and
+    the latency percentiles take the highest shard value, an upper bound of the fleet-wide
+    percentile.
+    """
+    endpoints = {}
+    stages = {}
+    plants = {}
+    degraded = set()
+    circuits = {}
+
+    for summary in summaries:
+        for endpoint, values in summary["endpoints"].items():
+            merged = endpoints.setdefault(endpoint, {"attempts": 0, "outcomes": {}, "retries": 0, "failures": 0,
+                                                     "short_circuits": 0, "bytes_sent": 0, "bytes_received": 0,
+                                                     "total_s": 0.0, "p50_s": 0.0, "p95_s": 0.0, "p99_s": 0.0,
+                                                     "max_s": 0.0})
+
+            for key in ("attempts", "retries", "failures", "short_circuits", "bytes_sent", "bytes_received", "total_s"):
+                merged[key] = round(merged[key] + values.get(key, 0), 3)
+
+            for key in ("p50_s", "p95_s", "p99_s", "max_s"):
+                merged[key] = max(merged[key], values.get(key, 0.0))
+
+            for outcome, count in values.get("outcomes", {}).items():
+                merged["outcomes"][outcome] = merged["outcomes"].get(outcome, 0) + count
+
+        for name, seconds in summary["stages_s"].items():
+            stages[name] = max(stages.get(name, 0.0), seconds)
+
+        plants.update(summary["plants_s"])
+        degraded.update(summary.get("degraded_plants", []))
+        circuits.update(summary.get("circuits", {}))
+
+    return {
+        "run": summaries[0].get("run", "") if summaries else "",
+        "shards": {summary.get("labels", {}).get("shard", str(index)): {
+            "wall_s": summary["wall_s"], "plants": len(summary["plants_s"]),
+            "degraded": len(summary.get("degraded_plants", []))} for index, summary in enumerate(summaries)},
+        "started_at": min((summary["started_at"] for summary in summaries), default=None),
+        "wall_s": max((summary["wall_s"] for summary in summaries), default=0.0),
+        "endpoints": dict(sorted(endpoints.items())),
+        "stages_s": stages,
+        "plants_s": dict(sorted(plants.items(), key=lambda item: -item[1])),
+        "degraded_plants": sorted(degraded),
+        "circuits": dict(sorted(circuits.items())),
+    }
+
+
+def write_merged_summary(json_file: str, shard_files: list, run: str) -> dict:
+    """
+    Merges the summaries of `shard_files` that belong to `run` into `json_file`. Every
+    shard calls it after writing its own summary; a lock serializes them, so the last
+    shard to finish writes the summary of the whole run ("complete": true).
+    """
+    with open(json_file + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        summaries = []
+
+        for path in shard_files:
+            try:
+                summary = jsonCodec.load_file(path)
+            except (OSError, ValueError):
+                continue
+
+            if summary.get("run") == run:
+                summaries.append(summary)
+
+        merged = merge_summaries(summaries)
+        merged["complete"] = len(summaries) == len(shard_files)
+        write_atomic(json_file, jsonCodec.dumps(merged))
+
+        return merged
+
+
+def _add_labels(line: str, labels: dict) -> str:
+    if line.startswith("#"):
+        return line
+
+    extra = ",".join(f'{name}="{value}"' for name, value in labels.items())
+    name, _, rest = line.partition(" ")
+
+    if name.endswith("}"):
+        return f"{name[:-1]},{extra}}} {rest}"
+
+    return f"{name}{{{extra}}} {rest}"
+
+
+def _quantile(ordered: list, q: float) -> float:
+    if not ordered:
+        return 0.0
+
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+
+from utils.configHandler import ConfigHandler
+
+
+@dataclass
+class RateLimiter:
+    """
+    Thread-safe token bucket that paces the requests sent to an API quota.
+
+    Tokens are refilled continuously at `rate` per second up to `burst`. Every request
+    takes one token, waiting if the bucket is empty. Retries are delayed with an
+    exponential backoff with full jitter, and a throttle hint sent by the server
+    (e.g. a Retry-After header) pauses the whole bucket for every caller.
+
+    Attributes:
+        rate (float): Sustained requests per second. A value <= 0 disables pacing.
+        burst (int): Maximum number of requests that can be sent back to back.
+        backoff_base (float): Base delay in seconds of the exponential backoff.
+        backoff_max (float): Upper bound in seconds of a single backoff delay.
+
+    Methods:
+        from_config(config_data: ConfigHandler) -> RateLimiter:
+            Builds a limiter from the [SETTING] section.
+
+        acquire() -> float:
+            Blocks until a request may be sent and returns the time waited.
+
+        backoff(attempt: int) -> float:
+            Returns the jittered delay to wait before the given retry attempt.
+
+        throttle(seconds: float) -> None:
+            Pauses the bucket for every caller during the given number of seconds.
+
+        parse_retry_after(value: Optional[str]) -> Optional[float]:
+            Converts a Retry-After header value into seconds.
+    """
+
+    rate: float
+    burst: int
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+    tokens: float = field(init=False)
+
+    def __post_init__(self):
+        self.burst = max(1, int(self.burst))
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_data: ConfigHandler) -> "RateLimiter":
+        return cls(rate=config_data.get_rate_limit(),
+                   burst=config_data.get_rate_burst(),
+                   backoff_base=config_data.get_backoff_base(),
+                   backoff_max=config_data.get_backoff_max())
+
+    def acquire(self) -> float:
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+
+                if now >= self._blocked_until:
+                    if self.rate <= 0:
+                        return waited
+
+                    self.tokens = min(float(self.burst), self.tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self._blocked_until - now
+
+            time.sleep(wait)
+            waited += wait
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** max(0, attempt - 1))
+        return random.uniform(0, delay)
+
+    def throttle(self, seconds: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self.tokens = 0.0
+            self._updated = max(self._updated, self._blocked_until)
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
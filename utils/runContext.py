@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from utils.configHandler import ConfigHandler
+from utils.helper import HelperReport
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """
+    Immutable context of a collection run, built once and shared by every component.
+
+    config.ini is parsed once into `config`, and the values used on the hot paths are
+    resolved up front: the endpoints, the request headers and the payload timestamp (the
+    run start rounded down to INTERVAL_TIME and shifted by -5 hours), so every device of
+    a run carries the same DATE. A long-running daemon derives the context of each cycle
+    with at(), which only moves the clock.
+
+    Attributes:
+        config (ConfigHandler): Parsed configuration.
+        started_at (datetime): Start of the run.
+        timestamp (str): Payload timestamp ("%Y-%m-%d %H:%M:%S") of the run.
+        interval_time (int): Minutes between two runs (INTERVAL_TIME).
+        max_retries (int): Max attempts of a Hoymiles call (MAX_RETRIES).
+        endpoints (Mapping[str, str]): Hoymiles base URL and paths, token and ENRG URLs.
+        hoymiles_headers (Mapping[str, str]): Headers of every Hoymiles request.
+        json_headers (Mapping[str, str]): Headers of the token and ENRG requests.
+
+    Methods:
+        from_config(config_data: ConfigHandler, now: Optional[datetime] = None) -> RunContext:
+            Builds the context of a run starting at `now`.
+
+        at(now: datetime) -> RunContext:
+            Returns a copy of the context for a run starting at `now`.
+    """
+
+    config: ConfigHandler
+    started_at: datetime
+    timestamp: str
+    interval_time: int
+    max_retries: int
+    endpoints: Mapping[str, str] = field(default_factory=dict)
+    hoymiles_headers: Mapping[str, str] = field(default_factory=dict)
+    json_headers: Mapping[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, config_data: ConfigHandler, now: Optional[datetime] = None) -> "RunContext":
+        now = now or datetime.now()
+        interval_time = config_data.get_interval_time()
+
+        return cls(config=config_data,
+                   started_at=now,
+                   timestamp=payload_timestamp(now, interval_time),
+                   interval_time=interval_time,
+                   max_retries=int(config_data.get_retries()),
+                   endpoints=MappingProxyType({
+                       "url": config_data.get_url(),
+                       "plant_list": config_data.get_plant_list(),
+                       "specified_plant": config_data.get_specified_plant(),
+                       "data_microinverter": config_data.get_data_microinverter(),
+                       "total_energy": config_data.get_total_energy(),
+                       "plant_status": config_data.get_plant_status(),
+                       "token": config_data.get_url_token(),
+                       "enrg": config_data.get_url_enrg(),
+                   }),
+                   hoymiles_headers=MappingProxyType({
+                       "Content-Type": "application/json",
+                       "Accept": "*/*"
+                   }),
+                   json_headers=MappingProxyType({
+                       "Content-Type": "application/json"
+                   }))
+
+    def at(self, now: datetime) -> "RunContext":
+        return replace(self, started_at=now, timestamp=payload_timestamp(now, self.interval_time))
+
+
+def payload_timestamp(now: datetime, interval_time: int) -> str:
+    rounded_time = HelperReport.round_time_down(now, interval_time)
+    # Restar 5 horas
+    return (rounded_time - timedelta(hours=5)).strftime("%Y-%m-%d %H:%M:%S")
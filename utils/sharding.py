@@ -0,0 +1,71 @@
+import os
+import zlib
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    Slice of the plant fleet handled by one process (`--shard i/N`).
+
+    A plant belongs to the shard given by a stable hash of its id (CRC-32 of id_plant
+    modulo N), so N processes, on one host or several, split the collection and upload
+    work without overlap or coordination, and a plant always lands on the same shard.
+    The files a process writes for itself (cursor, readings and outbox databases,
+    metrics, traces) get a per-shard name. Only the leader (shard 0) refreshes the
+    topology snapshot that every shard reads.
+
+    Attributes:
+        index (int): Index of this shard, from 0 to count - 1.
+        count (int): Number of shards (1 disables sharding).
+
+    Methods:
+        parse(spec: str) -> Shard:
+            Parses "i/N". Raises ValueError when it is malformed or out of range.
+
+        owns(id_plant) -> bool:
+            Returns whether the plant belongs to this shard.
+
+        path(path: str) -> str:
+            Returns the per-shard name of a file ("cursors.json" -> "cursors.shard-1-of-4.json").
+
+        all_paths(path: str) -> list:
+            Returns the per-shard names of a file for every shard.
+    """
+
+    index: int = 0
+    count: int = 1
+
+    def __post_init__(self):
+        if self.count < 1 or not 0 <= self.index < self.count:
+            raise ValueError(f"Invalid shard {self.index}/{self.count}, expected 0 <= i < N")
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        index, _, count = spec.partition("/")
+
+        try:
+            return cls(int(index), int(count))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{spec}', expected i/N with 0 <= i < N")
+
+    @property
+    def leader(self) -> bool:
+        return self.index == 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def owns(self, id_plant) -> bool:
+        return self.count == 1 or zlib.crc32(str(id_plant).encode()) % self.count == self.index
+
+    def path(self, path: str) -> str:
+        if self.count == 1:
+            return path
+
+        root, extension = os.path.splitext(path)
+        return f"{root}.shard-{self.index}-of-{self.count}{extension}"
+
+    def all_paths(self, path: str) -> list:
+        return [Shard(index, self.count).path(path) for index in range(self.count)]
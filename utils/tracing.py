@@ -0,0 +1,171 @@
+import contextvars
+import functools
+import glob
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+
+from utils import jsonCodec
+
+# Thread ids given to named lanes, away from the native thread ids
+LANE_BASE = 1_000_000_000
+
+# Id of the innermost open span of the current thread / asyncio task
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Tracer:
+    """
+    Thread-safe recorder of the spans of a collection run (run -> plant -> device -> HTTP attempt).
+
+    Every span keeps its start, duration, thread and arguments (plant, serial number,
+    endpoint, outcome, ...) plus its own id and the id of its parent span, which follows
+    the code through threads and asyncio tasks. A run is written as a Chrome trace
+    (Trace Event Format), which opens in Perfetto (ui.perfetto.dev) or chrome://tracing,
+    to one file per run named after the run start. Only the newest `keep` files are kept.
+
+    Spans that would overlap on a single thread (the plants of the asyncio collector all
+    run on the event loop) can be moved to a named lane of their own.
+
+    Attributes:
+        trace_dir (str): Directory of the trace files.
+        keep (int): Number of trace files kept (0 keeps every file).
+        started_at (datetime): Start of the run being recorded.
+
+    Methods:
+        span(name: str, cat: str = "", lane: Optional[str] = None, **args) -> ContextManager[dict]:
+            Records the block as a span. The yielded dict is stored as the span arguments,
+            so the block can add its outcome. An exception sets the outcome to "exception".
+
+        complete(name: str, start: float, cat: str = "", **args) -> None:
+            Records a span that started at time.perf_counter() `start` and ends now.
+
+        reset(now: Optional[datetime] = None) -> None:
+            Clears the recorded spans before the next run.
+
+        write() -> Optional[str]:
+            Writes the trace of the run and returns its path (None when nothing was recorded).
+    """
+
+    trace_dir: str = "traces"
+    keep: int = 48
+    started_at: datetime = field(init=False)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._lanes = {}
+        self.reset()
+
+    def reset(self, now: Optional[datetime] = None) -> None:
+        with self._lock:
+            self.started_at = now or datetime.now()
+            self._origin = time.perf_counter()
+            self._root = None
+            self._events = []
+            self._threads = {}
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", lane: Optional[str] = None, **args):
+        span_id = next(self._ids)
+        args["span"] = span_id
+        args["parent"] = self._parent(span_id)
+        token = _current_span.set(span_id)
+        start = time.perf_counter()
+
+        try:
+            yield args
+        except BaseException as ex:
+            args.setdefault("outcome", "exception")
+            args["error"] = str(ex)
+            raise
+        finally:
+            end = time.perf_counter()
+            _current_span.reset(token)
+            self._record(name, cat, lane, start, end, args)
+
+    def complete(self, name: str, start: float, cat: str = "", **args) -> None:
+        span_id = next(self._ids)
+        args["span"] = span_id
+        args["parent"] = self._parent(span_id)
+        self._record(name, cat, None, start, time.perf_counter(), args)
+
+    def _parent(self, span_id: int) -> Optional[int]:
+        parent = _current_span.get()
+
+        if parent is not None:
+            return parent
+
+        with self._lock:
+            # Spans started outside the run span (worker threads) hang from it
+            if self._root is None:
+                self._root = span_id
+                return None
+
+            return self._root
+
+    def _record(self, name: str, cat: str, lane: Optional[str], start: float, end: float, args: dict) -> None:
+        with self._lock:
+            if lane is None:
+                tid = threading.get_native_id()
+                self._threads.setdefault(tid, threading.current_thread().name)
+            else:
+                tid = self._lanes.setdefault(lane, LANE_BASE + len(self._lanes))
+                self._threads.setdefault(tid, lane)
+
+            self._events.append({"name": name, "cat": cat, "ph": "X", "pid": os.getpid(), "tid": tid,
+                                 "ts": round((start - self._origin) * 1e6, 1),
+                                 "dur": round((end - start) * 1e6, 1), "args": args})
+
+    def write(self) -> Optional[str]:
+        with self._lock:
+            if not self._events:
+                return None
+
+            pid = os.getpid()
+            metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "hoymiles collector"}}]
+            metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                         for tid, name in self._threads.items()]
+            trace = {"traceEvents": metadata + self._events, "displayTimeUnit": "ms",
+                     "otherData": {"started_at": self.started_at.isoformat(timespec="seconds")}}
+            path = os.path.join(self.trace_dir, f"trace_{self.started_at:%Y%m%d_%H%M%S}.json")
+
+            os.makedirs(self.trace_dir, exist_ok=True)
+
+            with open(path, "wb") as file:
+                file.write(jsonCodec.dumps(trace))
+
+        self._prune()
+
+        return path
+
+    def _prune(self) -> None:
+        if self.keep <= 0:
+            return
+
+        for old_file in sorted(glob.glob(os.path.join(self.trace_dir, "trace_*.json")))[:-self.keep]:
+            os.remove(old_file)
+
+
+def span(tracer: Optional[Tracer], name: str, cat: str = "", lane: Optional[str] = None, **args):
+    """
+    Returns tracer.span(...), or a no-op context yielding a throwaway dict when tracing is off.
+    """
+    if tracer is None:
+        return nullcontext({})
+
+    return tracer.span(name, cat, lane, **args)
+
+
+def with_context(func: Callable) -> Callable:
+    """
+    Binds `func` to a copy of the current context, so the spans it opens on a worker
+    thread hang from the span open where it was submitted.
+    """
+    return functools.partial(contextvars.copy_context().run, func)